@@ -1,50 +1,77 @@
+import numpy as np
+
 from constants import *
-from pyjam import utils
-from pyjam.sprite import Sprite
 from pyjam.application import *
 from pyjam.constants import *
 
 
-class Star(Sprite):
-    def __init__(self, service, frame):
-        super().__init__(frame)
+class StarField:
+    """
+    All the stars of the scrolling background.
+    Stars are kept in NumPy arrays, so they are updated and submitted to the sprite batch all at once.
+    """
 
+    def __init__(self, service, frame, count: int):
         self.__service = service
+        self.__frame = frame
+
+        # whether the stars are scrolling and twinkling
+        self.active = True
 
-        self.time_to_live = random.randint(200, 400) / 1000.0
-        self.counter = self.time_to_live
+        self.__time_to_live = np.random.randint(200, 401, count) / 1000.0
+        self.__counters = self.__time_to_live.copy()
 
-        self.layer_depth = 1.0
-        self.size = pc2v(glm.vec2(STAR_WIDTH, STAR_HEIGHT))
-        self.color = pg.Color(random.randint(20, 255), random.randint(20, 255), random.randint(20, 255), 255)
-        self.position = pc2v(glm.vec2(random.randint(0, 100), 5 + random.randint(0, 89)))
-        self.visible = True if random.randint(0, 1) == 1 else False
+        self.__size = pc2v(glm.vec2(STAR_WIDTH, STAR_HEIGHT))
+        self.__colors = np.empty((count, 4), dtype=np.uint8)
+        self.__colors[:, 0:3] = np.random.randint(20, 256, (count, 3))
+        self.__colors[:, 3] = 255
+        self.__positions = np.column_stack((pcx2vx(np.random.randint(0, 101, count)),
+                                            pcy2vy(5 + np.random.randint(0, 90, count))))
+        self.__visible = np.random.randint(0, 2, count) == 1
 
     @property
     def speed(self):
         return self.__service.speed
 
+    @property
+    def visible(self) -> bool:
+        return bool(self.__visible.any())
+
+    @visible.setter
+    def visible(self, visible_flag: bool):
+        # hidden stars keep twinkling, as each star of the field toggles its own visibility
+        self.__visible[:] = visible_flag
+
     def update(self, delta_time: float):
         if self.active:
             dygdt = pcy2vy(self.speed) * delta_time
-            self.counter -= delta_time
-            if self.counter < 0:
-                self.visible = not self.visible
-                self.counter = self.time_to_live
+            self.__counters -= delta_time
+            expired = self.__counters < 0
+            self.__visible[expired] = ~self.__visible[expired]
+            self.__counters[expired] = self.__time_to_live[expired]
+
+            sy = self.__positions[:, 1]
+            sy += dygdt
+            sy[sy > pcy2vy(94)] -= pcy2vy(89)
+            sy[sy < pcy2vy(6)] += pcy2vy(89)
 
-            sy = self.y + dygdt
-            if sy > pcy2vy(94):
-                sy -= pcy2vy(89)
-            elif sy < pcy2vy(6):
-                sy += pcy2vy(89)
-            self.y = sy
+    def render(self, sprite_batch):
+        if self.active:
+            rect = self.__frame.rect
+            sprite_batch.draw_many(texture=self.__frame.texture,
+                                   positions=self.__positions[self.__visible],
+                                   source_rects=(rect.x, rect.y, rect.w, rect.h),
+                                   colors=self.__colors[self.__visible],
+                                   origins=self.__size / 2,
+                                   sizes=self.__size,
+                                   layer_depths=1.0)
 
 
 class StarsService:
     def __init__(self, game):
         self.__stars_speed = 0.0
         self.__game = game
-        self.__stars = []
+        self.__star_field = None
 
     @property
     def speed(self) -> float:
@@ -55,17 +82,11 @@ class StarsService:
         self.__stars_speed = new_speed
 
     def create_stars(self, count: int):
-        while count:
-            a_star = Star(self, self.__game.services[ASSET_SERVICE].get('textures/star'))
-            a_star.layer_depth = 1.0
-            self.__game.sprites.append(a_star)
-            self.__stars.append(a_star)
-            count -= 1
+        self.__star_field = StarField(self, self.__game.services[ASSET_SERVICE].get('textures/star'), count)
+        self.__game.sprites.append(self.__star_field)
 
     def enable(self):
-        for s in self.__stars:
-            s.active = True
+        self.__star_field.active = True
 
     def disable(self):
-        for s in self.__stars:
-            s.active = False
+        self.__star_field.active = False
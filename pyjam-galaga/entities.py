@@ -29,6 +29,10 @@ def create_entity(kind, game):
 
 
 class Entity:
+    __slots__ = ('kind', 'sprite', 'position_index', 'plan', 'next_plan', 'attack_index', 'cargo_index', 'x', 'y',
+                 'rotation', 'delta_dest', 'path_index', 'point_index', 'velocity', 'dr', 'ir', 'distance',
+                 'shots_to_fire', 'timer')
+
     @property
     def game(self):
         return Game.instance
@@ -623,6 +627,8 @@ class Player:
 
 
 class Enemy(Entity):
+    __slots__ = ('__beam_height', '__is_captor', '__cargo', '__cargo_boss')
+
     next_explosion = 0
 
     def __init__(self):
@@ -1295,10 +1301,14 @@ class Enemy(Entity):
 
 
 class Bullet(Entity):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
 
 class CapturedFighter(Enemy):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
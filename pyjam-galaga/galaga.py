@@ -29,9 +29,15 @@ class Galaga(Game):
 
         self.set_assets_root('./assets')
 
+        # decoded textures and parsed sprite sheets are cached here, so that warm starts skip decoding
+        self.set_asset_cache_dir('./.cache')
+
         # if True run the game in exclusive fullscreen
         self.go_fullscreen = False
 
+        # draw the playfield offscreen at the original resolution, then upscale it to the window at once
+        self.set_native_resolution_rendering(True)
+
         # if True skip the initial hardware setup sequence
         self.skip_hw_startup = True
 
@@ -178,17 +184,34 @@ class Galaga(Game):
 
     def initialize(self):
         asset_service = self.services[ASSET_SERVICE]
+        texture_service = self.services[TEXTURE_SERVICE]
+
+        # the retro sheets are drawn at integer scales, they need neither mipmaps nor filtering
+        texture_service.set_sampling_rule('fonts/font.png', TextureSampling.PIXEL_ART)
+        texture_service.set_sampling_rule('textures/galaga-*.png', TextureSampling.PIXEL_ART)
+
+        # decode the images in parallel, the sheets below then get the textures already uploaded
+        texture_service.preload_textures(['fonts/font.png', 'textures/galaga-spritesheet.png'])
 
         font_sp_sheet = SpriteSheet(self)
         font_sp_sheet.load_rects('fonts/font.png')
 
-        texture_service = self.services[TEXTURE_SERVICE]
-
         assets_sp_sheet = SpriteSheet(self)
         assets_sp_sheet.load_rects('textures/galaga-spritesheet.png')
 
         white_frame = SpriteFrame(texture_service.create_color_texture(pg.Color('white')))
         asset_service.insert('textures/star', white_frame)
+
+        # most of a frame is drawn with a single texture bind
+        texture_service.add_to_atlas(font_sp_sheet)
+        texture_service.add_to_atlas(assets_sp_sheet)
+        texture_service.add_to_atlas(white_frame)
+        texture_service.pack_atlas()
+
+        # the game holds the assets shared by its states for the whole run, the states acquire the ones they draw
+        # while they're active, see HwStartupState
+        for path in ('fonts/font', 'textures/galaga-spritesheet', 'textures/star'):
+            asset_service.acquire(path)
         self.stars_svc.create_stars(NUM_STARS)
         self.stars_svc.disable()
 
@@ -4,9 +4,9 @@ import glm
 import numpy as np
 
 from pyjam.sprites.batch import SpriteBatch
+from pyjam.sprites.layer import StaticLayer
 from pyjam.application import pc2v, GameState, pcy2vy, pcx2vx
 from pyjam.constants import ASSET_SERVICE
-from pyjam.sprite import Sprite
 
 from galaga_data import *
 from pyjam.sprites import primitives2d
@@ -18,11 +18,82 @@ FONT_WIDTH = 32
 
 class Tile:
     def __init__(self):
-        self.sprite = None
         self.char_num = 0
         self.st = 0
 
 
+class TileGrid:
+    """
+    The screen-filling grid of font characters of the memory check.
+    Tiles share the font texture, so the whole grid is submitted to the sprite batch with a single call.
+    """
+
+    def __init__(self, font_sheet):
+        self.__font_sheet = font_sheet
+        self.visible = True
+
+        self.__size = pc2v(glm.vec2(4, 3.0))
+        self.__positions = np.array([pc2v(glm.vec2(x * (100.0 / ORIGINAL_X_CELLS), y * (100.0 / ORIGINAL_Y_CELLS)))
+                                     for y in range(ORIGINAL_Y_CELLS) for x in range(ORIGINAL_X_CELLS)])
+        self.__source_rects = np.zeros((ORIGINAL_Y_CELLS, ORIGINAL_X_CELLS, 4))
+        self.__colors = np.full((ORIGINAL_Y_CELLS, ORIGINAL_X_CELLS, 4), 255, dtype=np.uint8)
+        self.__layer_depth = 0.5
+
+        for y in range(ORIGINAL_Y_CELLS):
+            for x in range(ORIGINAL_X_CELLS):
+                self.set_frame(x, y, self.__font_sheet.frames['32'])
+
+    def set_frame(self, x, y, frame):
+        self.__source_rects[y, x] = frame.rect
+
+    def set_color(self, x, y, color: pg.Color):
+        self.__colors[y, x] = color
+
+    def update(self, delta_time: float):
+        pass
+
+    def render(self, sprite_batch: SpriteBatch):
+        sprite_batch.draw_many(texture=self.__font_sheet.texture2d,
+                               positions=self.__positions,
+                               source_rects=self.__source_rects.reshape(-1, 4),
+                               colors=self.__colors.reshape(-1, 4),
+                               sizes=self.__size,
+                               layer_depths=self.__layer_depth)
+
+
+class GridLines:
+    """
+    The crosshatch of the grid test. It doesn't change, so it's built once into a StaticLayer.
+    """
+
+    def __init__(self, game, star_frame):
+        self.__game = game
+        self.__star_frame = star_frame
+        self.visible = True
+
+    def update(self, delta_time: float):
+        pass
+
+    def render(self, sprite_batch: SpriteBatch):
+        # lines at least one display pixel thick
+        sw = float(self.__game.get_virtual_display_width()) / self.__game.get_display_width()
+        sh = float(self.__game.get_virtual_display_height()) / self.__game.get_display_height()
+        texture = self.__star_frame.texture
+        rect = self.__star_frame.rect
+
+        for y in range(ORIGINAL_Y_CELLS // 2 + 1):
+            p0 = y * (99.6 / (ORIGINAL_Y_CELLSF / 2))
+            p1 = p0 + 0.4
+            for y1 in np.arange(p0, p1 + sh, sh):
+                primitives2d.draw_line(sprite_batch, 0.0, pcy2vy(y1), pcx2vx(100.0), pcy2vy(y1), texture, 1, rect)
+
+        for x in range(ORIGINAL_X_CELLS // 2 + 1):
+            p0 = x * (99.6 / (ORIGINAL_X_CELLSF / 2))
+            p1 = p0 + 0.4
+            for x1 in np.arange(p0, p1 + sw, sw):
+                primitives2d.draw_line(sprite_batch, pcx2vx(x1), 0.0, pcx2vx(x1), pcy2vy(100.0), texture, 1, rect)
+
+
 class HwStartupState(GameState):
     class Substate(IntEnum):
         MEM_CHECK = 1,
@@ -40,6 +111,8 @@ class HwStartupState(GameState):
             self.__substate = substate
         self.__scratch1 = 0
         self.__font_sheet = None
+        self.__star_frame = None
+        self.__tile_grid = None
 
         # mem_check variables
         self.__flipflop = 0
@@ -53,7 +126,7 @@ class HwStartupState(GameState):
         self.pos = [(80, 90), (80, 85), (80, 80), (80, 75), (80, 70), (80, 65), (80, 60), (90, 50), (90, 45), (90, 40)]
 
         # show_grid variables
-        self.sp_batch = None
+        self.__grid_layer = None
 
     @property
     def substate(self):
@@ -65,6 +138,19 @@ class HwStartupState(GameState):
         self.__scratch1 = 0
         self.__state_timer = 0.0
 
+    def enter(self):
+        # the assets drawn by the state are held while it's active
+        asset_service = self.game.services[ASSET_SERVICE]
+        self.__font_sheet = asset_service.acquire('fonts/font')
+        self.__star_frame = asset_service.acquire('textures/star')
+
+    def exit(self):
+        asset_service = self.game.services[ASSET_SERVICE]
+        asset_service.release('fonts/font')
+        asset_service.release('textures/star')
+        self.__font_sheet = None
+        self.__star_frame = None
+
     def update(self):
         self.startup_sequence()
 
@@ -99,39 +185,33 @@ class HwStartupState(GameState):
 
                 if self.__stage < 2:
                     if character >= 62:
-                        self.__tiles[y][x].sprite.color = pg.Color(190, 190, 190, 255)
+                        self.__tile_grid.set_color(x, y, pg.Color(190, 190, 190, 255))
                     else:
-                        self.__tiles[y][x].sprite.color = pg.Color(0, 224, 196, 255)
+                        self.__tile_grid.set_color(x, y, pg.Color(0, 224, 196, 255))
                 else:
                     if character != -1:
                         if character == 80:
-                            self.__tiles[y][x].sprite.color = pg.Color(190, 190, 190, 255)
+                            self.__tile_grid.set_color(x, y, pg.Color(190, 190, 190, 255))
                         else:
-                            self.__tiles[y][x].sprite.color = pg.Color(random.randint(50, 255),
-                                                                       random.randint(50, 255),
-                                                                       random.randint(50, 255),
-                                                                       255)
+                            self.__tile_grid.set_color(x, y, pg.Color(random.randint(50, 255),
+                                                                      random.randint(50, 255),
+                                                                      random.randint(50, 255),
+                                                                      255))
 
                 # if the character is -1 then leave the block unchanged (stage 3)
                 if character != -1:
-                    self.__tiles[y][x].sprite.frame = self.__font_sheet.frames[str(31 + character)]
+                    self.__tile_grid.set_frame(x, y, self.__font_sheet.frames[str(31 + character)])
 
     def mem_check(self):
         if self.__scratch1 == 0:
-            self.__font_sheet = self.game.services[ASSET_SERVICE].get('fonts/font')
-            # Make sprites for tiles
+            # Make the grid of tiles
             for y in range(ORIGINAL_Y_CELLS):
                 for x in range(ORIGINAL_X_CELLS):
-                    self.__tiles[y][x].sprite = Sprite(self.__font_sheet.frames['32'])
                     self.__tiles[y][x].char_num = random.randint(1, NUM_CHARS_IN_FONT)
                     self.__tiles[y][x].st = random.randint(1, 5)
 
-                    self.__tiles[y][x].sprite.size = pc2v(glm.vec2(4, 3.0))
-                    self.__tiles[y][x].sprite.position = pc2v(glm.vec2(x * (100.0 / ORIGINAL_X_CELLS),
-                                                                       y * (100.0 / ORIGINAL_Y_CELLS)))
-                    self.__tiles[y][x].sprite.hotspot = glm.vec2(0, 0)
-
-                    self.game.sprites.append(self.__tiles[y][x].sprite)
+            self.__tile_grid = TileGrid(self.__font_sheet)
+            self.game.sprites.append(self.__tile_grid)
 
             self.__state_timer = 0.0
             self.__flipflop = 0
@@ -165,10 +245,9 @@ class HwStartupState(GameState):
                 else:
                     self.update_block(0, 0, ORIGINAL_X_CELLS - 1, ORIGINAL_Y_CELLS - 1)
             else:
-                # Delete tile sprites
-                for y in range(0, ORIGINAL_Y_CELLS):
-                    for x in range(0, ORIGINAL_X_CELLS):
-                        self.game.sprites.remove(self.__tiles[y][x].sprite)
+                # Delete the grid of tiles
+                self.game.sprites.remove(self.__tile_grid)
+                self.__tile_grid = None
                 self.substate = HwStartupState.Substate.RAM_OK
 
         # Tick stages over
@@ -217,37 +296,17 @@ class HwStartupState(GameState):
 
     def show_grid(self):
         if self.__scratch1 == 0:
-            self.sp_batch = SpriteBatch(self.game)
+            self.__grid_layer = StaticLayer(self.game, [GridLines(self.game, self.__star_frame)])
+            self.game.sprites.append(self.__grid_layer)
             self.__scratch1 += 1
             self.game.sfx_play(SOUND_PLAYER_DIE)
             self.__state_timer = 0.0
         elif self.__scratch1 == 1:
-            vw = self.game.get_virtual_display_width()
-            vh = self.game.get_virtual_display_height()
-            dw = self.game.get_display_width()
-            dh = self.game.get_display_height()
-            sw = float(vw) / dw
-            sh = float(vh) / dh
-
-            self.sp_batch.begin(transform_matrix=self.game.get_virtual_matrix())
-            texture = self.game.services[ASSET_SERVICE].get('textures/star').texture
-
-            for y in range(ORIGINAL_Y_CELLS // 2 + 1):
-                p0 = y * (99.6 / (ORIGINAL_Y_CELLSF / 2))
-                p1 = p0 + 0.4
-                for y1 in np.arange(p0, p1 + sh, sh):
-                    primitives2d.draw_line(self.sp_batch, 0.0, pcy2vy(y1), pcx2vx(100.0), pcy2vy(y1), texture, 1)
-
-            for x in range(ORIGINAL_X_CELLS // 2 + 1):
-                p0 = x * (99.6 / (ORIGINAL_X_CELLSF / 2))
-                p1 = p0 + 0.4
-                for x1 in np.arange(p0, p1 + sw, sw):
-                    primitives2d.draw_line(self.sp_batch, pcx2vx(x1), 0.0, pcx2vx(x1), pcy2vy(100.0), texture, 1)
-            self.sp_batch.end()
-
             self.__state_timer += self.game.delta_time
             if self.__state_timer > 0.75:
-                self.sp_batch.dispose()
+                self.game.sprites.remove(self.__grid_layer)
+                self.__grid_layer.dispose()
+                self.__grid_layer = None
                 self.substate = HwStartupState.Substate.END_HW_STARTUP
 
     def startup_sequence(self):
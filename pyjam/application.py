@@ -7,11 +7,16 @@ import moderngl as mgl
 
 from pyjam.services.shader import ShaderService
 from pyjam.services.asset import AssetService
+from pyjam.services.cache import AssetCacheService
+from pyjam.services.font import FontService
 from pyjam.services.texture import TextureService
 from pyjam.services.vao import VaoService
 from pyjam.services.vbo import VboService
-from pyjam.sprites.batch import SpriteBatch, SpriteSortMode
+from pyjam.sprites.batch import SpriteBatch, SpriteSortMode, BufferStreaming
+from pyjam.render_graph import RenderPass, RenderTarget, OFFSCREEN_BLENDING, PREMULTIPLIED_BLENDING
+from pyjam.texture import TextureSampling
 from pyjam.camera import Camera
+from pyjam.sprite import Sprite
 from pyjam.constants import *
 
 
@@ -27,6 +32,9 @@ class Game:
 
         self.__sprites = []
 
+        # sprites stored as NumPy columns, updated and drawn in vectorized form
+        self.__sprite_arrays = []
+
         self.__texts = []
 
         self.__bg_color = pg.Color('black')
@@ -56,12 +64,44 @@ class Game:
         self.__sp_batch = None
         self.__sp_batch_sort_mode = SpriteSortMode.BACK_TO_FRONT
 
+        # whether the sprite batch expands the sprites quads on the GPU with instanced rendering
+        self.__sp_batch_instanced = False
+
+        # how the sprite batch streams its vertices to the GPU
+        self.__sp_batch_streaming = BufferStreaming.ORPHAN
+        self.__sp_batch_ring_size = 3
+
+        # the passes drawn in order every frame, see add_render_pass
+        self.__render_passes = []
+
+        # whether the scene is drawn offscreen at the virtual resolution, then upscaled to the viewport at once
+        self.__native_resolution = False
+        self.__native_target = None
+
+        # whether sprites outside the camera view are skipped instead of being submitted to the sprite batch
+        self.__culling_enabled = True
+        self.__sprites_submitted = 0
+        self.__sprites_culled = 0
+
         self.__camera = None
 
         self.__origin_at_top_left = True
 
         self.__assets_root = "./media"
 
+        # folder of the preprocessed assets cache, None to disable it
+        self.__asset_cache_dir = None
+
+        # GPU memory budget of the textures in bytes (None for no limit) and whether they're loaded on first use
+        self.__texture_memory_budget = None
+        self.__texture_lazy_loading = False
+
+        # sampling of the textures without a more specific one (see TextureService.set_sampling_rule)
+        self.__default_texture_sampling = TextureSampling.MIPMAPPED
+
+        # whether the textures are compressed on the GPU by default (see TextureService.set_compression_rule)
+        self.__texture_compression_enabled = False
+
         self.__signal_quit = False
         self.__key_state_this_frame = None
         self.__key_state_prev_frame = None
@@ -109,6 +149,10 @@ class Game:
     def sprites(self):
         return self.__sprites
 
+    @property
+    def sprite_arrays(self):
+        return self.__sprite_arrays
+
     @property
     def texts(self):
         return self.__texts
@@ -155,15 +199,132 @@ class Game:
     def get_assets_root(self):
         return self.__assets_root
 
+    # must be called before setup, e.g. in the constructor of the game or in setup_display
+    def set_asset_cache_dir(self, cache_dir):
+        self.__asset_cache_dir = cache_dir
+
+    def get_asset_cache_dir(self):
+        return self.__asset_cache_dir
+
+    # must be called before setup, e.g. in the constructor of the game or in setup_display
+    def set_texture_residency(self, memory_budget: int = None, lazy_loading: bool = False):
+        self.__texture_memory_budget = memory_budget
+        self.__texture_lazy_loading = lazy_loading
+
+    def get_texture_memory_budget(self):
+        return self.__texture_memory_budget
+
+    def is_texture_lazy_loading(self) -> bool:
+        return self.__texture_lazy_loading
+
+    # must be called before setup, e.g. in the constructor of the game or in setup_display
+    def set_default_texture_sampling(self, sampling: TextureSampling):
+        self.__default_texture_sampling = sampling
+
+    def get_default_texture_sampling(self) -> TextureSampling:
+        return self.__default_texture_sampling
+
+    # must be called before setup, e.g. in the constructor of the game or in setup_display
+    def set_texture_compression_enabled(self, enabled: bool):
+        self.__texture_compression_enabled = enabled
+
+    def is_texture_compression_enabled(self) -> bool:
+        return self.__texture_compression_enabled
+
     def get_sprite_batch_sort_mode(self):
         return self.__sp_batch_sort_mode
 
     def set_sprite_batch_sort_mode(self, sort_mode):
         self.__sp_batch_sort_mode = sort_mode
 
+    def is_sprite_batch_instanced(self) -> bool:
+        return self.__sp_batch_instanced
+
+    # must be called before setup, e.g. in the constructor of the game or in setup_display
+    def set_sprite_batch_instanced(self, instanced: bool):
+        self.__sp_batch_instanced = instanced
+
+    # must be called before setup, e.g. in the constructor of the game or in setup_display
+    def set_sprite_batch_streaming(self, streaming: BufferStreaming, ring_size: int = 3):
+        self.__sp_batch_streaming = streaming
+        self.__sp_batch_ring_size = ring_size
+
     def get_sprite_batch(self):
         return self.__sp_batch
 
+    def create_sprite_batch(self) -> SpriteBatch:
+        """ Returns a new sprite batch with the settings of the game one, e.g. for a StaticLayer """
+        return SpriteBatch(self, instanced=self.__sp_batch_instanced,
+                           streaming=self.__sp_batch_streaming, ring_size=self.__sp_batch_ring_size)
+
+    # must be called before setup, e.g. in the constructor of the game or in setup_display
+    def set_native_resolution_rendering(self, flag: bool):
+        self.__native_resolution = flag
+
+    def is_native_resolution_rendering(self) -> bool:
+        return self.__native_resolution
+
+    def get_native_resolution_target(self) -> RenderTarget:
+        return self.__native_target
+
+    @property
+    def render_passes(self) -> tuple:
+        return tuple(self.__render_passes)
+
+    def add_render_pass(self, render_pass: RenderPass, before: str = None):
+        """
+        Adds a pass to the frame render graph, at the end or just before the pass with the given name.
+        """
+        if before is None:
+            self.__render_passes.append(render_pass)
+        else:
+            self.__render_passes.insert(self.__render_passes.index(self.get_render_pass(before)), render_pass)
+
+    def get_render_pass(self, name: str) -> RenderPass:
+        for render_pass in self.__render_passes:
+            if render_pass.name == name:
+                return render_pass
+        raise Exception(f'Unknown render pass: {name}')
+
+    def remove_render_pass(self, name: str):
+        self.__render_passes.remove(self.get_render_pass(name))
+
+    def create_render_target(self, width: int, height: int) -> RenderTarget:
+        return RenderTarget(self, width, height)
+
+    def is_culling_enabled(self) -> bool:
+        return self.__culling_enabled
+
+    def set_culling_enabled(self, flag: bool):
+        self.__culling_enabled = flag
+
+    @property
+    def sprites_submitted(self) -> int:
+        """ Number of sprites submitted to the sprite batch in the last frame """
+        return self.__sprites_submitted
+
+    @property
+    def sprites_culled(self) -> int:
+        """ Number of visible sprites skipped in the last frame, as they were outside the camera view """
+        return self.__sprites_culled
+
+    def get_view_bounds(self, transform_matrix=None) -> tuple:
+        """
+        Returns the (left, top, right, bottom) box of the world shown by the camera,
+        in the space of transform_matrix (by default the virtual display one).
+        """
+        if transform_matrix is None:
+            transform_matrix = self.get_virtual_matrix()
+        m = glm.inverse(self.camera.get_projection_matrix() * self.camera.get_view_matrix() * transform_matrix)
+
+        xs = []
+        ys = []
+        for corner in (glm.vec4(-1, -1, 0, 1), glm.vec4(1, -1, 0, 1), glm.vec4(-1, 1, 0, 1), glm.vec4(1, 1, 0, 1)):
+            v = m * corner
+            xs.append(v.x / v.w)
+            ys.append(v.y / v.w)
+        return min(xs), min(ys), max(xs), max(ys)
+
     @property
     def camera(self):
         return self.__camera
@@ -347,10 +508,12 @@ class Game:
 
         self.create_services()
 
+        self.setup_render_graph()
+
         # virtual call
         self.initialize()
 
-        self.__sp_batch = SpriteBatch(self)
+        self.__sp_batch = self.create_sprite_batch()
 
         scale_x = self.get_display_width() / self.get_virtual_display_width()
         scale_y = self.get_display_height() / self.get_virtual_display_height()
@@ -380,6 +543,33 @@ class Game:
 
         self.__key_state_this_frame = copy.copy(pg.key.get_pressed())
 
+    def setup_render_graph(self):
+        """
+        Sets up the default render graph: the main pass draws sprites and texts to the screen or,
+        with native resolution rendering, to an offscreen target the present pass then upscales to the viewport.
+        Passes added in initialize can be placed before these ones (see add_render_pass).
+        """
+        main_pass = RenderPass(RENDER_PASS_MAIN, self.render_scene)
+        self.add_render_pass(main_pass)
+
+        if self.__native_resolution:
+            self.__native_target = self.create_render_target(self.get_virtual_display_width(),
+                                                             self.get_virtual_display_height())
+            main_pass.target = self.__native_target
+            main_pass.clear_color = pg.Color(0, 0, 0, 0)
+            # the target holds premultiplied colors
+            self.add_render_pass(RenderPass(RENDER_PASS_PRESENT, self.__present_native_target,
+                                            sort_mode=SpriteSortMode.DEFERRED, blend_func=PREMULTIPLIED_BLENDING))
+
+    def __present_native_target(self, sprite_batch: SpriteBatch):
+        if self.__origin_at_top_left:
+            position = glm.vec2(0, 0)
+        else:
+            position = glm.vec2(-self.get_virtual_display_width() / 2, -self.get_virtual_display_height() / 2)
+
+        sprite_batch.draw(self.__native_target.texture, position,
+                          size=glm.vec2(self.get_virtual_display_width(), self.get_virtual_display_height()))
+
     def setup_viewport(self):
         # print(f'display_width, display_height: {self.get_display_width()}, {self.get_display_height()}' )
 
@@ -403,6 +593,9 @@ class Game:
     def shutdown(self):
         self.cleanup()
 
+        if self.__native_target is not None:
+            self.__native_target.dispose()
+
         self.destroy_services()
 
         pg.mixer.quit()
@@ -429,6 +622,9 @@ class Game:
         for s in self.__sprites:
             s.update(self.delta_time)
 
+        for a in self.__sprite_arrays:
+            a.update(self.delta_time)
+
     def change_state(self, new_state):
         if isinstance(new_state, type(self.__state)):
             return
@@ -438,18 +634,72 @@ class Game:
         self.__state.render()
 
     def render(self):
-        self.__sp_batch.begin(sort_mode=self.__sp_batch_sort_mode, transform_matrix=self.get_virtual_matrix())
+        self.__sprites_submitted = 0
+        self.__sprites_culled = 0
+
+        for render_pass in self.__render_passes:
+            if render_pass.enabled:
+                self.execute_render_pass(render_pass)
+
+    def execute_render_pass(self, render_pass: RenderPass):
+        if render_pass.target is not None:
+            render_pass.target.use()
+
+        if render_pass.clear_color is not None:
+            c = render_pass.clear_color
+            self.__ctx.clear(red=c.r / 255, green=c.g / 255, blue=c.b / 255, alpha=c.a / 255, depth=1.0,
+                             viewport=self.__ctx.viewport)
+
+        sort_mode = self.__sp_batch_sort_mode if render_pass.sort_mode is None else render_pass.sort_mode
+        if render_pass.transform_matrix is None:
+            transform_matrix = self.get_virtual_matrix()
+        else:
+            transform_matrix = render_pass.transform_matrix
+
+        if render_pass.blend_func is not None:
+            blend_func = render_pass.blend_func
+        elif render_pass.target is not None:
+            blend_func = OFFSCREEN_BLENDING
+        else:
+            blend_func = mgl.DEFAULT_BLENDING
+
+        self.__sp_batch.begin(sort_mode=sort_mode,
+                              blend_func=blend_func,
+                              blend_equation=render_pass.blend_equation,
+                              depth_test_enabled=render_pass.depth_test_enabled,
+                              transform_matrix=transform_matrix)
+        render_pass.render(self.__sp_batch)
+        self.__sp_batch.end()
+
+        if render_pass.target is not None:
+            # back to the screen, with its letterboxed viewport
+            self.__ctx.screen.use()
+
+    def render_scene(self, sprite_batch: SpriteBatch):
+        view_bounds = None
+        if self.__culling_enabled:
+            view_bounds = self.get_view_bounds()
+            view_left, view_top, view_right, view_bottom = view_bounds
 
         for s in self.__sprites:
             if s.visible:
-                s.render(self.__sp_batch)
+                if view_bounds is not None and isinstance(s, Sprite):
+                    left, top, right, bottom = s.cull_bounds
+                    if right < view_left or left > view_right or bottom < view_top or top > view_bottom:
+                        self.__sprites_culled += 1
+                        continue
+                s.render(sprite_batch)
+                self.__sprites_submitted += 1
+
+        for a in self.__sprite_arrays:
+            submitted, culled = a.render(sprite_batch, view_bounds)
+            self.__sprites_submitted += submitted
+            self.__sprites_culled += culled
 
         # draw texts
         for t in self.__texts:
             if t.visible:
-                t.render(self.__sp_batch)
-
-        self.__sp_batch.end()
+                t.render(sprite_batch)
 
     def key_up(self, key_int):
         return not self.__key_state_this_frame[key_int]
@@ -516,6 +766,9 @@ class Game:
 
             pg.display.flip()
 
+            # release the least recently drawn textures over the memory budget
+            self.services[TEXTURE_SERVICE].trim()
+
             # pause if necessary to achieve "FPS" frames per second
             self.__delta_time = self.clock.tick(self.__framerate) / 1000.0
 
@@ -524,8 +777,10 @@ class Game:
         self.shutdown()
 
     def create_services(self):
-        self.services[ASSET_SERVICE] = AssetService()
+        self.services[ASSET_CACHE_SERVICE] = AssetCacheService(self.__asset_cache_dir)
+        self.services[ASSET_SERVICE] = AssetService(self)
         self.services[TEXTURE_SERVICE] = TextureService(self)
+        self.services[FONT_SERVICE] = FontService(self)
         self.services[SHADER_SERVICE] = ShaderService(self)
         self.services[VBO_SERVICE] = VboService(self)
         self.services[VAO_SERVICE] = VaoService(self)
@@ -3,6 +3,14 @@ TEXTURE_SERVICE = 'TextureService'
 SHADER_SERVICE = 'ShaderService'
 VBO_SERVICE = 'VboService'
 VAO_SERVICE = 'VaoService'
+ASSET_CACHE_SERVICE = 'AssetCacheService'
+FONT_SERVICE = 'FontService'
 
 SHADER_DEFAULT_SPRITES = 'default_sprites'
 SHADER_UNTEXTURED = 'untextured'
+SHADER_INSTANCED_SPRITES = 'instanced_sprites'
+SHADER_SDF_SPRITES = 'sdf_sprites'
+SHADER_INSTANCED_SDF_SPRITES = 'instanced_sdf_sprites'
+
+RENDER_PASS_MAIN = 'main'
+RENDER_PASS_PRESENT = 'present'
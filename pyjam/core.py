@@ -1,4 +1,6 @@
 class Bounds:
+    __slots__ = ('left', 'top', 'width', 'height')
+
     def __init__(self, left: float, top: float, width: float, height: float):
         self.left = left
         self.top = top
@@ -0,0 +1,34 @@
+#version 330 core
+
+// per-vertex: corner of the unit quad
+layout (location = 0) in vec2 in_corner ;
+
+// per-instance: one record per sprite
+layout (location = 1) in vec2 in_position ;
+layout (location = 2) in vec2 in_origin ;
+layout (location = 3) in vec2 in_size ;
+layout (location = 4) in float in_rotation ;
+layout (location = 5) in float in_depth ;
+layout (location = 6) in vec4 in_color ;
+layout (location = 7) in vec4 in_tex_rect ;
+
+uniform mat4 model_matrix ;
+uniform mat4 view_matrix ;
+uniform mat4 proj_matrix ;
+
+out vec4 ex_color;
+out vec2 ex_tex_coords_0 ;
+
+void main(void)
+{
+    // rotation around the origin of the sprite
+    vec2 local = in_corner * in_size - in_origin ;
+    float a = radians(in_rotation) ;
+    float s = sin(a) ;
+    float c = cos(a) ;
+    vec2 position = in_position + vec2(local.x * c - local.y * s, local.x * s + local.y * c) ;
+
+    gl_Position = proj_matrix * view_matrix * model_matrix * vec4(position, in_depth, 1.0) ;
+	ex_color = in_color ;
+	ex_tex_coords_0 = vec2(mix(in_tex_rect.x, in_tex_rect.z, in_corner.x), mix(in_tex_rect.w, in_tex_rect.y, in_corner.y)) ;
+}
@@ -0,0 +1,20 @@
+#version 330 core
+
+in  vec4 ex_color;
+in  vec2 ex_tex_coords_0 ;
+
+// the alpha channel holds the signed distance to the glyph outline, 0.5 on the outline
+uniform sampler2D material_diffuse ;
+
+out vec4 out_color;
+
+void main(void)
+{
+	float distance = texture(material_diffuse, ex_tex_coords_0).a ;
+
+	// antialiased over about one screen pixel, whatever the scale the glyph is drawn at
+	float width = max(fwidth(distance) * 0.7071, 0.0001) ;
+	float alpha = smoothstep(0.5 - width, 0.5 + width, distance) ;
+
+	out_color = vec4(ex_color.rgb, ex_color.a * alpha) ;
+}
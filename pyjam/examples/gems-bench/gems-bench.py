@@ -1,4 +1,5 @@
 import random
+import sys
 
 import glm
 import pygame as pg
@@ -20,6 +21,12 @@ class JamSprites(application.Game):
         self.set_framerate(60)
         self.set_assets_root('../../assets')
 
+        # run with --instanced to compare the instanced sprite batch with the default one
+        self.set_sprite_batch_instanced('--instanced' in sys.argv)
+
+        # run with --compressed to store the textures as S3TC blocks on the GPU
+        self.set_texture_compression_enabled('--compressed' in sys.argv)
+
         self.animations = {}
         self.gem_types = ['yellow', 'ice', 'blue', 'red', 'purple', 'orange', 'green']
 
@@ -153,7 +160,9 @@ class JamSpritesState(application.GameState):
             self.text_fps.color = pg.Color('red')
 
         self.text_sprites_count.text = f'Sprites: {len(self.game.sprites) - 4}'
-        self.text_draw_mode.text = f'Sort mode: {self.game.get_sprite_batch_sort_mode().name}'
+        self.text_draw_mode.text = f'Sort mode: {self.game.get_sprite_batch_sort_mode().name}' \
+                                   f' - Draw calls: {self.game.get_sprite_batch().draw_calls}' \
+                                   f' - Culled: {self.game.sprites_culled}'
 
 
 if __name__ == '__main__':
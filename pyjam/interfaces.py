@@ -2,11 +2,24 @@ from abc import ABC, abstractmethod
 
 
 class IDisposable(ABC):
+    # no __dict__ for the slotted classes deriving from the interfaces
+    __slots__ = ()
+
     @abstractmethod
     def dispose(self):
         pass
 
 
+class ITextureAsset(ABC):
+    """ An asset drawing textures of the TextureService, unloaded with the last asset drawing them """
+    __slots__ = ()
+
+    @property
+    @abstractmethod
+    def textures(self) -> list:
+        pass
+
+
 """
 class IGameComponent(ABC):
     @abstractmethod
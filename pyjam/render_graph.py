@@ -0,0 +1,86 @@
+import moderngl as mgl
+import pygame as pg
+
+from pyjam.interfaces import IDisposable
+from pyjam.texture import Texture2D
+
+# alpha blending of the colors while the alpha accumulates the coverage, the texels of render targets cleared to
+# transparent black then hold colors premultiplied by their alpha
+OFFSCREEN_BLENDING = (mgl.SRC_ALPHA, mgl.ONE_MINUS_SRC_ALPHA, mgl.ONE, mgl.ONE_MINUS_SRC_ALPHA)
+# to draw the texture of a render target over another one
+PREMULTIPLIED_BLENDING = (mgl.ONE, mgl.ONE_MINUS_SRC_ALPHA)
+
+
+class RenderTarget(IDisposable):
+    """
+    An offscreen framebuffer a render pass can draw into.
+    Its color texture can then be drawn by a later pass like any other texture.
+    """
+
+    def __init__(self, game, width: int, height: int, texture_filter=mgl.NEAREST):
+        ctx = game.ctx
+        mgltex = ctx.texture(size=(width, height), components=4)
+        mgltex.filter = (texture_filter, texture_filter)
+        self.__texture = Texture2D(mgltex)
+        self.__depth = ctx.depth_renderbuffer(size=(width, height))
+        self.__fbo = ctx.framebuffer(color_attachments=[mgltex], depth_attachment=self.__depth)
+
+    @property
+    def width(self) -> int:
+        return self.__texture.width
+
+    @property
+    def height(self) -> int:
+        return self.__texture.height
+
+    @property
+    def texture(self) -> Texture2D:
+        return self.__texture
+
+    @property
+    def fbo(self) -> mgl.Framebuffer:
+        return self.__fbo
+
+    def use(self):
+        # binding the framebuffer also sets the viewport to the whole target
+        self.__fbo.use()
+
+    def dispose(self):
+        self.__fbo.release()
+        self.__depth.release()
+        self.__texture.dispose()
+
+
+class RenderPass:
+    """
+    A named step of the frame render graph (see Game.add_render_pass).
+
+    The pass begins the sprite batch with its own settings, calls render(sprite_batch) to submit its sprites
+    and ends the batch, drawing into target or, when target is None, into the screen viewport.
+    When clear_color is set, the target is cleared before drawing.
+    blend_func defaults to mgl.DEFAULT_BLENDING into the screen and OFFSCREEN_BLENDING into a target,
+    passes drawing the texture of a target use PREMULTIPLIED_BLENDING.
+    sort_mode and transform_matrix default to the game ones when None
+    (see Game.set_sprite_batch_sort_mode and Game.get_virtual_matrix).
+    """
+
+    def __init__(self, name: str, render,
+                 sort_mode=None,
+                 blend_func=None,
+                 blend_equation=mgl.FUNC_ADD,
+                 depth_test_enabled=False,
+                 transform_matrix=None,
+                 target: RenderTarget = None,
+                 clear_color: pg.Color = None):
+        self.name = name
+        self.render = render
+        self.sort_mode = sort_mode
+        self.blend_func = blend_func
+        self.blend_equation = blend_equation
+        self.depth_test_enabled = depth_test_enabled
+        self.transform_matrix = transform_matrix
+        self.target = target
+        self.clear_color = clear_color
+
+        # disabled passes are skipped
+        self.enabled = True
@@ -1,13 +1,19 @@
 import os
 
-from pyjam.interfaces import IDisposable
+from pyjam.constants import *
+from pyjam.interfaces import IDisposable, ITextureAsset
 
 
 class AssetService(IDisposable):
-    def __init__(self):
+    def __init__(self, game):
+        self.__game = game
+
         # a dict where the key is the AssetType and the value is another dict of that type of assets
         self._assets = {}
 
+        # reference counts of the assets taken with acquire, keyed by path
+        self._ref_counts = {}
+
     @staticmethod
     def get_path_and_asset_key(fullpath: str) -> tuple:
         basename = os.path.basename(fullpath)
@@ -30,10 +36,45 @@ class AssetService(IDisposable):
         path_and_asset_key = AssetService.get_path_and_asset_key(path)
         asset_dict = self._assets.get(path_and_asset_key[0])
         if asset_dict is not None:
-            elem = asset_dict[path_and_asset_key[1]].pop()
-            elem.dispose()
+            elem = asset_dict.pop(path_and_asset_key[1])
+            self._ref_counts.pop(path, None)
+            if isinstance(elem, IDisposable):
+                elem.dispose()
+            if isinstance(elem, ITextureAsset):
+                # the textures no other asset draws are released from the GPU
+                self.__game.services[TEXTURE_SERVICE].unload_unreferenced(elem.textures)
+            return elem
         else:
             raise KeyError()
 
+    def acquire(self, path):
+        """
+        Returns the asset and takes a reference to it, released with release.
+        """
+        asset = self.get(path)
+        self._ref_counts[path] = self._ref_counts.get(path, 0) + 1
+        return asset
+
+    def release(self, path):
+        """
+        Releases a reference taken with acquire, the asset is removed (and disposed) with its last reference,
+        see pop.
+        """
+        count = self._ref_counts.get(path, 0)
+        if count <= 0:
+            raise Exception(f'Asset not acquired: {path}')
+        if count == 1:
+            self.pop(path)
+        else:
+            self._ref_counts[path] = count - 1
+
+    def ref_count(self, path) -> int:
+        return self._ref_counts.get(path, 0)
+
+    def referenced_textures(self) -> set:
+        """ The textures drawn by the assets of the service """
+        return {texture2d for asset_dict in self._assets.values() for asset in asset_dict.values()
+                if isinstance(asset, ITextureAsset) for texture2d in asset.textures}
+
     def dispose(self):
         pass
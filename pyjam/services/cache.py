@@ -0,0 +1,109 @@
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import threading
+from contextlib import contextmanager
+
+from pyjam.interfaces import IDisposable
+
+# header of the cached pixels files: magic, source mtime (ns), source size, width, height, components
+_PIXELS_HEADER = struct.Struct('<4sqqIII')
+_PIXELS_MAGIC = b'PJTX'
+
+
+class AssetCacheService(IDisposable):
+    """
+    An on-disk cache of preprocessed assets: decoded texture pixels and parsed frame or glyph tables.
+
+    Entries are keyed by the path of the source file and store its modification time and size,
+    an entry whose source has changed is ignored and overwritten on the next store.
+    When cache_dir is None the cache is disabled.
+    """
+
+    def __init__(self, cache_dir: str = None):
+        self.__cache_dir = cache_dir
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.__cache_dir is not None
+
+    def __entry_path(self, source: str, kind: str) -> str:
+        key = hashlib.sha1(os.path.abspath(source).encode('utf-8')).hexdigest()
+        return os.path.join(self.__cache_dir, f'{key}.{kind}')
+
+    @staticmethod
+    def __stamp(source: str) -> tuple:
+        st = os.stat(source)
+        return st.st_mtime_ns, st.st_size
+
+    def __write(self, path: str, *chunks):
+        # written aside and renamed, so that an interrupted write never leaves a corrupted entry
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+
+    def load(self, source: str, kind: str):
+        """
+        Returns the object stored for source (e.g. a table parsed from it), or None when missing or stale.
+        """
+        if not self.enabled:
+            return None
+        try:
+            with open(self.__entry_path(source, kind), 'rb') as f:
+                stamp, value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        if stamp != AssetCacheService.__stamp(source):
+            return None
+        return value
+
+    def store(self, source: str, kind: str, value):
+        if self.enabled:
+            self.__write(self.__entry_path(source, kind),
+                         pickle.dumps((AssetCacheService.__stamp(source), value), pickle.HIGHEST_PROTOCOL))
+
+    @contextmanager
+    def mapped_pixels(self, source: str):
+        """
+        Maps the cached pixels of the image source in memory.
+        Yields (width, height, components, pixels) with pixels a memoryview valid inside the with block,
+        or None when missing or stale.
+        """
+        if not self.enabled:
+            yield None
+            return
+        try:
+            f = open(self.__entry_path(source, 'pixels'), 'rb')
+        except OSError:
+            yield None
+            return
+
+        with f:
+            header = f.read(_PIXELS_HEADER.size)
+            if len(header) < _PIXELS_HEADER.size:
+                yield None
+                return
+            magic, mtime_ns, size, width, height, components = _PIXELS_HEADER.unpack(header)
+            if magic != _PIXELS_MAGIC or (mtime_ns, size) != AssetCacheService.__stamp(source) or \
+                    os.fstat(f.fileno()).st_size != _PIXELS_HEADER.size + width * height * components:
+                yield None
+                return
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm)[_PIXELS_HEADER.size:] as pixels:
+                    yield width, height, components, pixels
+
+    def store_pixels(self, source: str, width: int, height: int, components: int, pixels: bytes):
+        if self.enabled:
+            mtime_ns, size = AssetCacheService.__stamp(source)
+            header = _PIXELS_HEADER.pack(_PIXELS_MAGIC, mtime_ns, size, width, height, components)
+            self.__write(self.__entry_path(source, 'pixels'), header, pixels)
+
+    def dispose(self):
+        pass
@@ -0,0 +1,30 @@
+import os
+
+from pyjam.interfaces import IDisposable
+from pyjam.sprites.dynamic_font import DynamicFont
+from pyjam.constants import *
+
+
+class FontService(IDisposable):
+    def __init__(self, game):
+        self.__game = game
+        # DynamicFont keyed by (filename, size)
+        self.__fonts = {}
+
+    def load_font(self, filename: str, size: int, page_size: int = 256, max_page_size: int = 2048) -> DynamicFont:
+        """
+        Returns the DynamicFont of a TrueType font file at the given size, created on the first call.
+        filename is relative to the assets root, None for the default pygame font.
+        The font is also inserted in the AssetService as '<filename without extension>-<size>'.
+        """
+        font = self.__fonts.get((filename, size))
+        if font is None:
+            font = DynamicFont(self.__game, filename, size, page_size, max_page_size)
+            self.__fonts[(filename, size)] = font
+            if filename is not None:
+                self.__game.services[ASSET_SERVICE].insert(f'{os.path.splitext(filename)[0]}-{size}', font)
+        return font
+
+    def dispose(self):
+        [font.dispose() for font in self.__fonts.values()]
+        self.__fonts.clear()
@@ -8,16 +8,23 @@ class ShaderService(IDisposable):
     def __init__(self, game: 'pyjam.application.Game', shader_folder: str = ''):
         self.__game = game
         self.programs = {SHADER_DEFAULT_SPRITES: self.get_program(shader_folder, SHADER_DEFAULT_SPRITES),
-                         SHADER_UNTEXTURED: self.get_program(shader_folder, SHADER_UNTEXTURED)}
+                         SHADER_UNTEXTURED: self.get_program(shader_folder, SHADER_UNTEXTURED),
+                         SHADER_INSTANCED_SPRITES: self.get_program(shader_folder, SHADER_INSTANCED_SPRITES),
+                         # distance field glyphs share the vertex shaders of the sprites, see SpriteFont.load
+                         SHADER_SDF_SPRITES: self.get_program(shader_folder, SHADER_DEFAULT_SPRITES,
+                                                              SHADER_SDF_SPRITES),
+                         SHADER_INSTANCED_SDF_SPRITES: self.get_program(shader_folder, SHADER_INSTANCED_SPRITES,
+                                                                        SHADER_SDF_SPRITES)}
 
-    def get_program(self, shader_folder: str, shader_name: str) -> mgl.program:
+    def get_program(self, shader_folder: str, shader_name: str, fragment_shader_name: str = None) -> mgl.program:
+        """ fragment_shader_name defaults to shader_name """
         if shader_folder == '':
             shader_folder = pyjam.get_data('shaders')
 
         with open(f'{shader_folder}/{shader_name}.vert') as file:
             vertex_shader = file.read()
 
-        with open(f'{shader_folder}/{shader_name}.frag') as file:
+        with open(f'{shader_folder}/{fragment_shader_name or shader_name}.frag') as file:
             fragment_shader = file.read()
 
         return self.__game.ctx.program(vertex_shader=vertex_shader, fragment_shader=fragment_shader)
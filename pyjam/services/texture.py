@@ -1,4 +1,7 @@
+import fnmatch
 import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import moderngl as mgl
 import pygame as pg
@@ -7,26 +10,182 @@ import PIL.ImageOps
 
 from pyjam.interfaces import IDisposable
 from pyjam.sprites.frame import SpriteFrame
-from pyjam.texture import Texture2D
+from pyjam.texture import Texture2D, TextureSampling, GL_COMPRESSED_RGBA_S3TC_DXT5_EXT, S3TC_EXTENSION
 from pyjam.constants import *
 
 
+# empty pixels around each texture packed into an atlas page, filled with the texture borders to avoid bleeding
+ATLAS_PADDING = 2
+
+
 class TextureService(IDisposable):
     def __init__(self, game):
         super().__init__()
         self.__game = game
         self.__texture2d_list = []
 
+        # sources waiting to be packed into the atlas, in registration order
+        self.__atlas_sources = []
+
+        # textures decoded and uploaded by preload_textures, keyed by path, waiting for load_texture
+        self.__preloaded = {}
+
+        # residency: textures loaded from files are loaded on first use when lazy loading is enabled,
+        # and the least recently drawn ones are evicted from the GPU when the memory budget is exceeded
+        self.__lazy_loading = game.is_texture_lazy_loading()
+        self.__memory_budget = game.get_texture_memory_budget()
+        self.__lru = OrderedDict()
+        self.__used_this_frame = set()
+
+        # textures released during the frame, disposed by trim once the batches drawing them are flushed
+        self.__released = []
+
+        # sampling of the textures loaded from files: (pattern, sampling) rules matched against the asset paths,
+        # the last matching rule wins, the default sampling applies when none matches
+        self.__default_sampling = game.get_default_texture_sampling()
+        self.__sampling_rules = []
+
+        # compression of the textures loaded from files, (pattern, compressed) rules as for the sampling,
+        # the driver compresses the pixels on upload, when it supports S3TC
+        self.__s3tc_supported = S3TC_EXTENSION in game.ctx.extensions
+        self.__default_compression = game.is_texture_compression_enabled()
+        self.__compression_rules = []
+
+    def set_sampling_rule(self, pattern: str, sampling: TextureSampling):
+        """
+        Sets the sampling of the textures whose asset path matches pattern (an fnmatch pattern,
+        e.g. 'textures/retro-*.png'). Only applies to the textures loaded afterwards.
+        """
+        self.__sampling_rules.append((pattern, sampling))
+
+    def get_sampling(self, path: str) -> TextureSampling:
+        return TextureService.__match_rules(self.__sampling_rules, path, self.__default_sampling)
+
+    def set_compression_rule(self, pattern: str, compressed: bool):
+        """
+        Sets whether the textures whose asset path matches pattern are compressed on the GPU (4 times less memory
+        than RGBA, at the cost of some color accuracy). Only applies to the textures loaded afterwards.
+        """
+        self.__compression_rules.append((pattern, compressed))
+
+    def is_compressed(self, path: str) -> bool:
+        compressed = TextureService.__match_rules(self.__compression_rules, path, self.__default_compression)
+        return compressed and self.__s3tc_supported
+
+    @staticmethod
+    def __match_rules(rules: list, path: str, default):
+        for pattern, value in reversed(rules):
+            if fnmatch.fnmatchcase(path, pattern):
+                return value
+        return default
+
     def load_sprite_frame(self, path: str) -> SpriteFrame:
         sprite_frame = SpriteFrame(self.load_texture(path))
         self.__game.services[ASSET_SERVICE].insert(path, sprite_frame)
         return sprite_frame
 
     def load_texture(self, path: str) -> Texture2D:
+        texture2d = self.__preloaded.pop(path, None)
+        if texture2d is not None:
+            return texture2d
+
+        fname = os.path.join(self.__game.get_assets_root(), path)
+        sampling = self.get_sampling(path)
+        compressed = self.is_compressed(path)
+        if self.__lazy_loading:
+            texture2d = self.__file_texture(path, fname, sampling, compressed, None)
+        else:
+            texture2d = self.__file_texture(path, fname, sampling, compressed,
+                                            self.__load_mgl_texture(fname, sampling, compressed))
+
+        #surface = pg.image.load(path)
+        #rgba_surface = surface.convert_alpha()
+        #texture2d = self._from_pg_surface(rgba_surface, path)
+
+        return texture2d
+
+    def preload_textures(self, paths, on_progress=None, max_workers: int = None):
+        """
+        Decodes the given image files on a thread pool, then uploads each one to the GPU on the calling thread
+        as soon as it is decoded. The next load_texture of each path returns the preloaded texture.
+        on_progress(loaded_count, total_count, path) is called after each upload.
+        """
+        paths = [path for path in dict.fromkeys(paths) if path not in self.__preloaded]
         asset_root = self.__game.get_assets_root()
+        loaded_count = 0
+
+        def loaded(path, mgltex):
+            nonlocal loaded_count
+            loaded_count += 1
+            self.__preloaded[path] = self.__file_texture(path, os.path.join(asset_root, path),
+                                                         self.get_sampling(path), self.is_compressed(path), mgltex)
+            if on_progress is not None:
+                on_progress(loaded_count, len(paths), path)
 
-        fname = os.path.join(asset_root, path)
-        print(f'Loading file: {fname}')
+        # cached pixels are uploaded right away, the other images are decoded first
+        to_decode = []
+        for path in paths:
+            mgltex = self.__load_cached(os.path.join(asset_root, path), self.get_sampling(path),
+                                        self.is_compressed(path))
+            if mgltex is None:
+                to_decode.append(path)
+            else:
+                loaded(path, mgltex)
+
+        # Pillow releases the GIL while decoding, GL calls must stay on the thread owning the context
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.__decode, os.path.join(asset_root, path)): path for path in to_decode}
+            for future in as_completed(futures):
+                size, pixels = future.result()
+                path = futures[future]
+                loaded(path, self.__create_mgl_texture(size, 4, pixels, self.get_sampling(path),
+                                                       self.is_compressed(path)))
+
+    def __file_texture(self, path: str, fname: str, sampling: TextureSampling, compressed: bool,
+                       mgltex) -> Texture2D:
+        # textures loaded from files can always be loaded again, so they can be evicted
+        def loader():
+            return self.__load_mgl_texture(fname, sampling, compressed)
+
+        if mgltex is None:
+            texture2d = Texture2D(loader=loader, size=self.__image_size(fname), name=path, sampling=sampling,
+                                  compressed=compressed)
+        else:
+            texture2d = Texture2D(mgltex, loader=loader, name=path, sampling=sampling, compressed=compressed)
+        self.__track(texture2d)
+        return texture2d
+
+    def __load_mgl_texture(self, fname: str, sampling: TextureSampling, compressed: bool):
+        mgltex = self.__load_cached(fname, sampling, compressed)
+        if mgltex is None:
+            size, pixels = self.__decode(fname)
+            mgltex = self.__create_mgl_texture(size, 4, pixels, sampling, compressed)
+        return mgltex
+
+    def __image_size(self, fname: str) -> tuple:
+        # without decoding the pixels
+        with self.__game.services[ASSET_CACHE_SERVICE].mapped_pixels(fname) as cached:
+            if cached is not None:
+                return cached[0], cached[1]
+        with PIL.Image.open(fname) as img:
+            return img.size
+
+    def __load_cached(self, fname: str, sampling: TextureSampling, compressed: bool):
+        with self.__game.services[ASSET_CACHE_SERVICE].mapped_pixels(fname) as cached:
+            if cached is None:
+                return None
+            width, height, components, pixels = cached
+            return self.__create_mgl_texture((width, height), components, pixels, sampling, compressed)
+
+    def __decode(self, fname: str) -> tuple:
+        img = TextureService._decode_image(fname)
+        pixels = img.tobytes()
+        self.__game.services[ASSET_CACHE_SERVICE].store_pixels(fname, img.width, img.height, 4, pixels)
+        return img.size, pixels
+
+    @staticmethod
+    def _decode_image(fname: str):
+        # textures are stored upside down, as OpenGL expects the first row at the bottom
         img = PIL.ImageOps.flip(PIL.Image.open(fname))
         rgba_img = img.convert('RGBA')
 
@@ -36,44 +195,239 @@ class TextureService(IDisposable):
             channels[3].paste(img)
             rgba_img = PIL.Image.merge('RGBA', channels)
 
-        texture2d = self._from_pillow_image(rgba_img)
-        self.__texture2d_list.append(texture2d)
-
-        #surface = pg.image.load(path)
-        #rgba_surface = surface.convert_alpha()
-        #texture2d = self._from_pg_surface(rgba_surface, path)
-
-        return texture2d
+        return rgba_img
 
     def create_color_texture(self, color: pg.Color) -> Texture2D:
         surface = pg.Surface((1, 1), pg.SRCALPHA)
         surface.fill(color)
-        texture2d = self._from_pg_surface(surface)
+        # a single texel looks the same with any filtering
+        texture2d = self._from_pg_surface(surface, TextureSampling.PIXEL_ART)
         return texture2d
 
-    def _from_pillow_image(self, img) -> Texture2D:
-        components = len(img.getbands())
-        mgltex = self.__game.ctx.texture(size=img.size, components=components,
-                                         data=img.tobytes())
+    def add_to_atlas(self, source):
+        """
+        Registers a SpriteFrame or a SpriteSheet to be packed into the texture atlas by pack_atlas.
+        """
+        self.__atlas_sources.append(source)
+
+    def pack_atlas(self, page_size: int = 1024) -> list:
+        """
+        Packs the textures of the registered sources into shared atlas pages, so sprites using them
+        can be drawn without binding a different texture.
+        The registered frames (and sprite sheets) are rewritten to refer to the atlas pages,
+        textures that don't fit in a page and distance fields are left unpacked.
+        The packed textures no asset of the AssetService still draws are unloaded, frames kept outside of the
+        AssetService must be registered too, or not refer to the packed textures anymore.
+        Returns the list of the Texture2D atlas pages.
+        """
+        # the frames referring to each texture, keyed by texture so that shared textures are packed once
+        frames = {}
+        sheets = []
+        for source in self.__atlas_sources:
+            if isinstance(source, SpriteFrame):
+                frames.setdefault(source.texture, []).append(source)
+            else:
+                sheets.append(source)
+                for frame in source.frames.values():
+                    frames.setdefault(frame.texture, []).append(frame)
+        self.__atlas_sources.clear()
+
+        # shelf packing, tallest textures first
+        # distance fields are drawn with another shader than the textures they would share a page with
+        textures = sorted((t for t in frames.keys() if not t.distance_field), key=lambda t: t.height, reverse=True)
+        pages = []
+        placements = {}
+        page_image = None
+        shelf_x = shelf_y = shelf_height = 0
+        for texture in textures:
+            w = texture.width + 2 * ATLAS_PADDING
+            h = texture.height + 2 * ATLAS_PADDING
+            if w > page_size or h > page_size:
+                continue
+
+            if page_image is not None and shelf_x + w > page_size:
+                shelf_x = 0
+                shelf_y += shelf_height
+                shelf_height = 0
+            if page_image is None or shelf_y + h > page_size:
+                page_image = PIL.Image.new('RGBA', (page_size, page_size))
+                pages.append(page_image)
+                shelf_x = shelf_y = shelf_height = 0
+
+            x = shelf_x + ATLAS_PADDING
+            y = shelf_y + ATLAS_PADDING
+            TextureService._paste_extruded(page_image, self._to_pillow_image(texture), x, y)
+            placements[texture] = (len(pages) - 1, x, y)
 
-        return TextureService._setup_texture(mgltex)
+            shelf_x += w
+            shelf_height = max(shelf_height, h)
+
+        # the pages keep the sampling of the packed textures when they all agree, and are compressed when they all are
+        samplings = {texture.sampling for texture in placements}
+        sampling = samplings.pop() if len(samplings) == 1 and None not in samplings else self.__default_sampling
+        compressed = len(placements) > 0 and all(texture.compressed for texture in placements)
+        page_textures = [self._from_pillow_image(PIL.ImageOps.flip(page), sampling, compressed) for page in pages]
+        for page_texture in page_textures:
+            self.__track(page_texture)
+
+        for texture, (page, x, y) in placements.items():
+            for frame in frames[texture]:
+                frame.texture = page_textures[page]
+                frame.rect = frame.rect.move(x, y)
+
+        for sheet in sheets:
+            if sheet.texture2d in placements:
+                sheet.texture2d = page_textures[placements[sheet.texture2d][0]]
+
+        # the pages hold copies of the packed textures
+        self.unload_unreferenced(placements.keys())
+
+        return page_textures
+
+    @staticmethod
+    def _to_pillow_image(texture: Texture2D):
+        # textures are stored upside down, see load_texture
+        img = PIL.Image.frombytes('RGBA', (texture.width, texture.height), texture.mgl_texture.read())
+        return PIL.ImageOps.flip(img)
+
+    @staticmethod
+    def _paste_extruded(page, img, x: int, y: int):
+        w, h = img.size
+        p = ATLAS_PADDING
+        page.paste(img, (x, y))
 
-    def _from_pg_surface(self, surface: pg.Surface) -> Texture2D:
+        # repeat the border pixels into the padding
+        page.paste(img.crop((0, 0, w, 1)).resize((w, p), PIL.Image.NEAREST), (x, y - p))
+        page.paste(img.crop((0, h - 1, w, h)).resize((w, p), PIL.Image.NEAREST), (x, y + h))
+        page.paste(img.crop((0, 0, 1, h)).resize((p, h), PIL.Image.NEAREST), (x - p, y))
+        page.paste(img.crop((w - 1, 0, w, h)).resize((p, h), PIL.Image.NEAREST), (x + w, y))
+        page.paste(img.crop((0, 0, 1, 1)).resize((p, p), PIL.Image.NEAREST), (x - p, y - p))
+        page.paste(img.crop((w - 1, 0, w, 1)).resize((p, p), PIL.Image.NEAREST), (x + w, y - p))
+        page.paste(img.crop((0, h - 1, 1, h)).resize((p, p), PIL.Image.NEAREST), (x - p, y + h))
+        page.paste(img.crop((w - 1, h - 1, w, h)).resize((p, p), PIL.Image.NEAREST), (x + w, y + h))
+
+    def _from_pillow_image(self, img, sampling: TextureSampling = None, compressed: bool = False) -> Texture2D:
+        return self._from_pixels(img.size, len(img.getbands()), img.tobytes(), sampling, compressed)
+
+    def _from_pixels(self, size: tuple, components: int, pixels, sampling: TextureSampling = None,
+                     compressed: bool = False) -> Texture2D:
+        sampling = sampling or self.__default_sampling
+        compressed = compressed and components == 4
+        return Texture2D(self.__create_mgl_texture(size, components, pixels, sampling, compressed),
+                         sampling=sampling, compressed=compressed)
+
+    def __create_mgl_texture(self, size: tuple, components: int, pixels, sampling: TextureSampling,
+                             compressed: bool = False):
+        if compressed:
+            # the RGBA pixels are compressed by the driver while uploading
+            mgltex = self.__game.ctx.texture(size=size, components=components, data=pixels,
+                                             internal_format=GL_COMPRESSED_RGBA_S3TC_DXT5_EXT)
+        else:
+            mgltex = self.__game.ctx.texture(size=size, components=components, data=pixels)
+
+        return TextureService._setup_sampling(mgltex, sampling)
+
+    def _from_pg_surface(self, surface: pg.Surface, sampling: TextureSampling = None) -> Texture2D:
         flipped_surface = pg.transform.flip(surface, flip_x=False, flip_y=True)
         mgltex = self.__game.ctx.texture(size=flipped_surface.get_size(), components=4,
                                          data=pg.image.tostring(flipped_surface, 'RGBA'))
-        return TextureService._setup_texture(mgltex)
+        return TextureService._setup_texture(mgltex, sampling or self.__default_sampling)
 
     @staticmethod
-    def _setup_texture(mgltex) -> Texture2D:
-        # mipmaps
-        mgltex.filter = (mgl.LINEAR_MIPMAP_LINEAR, mgl.LINEAR)
-        mgltex.build_mipmaps(max_level=10)
+    def _setup_texture(mgltex, sampling: TextureSampling = TextureSampling.MIPMAPPED) -> Texture2D:
+        return Texture2D(TextureService._setup_sampling(mgltex, sampling), sampling=sampling)
+
+    @staticmethod
+    def _setup_sampling(mgltex, sampling: TextureSampling = TextureSampling.MIPMAPPED):
+        if sampling == TextureSampling.PIXEL_ART:
+            # no mipmaps to build, and nothing for anisotropic filtering to do
+            mgltex.filter = (mgl.NEAREST, mgl.NEAREST)
+            mgltex.anisotropy = 1.0
+        elif sampling == TextureSampling.LINEAR:
+            mgltex.filter = (mgl.LINEAR, mgl.LINEAR)
+            mgltex.anisotropy = 1.0
+        else:
+            # mipmaps
+            mgltex.filter = (mgl.LINEAR_MIPMAP_LINEAR, mgl.LINEAR)
+            mgltex.build_mipmaps(max_level=10)
+
+            # anisotropic filtering
+            mgltex.anisotropy = 16.0
+
+        return mgltex
+
+    def __track(self, texture2d: Texture2D):
+        self.__texture2d_list.append(texture2d)
+        texture2d.on_use = self.__on_texture_use
+
+    def __on_texture_use(self, texture2d: Texture2D):
+        if texture2d.evictable:
+            self.__lru[texture2d] = None
+            self.__lru.move_to_end(texture2d)
+        self.__used_this_frame.add(texture2d)
+
+    @property
+    def resident_bytes(self) -> int:
+        """ GPU memory used by the textures of the service """
+        return sum(texture2d.byte_size for texture2d in self.__texture2d_list)
+
+    def memory_report(self) -> list:
+        """
+        Returns a (name, byte_size, resident) tuple for each texture of the service, largest first.
+        """
+        report = [(texture2d.name, texture2d.byte_size, texture2d.resident) for texture2d in self.__texture2d_list]
+        return sorted(report, key=lambda item: item[1], reverse=True)
+
+    def trim(self):
+        """
+        Called once per frame: evicts the least recently drawn textures until the resident ones fit in the memory
+        budget. Textures drawn in the current frame are never evicted. Also disposes the released textures.
+        """
+        for texture2d in self.__released:
+            if texture2d in self.__texture2d_list:
+                self.unload_texture(texture2d)
+            else:
+                texture2d.dispose()
+        self.__released.clear()
+
+        if self.__memory_budget is not None:
+            used = self.resident_bytes
+            # textures never drawn (e.g. the ones packed into the atlas) come first
+            never_drawn = [texture2d for texture2d in self.__texture2d_list
+                           if texture2d.evictable and texture2d.resident and texture2d not in self.__lru]
+            for texture2d in never_drawn + list(self.__lru):
+                if used <= self.__memory_budget:
+                    break
+                if texture2d in self.__used_this_frame:
+                    continue
+                used -= texture2d.byte_size
+                texture2d.evict()
+                self.__lru.pop(texture2d, None)
+        self.__used_this_frame.clear()
+
+    def release_texture(self, texture2d: Texture2D):
+        """
+        Disposes a texture at the end of the frame, for textures replaced while sprites using them may still be
+        waiting in a batch, e.g. the pages of a DynamicFont.
+        """
+        self.__released.append(texture2d)
 
-        # Disable anisotropic Filtering
-        mgltex.anisotropy = 16.0
+    def unload_unreferenced(self, textures):
+        """
+        Unloads the textures of the service among textures that no asset of the AssetService draws anymore,
+        e.g. the ones of an asset just removed. Frames kept outside of the AssetService must not draw them anymore.
+        """
+        referenced = self.__game.services[ASSET_SERVICE].referenced_textures()
+        for texture2d in set(textures):
+            if texture2d in self.__texture2d_list and texture2d not in referenced:
+                self.unload_texture(texture2d)
 
-        return Texture2D(mgltex)
+    def unload_texture(self, texture2d: Texture2D):
+        """ Disposes a texture of the service, it can't be used anymore """
+        self.__texture2d_list.remove(texture2d)
+        self.__lru.pop(texture2d, None)
+        self.__used_this_frame.discard(texture2d)
+        texture2d.dispose()
 
     def dispose(self):
         [texture2d.dispose() for texture2d in self.__texture2d_list]
@@ -5,6 +5,7 @@
 # ------------------------------------------------------------------------------
 
 import copy
+import math
 
 import glm
 import pygame as pg
@@ -19,6 +20,12 @@ import pyjam.utils as utils
 
 
 class Sprite:
+    __slots__ = ('__hotspot', '__position', '__size', '__angle', '__scale', '__color', '__packed_color', '__frame',
+                 '__animation', '__active', '__visible', '__layer_depth', '__shape', '__scissor', '__quad',
+                 '__quad_dirty', '__quad_instanced', '__quad_position', '__quad_hotspot', '__quad_size',
+                 '__quad_scale', '__quad_rect', '__cull_bounds', '__bounds_dirty', '__bounds_position',
+                 '__bounds_hotspot', '__bounds_size', '__bounds_scale')
+
     def __init__(self, frame: SpriteFrame):
         # sprite hotspot  - x, y
         self.__hotspot = glm.vec2(0, 0)
@@ -35,8 +42,9 @@ class Sprite:
         # sprite scaling factor
         self.__scale = glm.vec2(1, 1)
 
-        # sprite color
+        # sprite color, also kept packed as the batcher stores it (see utils.pack_color)
         self.__color = pg.Color('white')
+        self.__packed_color = 0xFFFFFFFF
 
         # sprite frame (texture + rect)
         self.__frame = frame
@@ -58,6 +66,25 @@ class Sprite:
 
         self.__scissor = None
 
+        # vertices built by the last render, drawn again as long as the sprite doesn't change.
+        # Setters invalidate them, the vectors are compared too, as they can be changed in place
+        self.__quad = None
+        self.__quad_dirty = True
+        self.__quad_instanced = False
+        self.__quad_position = None
+        self.__quad_hotspot = None
+        self.__quad_size = None
+        self.__quad_scale = None
+        self.__quad_rect = None
+
+        # world space (left, top, right, bottom) used for visibility culling, cached the same way as the quad
+        self.__cull_bounds = None
+        self.__bounds_dirty = True
+        self.__bounds_position = None
+        self.__bounds_hotspot = None
+        self.__bounds_size = None
+        self.__bounds_scale = None
+
         if frame is not None:
             self.size = glm.vec2(frame.rect.w, frame.rect.h)
 
@@ -68,6 +95,7 @@ class Sprite:
     @hotspot.setter
     def hotspot(self, hs: glm.vec2):
         self.__hotspot = glm.vec2(hs)
+        self.__quad_dirty = True
 
     @property
     def position(self) -> glm.vec2:
@@ -76,6 +104,7 @@ class Sprite:
     @position.setter
     def position(self, pos: glm.vec2):
         self.__position = glm.vec2(pos)
+        self.__quad_dirty = True
 
     @property
     def x(self) -> float:
@@ -84,6 +113,7 @@ class Sprite:
     @x.setter
     def x(self, value: float):
         self.__position.x = value
+        self.__quad_dirty = True
 
     @property
     def y(self) -> float:
@@ -92,10 +122,12 @@ class Sprite:
     @y.setter
     def y(self, value: float):
         self.__position.y = value
+        self.__quad_dirty = True
 
     def move(self, dx: float = 0.0, dy: float = 0.0):
         self.__position.x += dx
         self.__position.y += dy
+        self.__quad_dirty = True
 
     @property
     def width(self) -> float:
@@ -113,6 +145,7 @@ class Sprite:
     def size(self, new_size: glm.vec2):
         self.__size = glm.vec2(new_size)
         self.__hotspot = self.__size / 2
+        self.__quad_dirty = True
         self.build_shape()
 
     @property
@@ -124,6 +157,8 @@ class Sprite:
         """ Sets the sprite's rotation angle in degrees """
 
         self.__angle = utils.wrap_angle_deg_180(value)
+        self.__quad_dirty = True
+        self.__bounds_dirty = True
 
     @property
     def scale(self) -> glm.vec2:
@@ -138,6 +173,7 @@ class Sprite:
         """
         self.__scale = glm.vec2(value)
         self.__hotspot *= self.__scale
+        self.__quad_dirty = True
 
     @property
     def color(self) -> pg.Color:
@@ -146,6 +182,8 @@ class Sprite:
     @color.setter
     def color(self, value: pg.Color):
         self.__color = pg.Color(value)
+        self.__packed_color = utils.pack_color(self.__color)
+        self.__quad_dirty = True
 
     @property
     def frame(self) -> SpriteFrame:
@@ -154,6 +192,7 @@ class Sprite:
     @frame.setter
     def frame(self, value: SpriteFrame):
         self.__frame = value
+        self.__quad_dirty = True
 
     @property
     def active(self) -> bool:
@@ -178,6 +217,7 @@ class Sprite:
     @layer_depth.setter
     def layer_depth(self, ldepth):
         self.__layer_depth = ldepth
+        self.__quad_dirty = True
 
     @property
     def shape(self):
@@ -208,6 +248,7 @@ class Sprite:
             if autostart:
                 self.__animation.restart()
             self.__frame = self.__animation.get_current_frame()
+            self.__quad_dirty = True
 
     def is_playing(self) -> bool:
         return self.__animation is not None and self.__animation.is_playing()
@@ -235,26 +276,78 @@ class Sprite:
         if self.active:
             if self.is_playing():
                 self.__animation.update(delta_time)
-                self.__frame = self.__animation.get_current_frame()
+                frame = self.__animation.get_current_frame()
+                if frame is not self.__frame:
+                    self.__frame = frame
+                    self.__quad_dirty = True
 
     def render(self, sprite_batch: SpriteBatch):
         if self.active and self.visible:
-            sprite_batch.draw(texture=self.__frame.texture,
-                              position=self.__position,
-                              source_rect=self.__frame.rect,
-                              rotation=self.__angle,
-                              color=self.__color,
-                              origin=self.__hotspot,
-                              scale=self.__scale,
-                              size=self.__size,
-                              effects=SpriteEffects.NONE,
-                              layer_depth=self.__layer_depth,
-                              scissor=self.__scissor)
+            if self.__is_quad_stale(sprite_batch):
+                self.__quad = sprite_batch.build_quad(texture=self.__frame.texture,
+                                                      position=self.__position,
+                                                      source_rect=self.__frame.rect,
+                                                      rotation=self.__angle,
+                                                      color=self.__packed_color,
+                                                      origin=self.__hotspot,
+                                                      scale=self.__scale,
+                                                      size=self.__size,
+                                                      effects=SpriteEffects.NONE,
+                                                      layer_depth=self.__layer_depth)
+                self.__quad_dirty = False
+                self.__quad_instanced = sprite_batch.instanced
+                self.__quad_position = glm.vec2(self.__position)
+                self.__quad_hotspot = glm.vec2(self.__hotspot)
+                self.__quad_size = glm.vec2(self.__size)
+                self.__quad_scale = glm.vec2(self.__scale)
+                self.__quad_rect = pg.Rect(self.__frame.rect)
+
+            sprite_batch.draw_quad(self.__frame.texture, self.__quad, self.__layer_depth, self.__scissor)
+
+    def __is_quad_stale(self, sprite_batch: SpriteBatch) -> bool:
+        return self.__quad_dirty or \
+            self.__quad_instanced != sprite_batch.instanced or \
+            self.__quad_position != self.__position or \
+            self.__quad_hotspot != self.__hotspot or \
+            self.__quad_size != self.__size or \
+            self.__quad_scale != self.__scale or \
+            self.__quad_rect != self.__frame.rect
 
     def build_shape(self):
         self.__shape = b2PolygonShape(
             box=(self.__size.x / 2, self.__size.y / 2, (0, 0), glm.radians(self.__angle)))
 
+    @property
+    def cull_bounds(self) -> tuple:
+        """
+        The (left, top, right, bottom) world space box the rendered sprite fits in, rotation included.
+        """
+        if self.__bounds_dirty or \
+                self.__bounds_position != self.__position or \
+                self.__bounds_hotspot != self.__hotspot or \
+                self.__bounds_size != self.__size or \
+                self.__bounds_scale != self.__scale:
+            self.__cull_bounds = self.__compute_cull_bounds()
+            self.__bounds_dirty = False
+            self.__bounds_position = glm.vec2(self.__position)
+            self.__bounds_hotspot = glm.vec2(self.__hotspot)
+            self.__bounds_size = glm.vec2(self.__size)
+            self.__bounds_scale = glm.vec2(self.__scale)
+        return self.__cull_bounds
+
+    def __compute_cull_bounds(self) -> tuple:
+        x, y = self.__position
+        left = -self.__hotspot.x
+        top = -self.__hotspot.y
+        right = left + self.__size.x * self.__scale.x
+        bottom = top + self.__size.y * self.__scale.y
+        if self.__angle == 0:
+            return x + left, y + top, x + right, y + bottom
+
+        # the sprite rotates around its position: any angle fits in the circle through the farthest corner
+        r = math.sqrt(max(left * left, right * right) + max(top * top, bottom * bottom))
+        return x - r, y - r, x + r, y + r
+
     @property
     def bounds(self) -> Bounds:
         # TODO handle sprite scale
@@ -0,0 +1,373 @@
+import glm
+import numpy as np
+import pygame as pg
+
+import pyjam.utils as utils
+from pyjam.core import Bounds
+from pyjam.sprites.batch import SpriteBatch
+from pyjam.sprites.frame import SpriteFrame
+
+
+class SpriteArray:
+    """
+    Many sprites stored as parallel NumPy columns, one row per sprite.
+
+    A sprite is addressed by the handle returned by add, which stays valid until the sprite is removed.
+    Frames are addressed by their index in the frames given to the constructor.
+    The whole array is animated, culled and submitted to the sprite batch in vectorized form,
+    the columns can be changed directly; view(handle) returns a Sprite-like object on a single row.
+    """
+
+    def __init__(self, frames, capacity: int = 256):
+        self.__frames = list(frames)
+
+        # frames lookup tables: texture of each frame (as an index in self.__textures) and its rect
+        self.__textures = []
+        frame_texture_ids = []
+        for frame in self.__frames:
+            if frame.texture not in self.__textures:
+                self.__textures.append(frame.texture)
+            frame_texture_ids.append(self.__textures.index(frame.texture))
+        self.__frame_texture_ids = np.array(frame_texture_ids, dtype='i4')
+        self.__frame_rects = np.array([(f.rect.x, f.rect.y, f.rect.w, f.rect.h) for f in self.__frames], dtype='f8')
+
+        # rows in use, removed rows are reused by add
+        self.__count = 0
+        self.__free = []
+
+        self.__capacity = 0
+        self.__alive = np.zeros(0, dtype=bool)
+        self.positions = np.zeros((0, 2))
+        self.sizes = np.zeros((0, 2))
+        self.hotspots = np.zeros((0, 2))
+        self.scales = np.zeros((0, 2))
+        self.angles = np.zeros(0)
+        self.colors = np.zeros(0, dtype='u4')
+        self.frame_indices = np.zeros(0, dtype='i4')
+        self.layer_depths = np.zeros(0)
+        self.visible_flags = np.zeros(0, dtype=bool)
+        self.active_flags = np.zeros(0, dtype=bool)
+
+        # animations, as a range of frames played at a given fps
+        self.anim_first_frames = np.zeros(0, dtype='i4')
+        self.anim_frame_counts = np.zeros(0, dtype='i4')
+        self.anim_fps = np.zeros(0)
+        self.anim_loops = np.zeros(0, dtype=bool)
+        self.anim_times = np.zeros(0)
+
+        self.__grow(max(capacity, 1))
+
+    @property
+    def frames(self) -> tuple:
+        return tuple(self.__frames)
+
+    @property
+    def count(self) -> int:
+        """ Number of rows in use, removed sprites included until their row is reused """
+        return self.__count
+
+    def __len__(self):
+        return self.__count - len(self.__free)
+
+    def __grow(self, capacity: int):
+        def resized(column):
+            grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:len(column)] = column
+            return grown
+
+        self.__alive = resized(self.__alive)
+        self.positions = resized(self.positions)
+        self.sizes = resized(self.sizes)
+        self.hotspots = resized(self.hotspots)
+        self.scales = resized(self.scales)
+        self.angles = resized(self.angles)
+        self.colors = resized(self.colors)
+        self.frame_indices = resized(self.frame_indices)
+        self.layer_depths = resized(self.layer_depths)
+        self.visible_flags = resized(self.visible_flags)
+        self.active_flags = resized(self.active_flags)
+        self.anim_first_frames = resized(self.anim_first_frames)
+        self.anim_frame_counts = resized(self.anim_frame_counts)
+        self.anim_fps = resized(self.anim_fps)
+        self.anim_loops = resized(self.anim_loops)
+        self.anim_times = resized(self.anim_times)
+        self.__capacity = capacity
+
+    def add(self, frame_index: int = 0, position=(0, 0), size=None, color: pg.Color = None,
+            layer_depth: float = 0.5) -> int:
+        """
+        Adds a sprite and returns its handle.
+        As with Sprite, size defaults to the frame size and the hotspot is the center of the sprite.
+        """
+        if self.__free:
+            handle = self.__free.pop()
+        else:
+            if self.__count == self.__capacity:
+                self.__grow(self.__capacity * 2)
+            handle = self.__count
+            self.__count += 1
+
+        rect = self.__frames[frame_index].rect
+        self.__alive[handle] = True
+        self.positions[handle] = position
+        self.sizes[handle] = (rect.w, rect.h) if size is None else size
+        self.hotspots[handle] = self.sizes[handle] / 2
+        self.scales[handle] = 1.0
+        self.angles[handle] = 0.0
+        self.colors[handle] = 0xFFFFFFFF if color is None else utils.pack_color(color)
+        self.frame_indices[handle] = frame_index
+        self.layer_depths[handle] = layer_depth
+        self.visible_flags[handle] = True
+        self.active_flags[handle] = True
+        self.anim_frame_counts[handle] = 0
+        return handle
+
+    def remove(self, handle: int):
+        self.check_handle(handle)
+        self.__alive[handle] = False
+        self.visible_flags[handle] = False
+        self.__free.append(handle)
+
+    def clear(self):
+        self.__alive[:] = False
+        self.visible_flags[:] = False
+        self.__count = 0
+        self.__free.clear()
+
+    def check_handle(self, handle: int):
+        if not 0 <= handle < self.__count or not self.__alive[handle]:
+            raise Exception(f'Invalid sprite handle: {handle}')
+
+    def view(self, handle: int) -> 'SpriteArrayView':
+        self.check_handle(handle)
+        return SpriteArrayView(self, handle)
+
+    def frame_index_of(self, frame: SpriteFrame) -> int:
+        return self.__frames.index(frame)
+
+    def play(self, handle: int, first_frame: int, frame_count: int, fps: float, loop: bool = True):
+        self.anim_first_frames[handle] = first_frame
+        self.anim_frame_counts[handle] = frame_count
+        self.anim_fps[handle] = fps
+        self.anim_loops[handle] = loop
+        self.anim_times[handle] = 0.0
+        self.frame_indices[handle] = first_frame
+
+    def stop(self, handle: int):
+        self.anim_frame_counts[handle] = 0
+
+    def update(self, delta_time: float):
+        n = self.__count
+        playing = self.__alive[:n] & self.active_flags[:n] & (self.anim_frame_counts[:n] > 0)
+        if not playing.any():
+            return
+
+        idx = np.flatnonzero(playing)
+        self.anim_times[idx] += delta_time
+        frames = (self.anim_times[idx] * self.anim_fps[idx]).astype('i4')
+        counts = self.anim_frame_counts[idx]
+        frames = np.where(self.anim_loops[idx], frames % counts, np.minimum(frames, counts - 1))
+        self.frame_indices[idx] = self.anim_first_frames[idx] + frames
+
+    def cull_bounds(self) -> tuple:
+        """
+        Returns the left, top, right, bottom columns of the world space boxes of all the rows,
+        computed like Sprite.cull_bounds.
+        """
+        n = self.__count
+        left = -self.hotspots[:n, 0]
+        top = -self.hotspots[:n, 1]
+        right = left + self.sizes[:n, 0] * self.scales[:n, 0]
+        bottom = top + self.sizes[:n, 1] * self.scales[:n, 1]
+
+        rotated = self.angles[:n] != 0
+        if rotated.any():
+            r = np.sqrt(np.maximum(left * left, right * right) + np.maximum(top * top, bottom * bottom))
+            left = np.where(rotated, -r, left)
+            top = np.where(rotated, -r, top)
+            right = np.where(rotated, r, right)
+            bottom = np.where(rotated, r, bottom)
+
+        x = self.positions[:n, 0]
+        y = self.positions[:n, 1]
+        return x + left, y + top, x + right, y + bottom
+
+    def render(self, sprite_batch: SpriteBatch, view_bounds: tuple = None) -> tuple:
+        """
+        Submits the visible sprites to the sprite batch, with one draw_many per texture.
+        Sprites outside view_bounds (left, top, right, bottom) are skipped.
+        Returns the number of sprites submitted and culled.
+        """
+        n = self.__count
+        mask = self.__alive[:n] & self.visible_flags[:n]
+        candidates = np.count_nonzero(mask)
+        if view_bounds is not None and candidates > 0:
+            left, top, right, bottom = self.cull_bounds()
+            view_left, view_top, view_right, view_bottom = view_bounds
+            mask &= (right >= view_left) & (left <= view_right) & (bottom >= view_top) & (top <= view_bottom)
+
+        idx = np.flatnonzero(mask)
+        if len(idx) > 0:
+            texture_ids = self.__frame_texture_ids[self.frame_indices[idx]]
+            for texture_id in np.unique(texture_ids):
+                rows = idx[texture_ids == texture_id]
+                sprite_batch.draw_many(texture=self.__textures[texture_id],
+                                       positions=self.positions[rows],
+                                       source_rects=self.__frame_rects[self.frame_indices[rows]],
+                                       rotations=self.angles[rows],
+                                       colors=self.colors[rows],
+                                       origins=self.hotspots[rows],
+                                       scales=self.scales[rows],
+                                       sizes=self.sizes[rows],
+                                       layer_depths=self.layer_depths[rows])
+
+        return len(idx), candidates - len(idx)
+
+
+class SpriteArrayView:
+    """
+    A Sprite-like object on a single row of a SpriteArray.
+    Vectors are returned as copies: assign them back (e.g. view.position = p) to change the row.
+    """
+
+    __slots__ = ('__array', '__handle')
+
+    def __init__(self, array: SpriteArray, handle: int):
+        self.__array = array
+        self.__handle = handle
+
+    @property
+    def array(self) -> SpriteArray:
+        return self.__array
+
+    @property
+    def handle(self) -> int:
+        return self.__handle
+
+    @property
+    def hotspot(self) -> glm.vec2:
+        return glm.vec2(*self.__array.hotspots[self.__handle])
+
+    @hotspot.setter
+    def hotspot(self, hs: glm.vec2):
+        self.__array.hotspots[self.__handle] = (hs.x, hs.y)
+
+    @property
+    def position(self) -> glm.vec2:
+        return glm.vec2(*self.__array.positions[self.__handle])
+
+    @position.setter
+    def position(self, pos: glm.vec2):
+        self.__array.positions[self.__handle] = (pos.x, pos.y)
+
+    @property
+    def x(self) -> float:
+        return float(self.__array.positions[self.__handle, 0])
+
+    @x.setter
+    def x(self, value: float):
+        self.__array.positions[self.__handle, 0] = value
+
+    @property
+    def y(self) -> float:
+        return float(self.__array.positions[self.__handle, 1])
+
+    @y.setter
+    def y(self, value: float):
+        self.__array.positions[self.__handle, 1] = value
+
+    def move(self, dx: float = 0.0, dy: float = 0.0):
+        self.__array.positions[self.__handle] += (dx, dy)
+
+    @property
+    def width(self) -> float:
+        return self.size.x
+
+    @property
+    def height(self) -> float:
+        return self.size.y
+
+    @property
+    def size(self) -> glm.vec2:
+        return glm.vec2(*self.__array.sizes[self.__handle])
+
+    @size.setter
+    def size(self, new_size: glm.vec2):
+        self.__array.sizes[self.__handle] = (new_size.x, new_size.y)
+        self.__array.hotspots[self.__handle] = (new_size.x / 2, new_size.y / 2)
+
+    @property
+    def angle(self) -> float:
+        return float(self.__array.angles[self.__handle])
+
+    @angle.setter
+    def angle(self, value: float):
+        self.__array.angles[self.__handle] = utils.wrap_angle_deg_180(value)
+
+    @property
+    def scale(self) -> glm.vec2:
+        return glm.vec2(*self.__array.scales[self.__handle])
+
+    @scale.setter
+    def scale(self, value: glm.vec2):
+        # as in Sprite, the hotspot is scaled with the sprite
+        self.__array.scales[self.__handle] = (value.x, value.y)
+        self.__array.hotspots[self.__handle] *= (value.x, value.y)
+
+    @property
+    def color(self) -> pg.Color:
+        rgba = int(self.__array.colors[self.__handle])
+        return pg.Color(rgba & 0xFF, (rgba >> 8) & 0xFF, (rgba >> 16) & 0xFF, rgba >> 24)
+
+    @color.setter
+    def color(self, value: pg.Color):
+        self.__array.colors[self.__handle] = utils.pack_color(pg.Color(value))
+
+    @property
+    def frame(self) -> SpriteFrame:
+        return self.__array.frames[self.__array.frame_indices[self.__handle]]
+
+    @frame.setter
+    def frame(self, value: SpriteFrame):
+        self.__array.frame_indices[self.__handle] = self.__array.frame_index_of(value)
+
+    @property
+    def layer_depth(self) -> float:
+        return float(self.__array.layer_depths[self.__handle])
+
+    @layer_depth.setter
+    def layer_depth(self, value: float):
+        self.__array.layer_depths[self.__handle] = value
+
+    @property
+    def visible(self) -> bool:
+        return bool(self.__array.visible_flags[self.__handle])
+
+    @visible.setter
+    def visible(self, flag: bool):
+        self.__array.visible_flags[self.__handle] = flag
+
+    @property
+    def active(self) -> bool:
+        return bool(self.__array.active_flags[self.__handle])
+
+    @active.setter
+    def active(self, flag: bool):
+        self.__array.active_flags[self.__handle] = flag
+
+    def play(self, first_frame: int, frame_count: int, fps: float, loop: bool = True):
+        self.__array.play(self.__handle, first_frame, frame_count, fps, loop)
+
+    def stop(self):
+        self.__array.stop(self.__handle)
+
+    def is_playing(self) -> bool:
+        return self.__array.anim_frame_counts[self.__handle] > 0
+
+    @property
+    def bounds(self) -> Bounds:
+        pos = self.position
+        hotspot = self.hotspot
+        size = self.size
+        scale = self.scale
+        return Bounds(pos.x - hotspot.x, pos.y - hotspot.y, size.x * scale.x, size.y * scale.y)
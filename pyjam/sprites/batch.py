@@ -1,4 +1,5 @@
 import math
+import struct
 from enum import IntEnum
 
 import glm
@@ -10,7 +11,9 @@ from pyjam import utils
 from pyjam.constants import *
 from pyjam.core import Bounds
 from pyjam.interfaces import IDisposable
+from pyjam.sprites.glyphs import GlyphTable
 from pyjam.sprites.sheet import SpriteSheet
+from pyjam.sprites.sorting import SpriteSorter
 from pyjam.texture import Texture2D
 
 
@@ -44,67 +47,222 @@ class SpriteSortMode(IntEnum):
     FRONT_TO_BACK = 4
 
 
+class BufferStreaming(IntEnum):
+    # Vertices are written into the same buffer every time, the driver may have to wait for the GPU
+    # to finish reading the previous contents.
+    NONE = 0,
+
+    # The buffer storage is orphaned before each write, so the driver can hand out fresh memory
+    # while the GPU still reads the old one.
+    ORPHAN = 1,
+
+    # Writes rotate through a ring of buffers, so a buffer is written again only after the others have been used.
+    RING = 2
+
+
+# layout of a single sprite vertex: position (x, y, z), packed RGBA color, texture coordinates (u, v)
+VERTEX_DTYPE = np.dtype([('x', 'f4'), ('y', 'f4'), ('z', 'f4'), ('color', 'u4'), ('u', 'f4'), ('v', 'f4')])
+
+# there are 4 vertices per batch item
+SIZEOF_VERTEX = VERTEX_DTYPE.itemsize
+SIZEOF_QUAD = 4 * SIZEOF_VERTEX
+
+# packs the 4 vertices of a batch item (TL, TR, BL, BR) straight into the vertex store
+_QUAD_STRUCT = struct.Struct('<' + '3fI2f' * 4)
+
+#
+#  TL    TR
+#   0----1 0,1,2,3 = index offsets for vertex indices
+#   |   /| TL,TR,BL,BR are vertex references in SpriteBatchItem.
+#   |  / | front-face is 'ccw'
+#   | /  | y is positive down the screen
+#   |/   |
+#   2----3
+#  BL    BR
+#
+_QUAD_INDICES = np.array([0, 1, 2, 1, 3, 2], dtype='u4')
+
+# unit offsets of the TL, TR, BL, BR vertices, used when building many batch items at once
+_QUAD_CORNERS_X = np.array([0.0, 1.0, 0.0, 1.0])
+_QUAD_CORNERS_Y = np.array([1.0, 1.0, 0.0, 0.0])
+
+# layout of a single sprite instance: position (x, y), origin, size (w, h), rotation in degrees, depth,
+# packed RGBA color, texture coordinates of the top left and bottom right corners
+INSTANCE_DTYPE = np.dtype([('x', 'f4'), ('y', 'f4'), ('origin_x', 'f4'), ('origin_y', 'f4'),
+                           ('w', 'f4'), ('h', 'f4'), ('rotation', 'f4'), ('z', 'f4'), ('color', 'u4'),
+                           ('u_tl', 'f4'), ('v_tl', 'f4'), ('u_br', 'f4'), ('v_br', 'f4')])
+
+SIZEOF_INSTANCE = INSTANCE_DTYPE.itemsize
+
+# packs a batch item straight into the instance store
+_INSTANCE_STRUCT = struct.Struct('<8fI4f')
+
+
+def _packed_color(color) -> int:
+    # colors are given either as pg.Color or already packed, see utils.pack_color
+    return color if type(color) is int else utils.pack_color(color)
+
+
 class SpriteBatchItem:
-    def __init__(self):
-        self.texture = None
-        self.sortkey = 0.0
-        self.vertexTL = ()
-        self.vertexTR = ()
-        self.vertexBL = ()
-        self.vertexBR = ()
-
-    def set(self, x, y, w, h, color: pg.Color, tex_coord_tl: glm.vec2, tex_coord_br: glm.vec2, depth):
-        rgba = utils.swap_endians(int(color))
-
-        self.vertexTL = (x, y + h, depth, rgba, tex_coord_tl.x, tex_coord_tl.y)
-        self.vertexTR = (x + w, y + h, depth, rgba, tex_coord_br.x, tex_coord_tl.y)
-        self.vertexBL = (x, y, depth, rgba, tex_coord_tl.x, tex_coord_br.y)
-        self.vertexBR = (x + w, y, depth, rgba, tex_coord_br.x, tex_coord_br.y)
-
-    def set_extended(self, x, y, dx, dy, w, h, sin, cos, color: pg.Color, tex_coord_tl: glm.vec2,
+    """
+    A view on the 4 vertices of a single slot of the SpriteBatcher vertex store.
+    """
+
+    __slots__ = ('vertices', 'slot', 'offset')
+
+    def __init__(self, vertices: np.ndarray, slot: int):
+        self.vertices = vertices
+        self.slot = slot
+        self.offset = slot * SIZEOF_QUAD
+
+    def set_quad(self, quad: np.ndarray):
+        # copies the vertices built by SpriteBatch.build_quad
+        first = self.slot * 4
+        self.vertices[first:first + 4] = quad
+
+    def set(self, x, y, w, h, rgba: int, tex_coord_tl: glm.vec2, tex_coord_br: glm.vec2, depth):
+        _QUAD_STRUCT.pack_into(self.vertices, self.offset,
+                               x, y + h, depth, rgba, tex_coord_tl.x, tex_coord_tl.y,
+                               x + w, y + h, depth, rgba, tex_coord_br.x, tex_coord_tl.y,
+                               x, y, depth, rgba, tex_coord_tl.x, tex_coord_br.y,
+                               x + w, y, depth, rgba, tex_coord_br.x, tex_coord_br.y)
+
+    def set_extended(self, x, y, dx, dy, w, h, rotation, rgba: int, tex_coord_tl: glm.vec2,
                      tex_coord_br: glm.vec2, depth):
-        rgba = utils.swap_endians(int(color))
+        sin = utils.sin_deg(rotation)
+        cos = utils.cos_deg(rotation)
 
         # rotation around origin (x0,y0)
         # x1 = x0cos(a) - y0sin(a)
         # y1 = x0sin(a) + y0cos(a)
 
-        self.vertexTL = (
-            x + dx * cos - (dy + h) * sin, y + dx * sin + (dy + h) * cos, depth, rgba, tex_coord_tl.x, tex_coord_tl.y)
-        self.vertexTR = (
-            x + (dx + w) * cos - (dy + h) * sin, y + (dx + w) * sin + (dy + h) * cos, depth, rgba, tex_coord_br.x,
-            tex_coord_tl.y)
-        self.vertexBL = (
-            x + dx * cos - dy * sin, y + dx * sin + dy * cos, depth, rgba, tex_coord_tl.x,
-            tex_coord_br.y)
-        self.vertexBR = (
-            x + (dx + w) * cos - dy * sin, y + (dx + w) * sin + dy * cos, depth, rgba, tex_coord_br.x,
-            tex_coord_br.y)
+        _QUAD_STRUCT.pack_into(self.vertices, self.offset,
+                               x + dx * cos - (dy + h) * sin, y + dx * sin + (dy + h) * cos, depth, rgba,
+                               tex_coord_tl.x, tex_coord_tl.y,
+                               x + (dx + w) * cos - (dy + h) * sin, y + (dx + w) * sin + (dy + h) * cos, depth, rgba,
+                               tex_coord_br.x, tex_coord_tl.y,
+                               x + dx * cos - dy * sin, y + dx * sin + dy * cos, depth, rgba,
+                               tex_coord_tl.x, tex_coord_br.y,
+                               x + (dx + w) * cos - dy * sin, y + (dx + w) * sin + dy * cos, depth, rgba,
+                               tex_coord_br.x, tex_coord_br.y)
+
+
+class SpriteInstanceItem:
+    """
+    A view on a single record of the SpriteInstanceBatcher instance store.
+    """
+
+    __slots__ = ('instances', 'slot', 'offset')
+
+    def __init__(self, instances: np.ndarray, slot: int):
+        self.instances = instances
+        self.slot = slot
+        self.offset = slot * SIZEOF_INSTANCE
+
+    def set_quad(self, quad: np.ndarray):
+        # copies the record built by SpriteBatch.build_quad
+        self.instances[self.slot:self.slot + 1] = quad
+
+    def set(self, x, y, w, h, rgba: int, tex_coord_tl: glm.vec2, tex_coord_br: glm.vec2, depth):
+        _INSTANCE_STRUCT.pack_into(self.instances, self.offset,
+                                   x, y, 0.0, 0.0, w, h, 0.0, depth, rgba,
+                                   tex_coord_tl.x, tex_coord_tl.y, tex_coord_br.x, tex_coord_br.y)
+
+    def set_extended(self, x, y, dx, dy, w, h, rotation, rgba: int, tex_coord_tl: glm.vec2,
+                     tex_coord_br: glm.vec2, depth):
+        # the quad is rotated around (x, y) by the vertex shader
+        _INSTANCE_STRUCT.pack_into(self.instances, self.offset,
+                                   x, y, -dx, -dy, w, h, rotation, depth, rgba,
+                                   tex_coord_tl.x, tex_coord_tl.y, tex_coord_br.x, tex_coord_br.y)
+
+
+class GlyphRun:
+    """
+    The batch items of a laid out string, built once by SpriteBatch.build_string or build_string_sprite_font_ex
+    and drawn any number of times with SpriteBatch.draw_glyph_run, by sprite batches of the same kind (see instanced).
+    """
+
+    __slots__ = ('quads', 'segments', 'layer_depth', 'instanced', 'char_indices')
+
+    def __init__(self, quads: np.ndarray, textures: list, layer_depth: float, instanced: bool,
+                 char_indices: np.ndarray):
+        rows_per_glyph = 1 if instanced else 4
+        self.quads = quads[:len(textures) * rows_per_glyph]
+        self.layer_depth = layer_depth
+        self.instanced = instanced
+
+        # the index in the text of the character of each glyph, line breaks having no glyph
+        self.char_indices = char_indices
+
+        # (texture, quads) of each run of consecutive glyphs sharing the same texture
+        self.segments = []
+        first = 0
+        for i in range(1, len(textures) + 1):
+            if i == len(textures) or textures[i] is not textures[first]:
+                self.segments.append((textures[first], self.quads[first * rows_per_glyph:i * rows_per_glyph]))
+                first = i
+
+    def set_char_color(self, index: int, rgba: int):
+        """
+        Patches the color of the glyph of the character at index in the text, without laying it out again.
+        rgba is a packed color, see utils.pack_color.
+        """
+        glyph = np.searchsorted(self.char_indices, index)
+        if glyph < len(self.char_indices) and self.char_indices[glyph] == index:
+            rows_per_glyph = 1 if self.instanced else 4
+            # the segments are views of quads, so they see the new color
+            self.quads['color'][glyph * rows_per_glyph:(glyph + 1) * rows_per_glyph] = rgba
+
+    def set_char_colors(self, colors: np.ndarray):
+        """ Patches the colors of all the glyphs, colors has a packed color per character of the text """
+        rows_per_glyph = 1 if self.instanced else 4
+        self.quads['color'] = np.repeat(colors[self.char_indices], rows_per_glyph)
 
 
 class SpriteBatcher(IDisposable):
-    def __init__(self, game, capacity=0):
+    def __init__(self, game, capacity=0, streaming=BufferStreaming.ORPHAN, ring_size=3):
         self.__initial_batch_size = 256
 
-        # limit enforced by indices size (16 bit)
-        # there are 6 indices per batch item
-        self.__max_batch_size = int(65536 / 6)
-
         self.__batch_item_count = 0
         self.__batch_item_list = []
 
-        self.__index_list = []
-        self.__vertex_list = []
+        # number of draw calls issued since SpriteBatch.begin
+        self.draw_calls = 0
+
+        # per-slot state: the vertices of slot i are at [i * 4, i * 4 + 4) in the vertex store
+        self.__vertices = np.zeros(0, dtype=VERTEX_DTYPE)
+        self.__textures = []
+        self.__texture_keys = np.zeros(0, dtype='i8')
+        self.__sort_keys = np.zeros(0, dtype='f8')
+        self.__sorter = SpriteSorter()
+
+        # per-slot scissor, as an index in the screen space scissor rectangles of the batch (0 means no scissor)
+        self.__scissor_ids = np.zeros(0, dtype='i4')
+        self.__scissor_rects = [None]
+        self.__scissor_lookup = {}
 
-        self.__program = game.services[SHADER_SERVICE].programs[SHADER_DEFAULT_SPRITES]
+        # 32 bit indices shared by all the frames, there are 6 indices per batch item
+        self.__indices = np.zeros(0, dtype='u4')
 
-        # self.__texture = None
+        # texture runs of the last built batch
+        self.__runs = []
+
+        # the programs indexed by Texture2D.distance_field
+        programs = game.services[SHADER_SERVICE].programs
+        self.__programs = (programs[SHADER_DEFAULT_SPRITES], programs[SHADER_SDF_SPRITES])
 
         self.__ctx = game.ctx
         self.__vbo = None
         self.__ebo = None
         self.__vao = None
 
+        # the vertex buffers (and their vertex arrays) used in turn, see BufferStreaming
+        self.__streaming = streaming
+        self.__ring_size = ring_size if streaming == BufferStreaming.RING else 1
+        self.__ring_index = 0
+        self.__vbos = []
+        self.__vaos = []
+
         self.__uploaded = False
 
         if capacity <= 0:
@@ -115,163 +273,645 @@ class SpriteBatcher(IDisposable):
 
         self.ensure_array_capacity(capacity)
 
-    def create_batch_item(self):
+    @property
+    def program(self) -> mgl.Program:
+        return self.__programs[0]
+
+    @property
+    def programs(self) -> tuple:
+        """ The programs used to draw the textures, indexed by Texture2D.distance_field """
+        return self.__programs
+
+    def add_scissor(self, rect: tuple) -> int:
+        """
+        Returns the scissor id to give to the batch items clipped by the screen space rectangle rect.
+        Items are drawn with one call per run of consecutive items sharing the same texture and scissor.
+        """
+        scissor_id = self.__scissor_lookup.get(rect)
+        if scissor_id is None:
+            scissor_id = len(self.__scissor_rects)
+            self.__scissor_rects.append(rect)
+            self.__scissor_lookup[rect] = scissor_id
+        return scissor_id
+
+    @staticmethod
+    def create_quad() -> tuple:
+        """
+        Returns the vertices of a single batch item outside of the vertex store, and an item writing into them.
+        """
+        quad = np.zeros(4, dtype=VERTEX_DTYPE)
+        return quad, SpriteBatchItem(quad, 0)
+
+    @staticmethod
+    def create_quads(count: int) -> np.ndarray:
+        """
+        Returns the vertices of count batch items outside of the vertex store, to be filled with fill_quads.
+        """
+        return np.zeros(count * 4, dtype=VERTEX_DTYPE)
+
+    def create_batch_item(self, texture, sortkey, scissor_id=0) -> SpriteBatchItem:
         if self.__batch_item_count >= len(self.__batch_item_list):
-            old_size = len(self.__batch_item_list)
-            new_size = round(old_size + (old_size / 2))  # grow by x1.5
-            new_size = (new_size + 63) & (~63)  # grow in chunks of 64
-            self.ensure_array_capacity(min(new_size, self.__max_batch_size))
-            self.__batch_item_list.append(SpriteBatchItem())
+            self.__grow(self.__batch_item_count + 1)
 
-        item = self.__batch_item_list[self.__batch_item_count]
+        slot = self.__batch_item_count
+        self.__textures[slot] = texture
+        self.__texture_keys[slot] = texture.sorting_key
+        self.__sort_keys[slot] = sortkey
+        self.__scissor_ids[slot] = scissor_id
         self.__batch_item_count += 1
-        return item
+        return self.__batch_item_list[slot]
+
+    def create_batch_items(self, texture, sortkeys, positions, origins, sizes, rotations, colors, uv_rects, depths):
+        """
+        Adds len(positions) batch items sharing the same texture and fills their vertices.
+        sortkeys is either a single value or an array with one key per item, the other arguments are arrays
+        with one row per item (see SpriteBatch.draw_many), uv_rects rows are u_tl, v_tl, u_br, v_br.
+        """
+        first, last = self.__add_slots(texture, sortkeys, len(positions))
+        SpriteBatcher.fill_quads(self.__vertices[first * 4:last * 4], positions, origins, sizes, rotations, colors,
+                                 uv_rects, depths)
+
+    @staticmethod
+    def fill_quads(quads: np.ndarray, positions, origins, sizes, rotations, colors, uv_rects, depths):
+        """
+        Fills the vertices of len(positions) batch items, the arguments are those of create_batch_items.
+        """
+        # the rows of quads are the TL, TR, BL, BR vertices of each item
+        quads = quads.reshape(len(positions), 4)
+
+        # the corners of each sprite relative to its origin
+        corners_x = sizes[:, 0:1] * _QUAD_CORNERS_X - origins[:, 0:1]
+        corners_y = sizes[:, 1:2] * _QUAD_CORNERS_Y - origins[:, 1:2]
+
+        if rotations is not None:
+            radians = np.radians(rotations)[:, None]
+            sin = np.sin(radians)
+            cos = np.cos(radians)
+            quads['x'] = positions[:, 0:1] + corners_x * cos - corners_y * sin
+            quads['y'] = positions[:, 1:2] + corners_x * sin + corners_y * cos
+        else:
+            quads['x'] = positions[:, 0:1] + corners_x
+            quads['y'] = positions[:, 1:2] + corners_y
+
+        quads['z'] = depths[:, None]
+        quads['color'] = colors[:, None]
+        quads['u'] = np.where(_QUAD_CORNERS_X, uv_rects[:, 2:3], uv_rects[:, 0:1])
+        quads['v'] = np.where(_QUAD_CORNERS_Y, uv_rects[:, 1:2], uv_rects[:, 3:4])
+
+    def add_quads(self, texture, sortkey, quads: np.ndarray):
+        """
+        Adds batch items sharing the same texture, copying the vertices built with create_quads.
+        """
+        first, last = self.__add_slots(texture, sortkey, len(quads) // 4)
+        self.__vertices[first * 4:last * 4] = quads
+
+    def __add_slots(self, texture, sortkeys, count) -> tuple:
+        first = self.__batch_item_count
+        last = first + count
+        if last > len(self.__batch_item_list):
+            self.__grow(last)
+
+        self.__textures[first:last] = [texture] * count
+        self.__texture_keys[first:last] = texture.sorting_key
+        self.__sort_keys[first:last] = sortkeys
+        self.__scissor_ids[first:last] = 0
+        self.__batch_item_count = last
+        return first, last
+
+    def __grow(self, needed_batch_items):
+        new_size = len(self.__batch_item_list)
+        while new_size < needed_batch_items:
+            new_size = round(new_size + (new_size / 2))  # grow by x1.5
+            new_size = (new_size + 63) & (~63)  # grow in chunks of 64
+        self.ensure_array_capacity(new_size)
 
     def draw_batch(self, sort_mode):
-        if self.__batch_item_count == 0:
+        self.build_batch(sort_mode)
+        self.render_batch()
+        self.__runs = []
+
+    def build_batch(self, sort_mode):
+        """
+        Sorts the batch items and uploads their vertices, without drawing them.
+        The uploaded batch can be drawn any number of times with render_batch, until the next build.
+        """
+        count = self.__batch_item_count
+        self.__runs = []
+        if count == 0:
             return
 
         if sort_mode == SpriteSortMode.TEXTURE or\
                 sort_mode == SpriteSortMode.FRONT_TO_BACK or \
                 sort_mode == SpriteSortMode.BACK_TO_FRONT:
-            # sort the list
-            # warning: do not sort the entire list in place, only the relevant portion have to be sorted
-            self.__batch_item_list[0:self.__batch_item_count] = \
-                sorted(self.__batch_item_list[0:self.__batch_item_count], key=lambda it: it.sortkey)
-
-        batch_count = self.__batch_item_count
-        while batch_count > 0:
-            start_vertex = 0
-            end_vertex = 0
-            tex = None
-
-            num_batches_to_process = batch_count
-            if num_batches_to_process > self.__max_batch_size:
-                num_batches_to_process = self.__max_batch_size
-
-            vlist_idx = 0
+            # reorder the vertex slots
+            order = self.__sorter.argsort(self.__sort_keys[:count], sort_mode != SpriteSortMode.TEXTURE)
+            vertices = self.__vertices.reshape(-1, 4)[order].reshape(-1)
+            texture_keys = self.__texture_keys[order]
+            scissor_ids = self.__scissor_ids[order]
+        else:
+            order = None
+            vertices = self.__vertices[:count * 4]
+            texture_keys = self.__texture_keys[:count]
+            scissor_ids = self.__scissor_ids[:count]
 
-            for i in range(num_batches_to_process):
-                item = self.__batch_item_list[i]
+        # slots where the texture or the scissor changes, i.e. where we need to flush and bind the new state
+        run_breaks = np.flatnonzero((texture_keys[1:] != texture_keys[:-1]) |
+                                    (scissor_ids[1:] != scissor_ids[:-1])) + 1
 
-                # if the texture changed (or the first time), we need to flush and bind the new texture
-                if tex is not item.texture:
-                    # the first time start_index == index, so flush() does nothing
-                    self.flush_vertex_array(start_vertex, end_vertex)
+        self.flush_vertex_array(vertices)
 
-                    start_vertex = end_vertex = 0
-                    vlist_idx = 0
+        # runs of batch items sharing the same texture and scissor, as (texture, scissor, first item, number of items)
+        run_start = 0
+        for run_end in run_breaks.tolist() + [count]:
+            slot = run_start if order is None else order[run_start]
+            scissor = self.__scissor_rects[scissor_ids[run_start]]
+            self.__runs.append((self.__textures[slot], scissor, run_start, run_end - run_start))
+            run_start = run_end
 
-                    tex = item.texture
-                    self.__program['material_diffuse'] = 0
-                    tex.mgl_texture.use(location=0)
+        self.__batch_item_count = 0
+        self.__scissor_rects = [None]
+        self.__scissor_lookup.clear()
 
-                self.__vertex_list[vlist_idx + 0] = item.vertexTL
-                self.__vertex_list[vlist_idx + 1] = item.vertexTR
-                self.__vertex_list[vlist_idx + 2] = item.vertexBL
-                self.__vertex_list[vlist_idx + 3] = item.vertexBR
+    def render_batch(self):
+        current_scissor = None
+        for texture, scissor, first, count in self.__runs:
+            if scissor != current_scissor:
+                self.__ctx.scissor = scissor
+                current_scissor = scissor
 
-                end_vertex += 4
-                vlist_idx += 4
+            self.__programs[texture.distance_field]['material_diffuse'] = 0
+            texture.use(location=0)
 
-            self.flush_vertex_array(start_vertex, end_vertex)
-            batch_count -= num_batches_to_process
+            self.__vao[texture.distance_field].render(vertices=count * 6, first=first * 6)
+            self.draw_calls += 1
 
-        self.__batch_item_count = 0
+        if current_scissor is not None:
+            self.__ctx.scissor = None
 
     def upload_vertex_buffer(self):
         if self.__uploaded:
             return
 
-        ndarr = np.array(self.__vertex_list, dtype='f4, f4, f4, u4, f4, f4')
-        self.__vbo = self.__ctx.buffer(ndarr, dynamic=True)
-        self.__ebo = self.__ctx.buffer(np.array(self.__index_list, dtype='i2'))
+        self.__ebo = self.__ctx.buffer(self.__indices)
 
         fmt = '3f 4f1 2f'
         attribs = ['in_position', 'in_color', 'in_tex_coords_0']
-        self.__vao = self.__ctx.vertex_array(self.__program, [(self.__vbo, fmt, *attribs)],
-                                             index_buffer=self.__ebo, index_element_size=2, skip_errors=True)
+        for _ in range(self.__ring_size):
+            vbo = self.__ctx.buffer(reserve=len(self.__vertices) * SIZEOF_VERTEX, dynamic=True)
+            self.__vbos.append(vbo)
+            # one vertex array per program, sharing the buffers
+            self.__vaos.append(tuple(self.__ctx.vertex_array(program, [(vbo, fmt, *attribs)],
+                                                             index_buffer=self.__ebo, index_element_size=4,
+                                                             skip_errors=True)
+                                     for program in self.__programs))
+        self.__ring_index = 0
+        self.__vbo = self.__vbos[0]
+        self.__vao = self.__vaos[0]
         self.__uploaded = True
 
-    def update_vertex_buffer(self, start, end):
-        sizeof_vertex_in_bytes = 24  # (3 * 4) + 4 + (2 * 4)
-        vertex_l = self.__vertex_list[start:end]
-        ndarr = np.array(vertex_l, dtype='f4, f4, f4, u4, f4, f4')
-        self.__vbo.write(ndarr, offset=start * sizeof_vertex_in_bytes)
+    def update_vertex_buffer(self, vertices: np.ndarray):
+        if self.__streaming == BufferStreaming.ORPHAN:
+            self.__vbo.orphan()
 
-    def flush_vertex_array(self, start, end):
-        if start == end:
+        # vertices is a contiguous slice of the vertex store, so it is written without any conversion
+        self.__vbo.write(vertices)
+
+    def flush_vertex_array(self, vertices: np.ndarray):
+        if len(vertices) == 0:
             return
 
         if not self.__uploaded:
             self.upload_vertex_buffer()
-        else:
-            self.update_vertex_buffer(start, end)
+        elif self.__ring_size > 1:
+            self.__ring_index = (self.__ring_index + 1) % self.__ring_size
+            self.__vbo = self.__vbos[self.__ring_index]
+            self.__vao = self.__vaos[self.__ring_index]
 
-        vertex_count = int((end - start) * 1.5)
-        self.__vao.render(vertices=vertex_count, first=start)
+        self.update_vertex_buffer(vertices)
 
     def ensure_array_capacity(self, needed_batch_items):
-        needed_capacity = 6 * needed_batch_items
-        if len(self.__index_list) > 0 and needed_capacity <= len(self.__index_list):
+        if needed_batch_items <= len(self.__batch_item_list):
             # Short circuit out of here because we have enough capacity.
             return
 
-        num_batches = 0
-        if len(self.__index_list) > 0:
-            num_batches = len(self.__index_list) / 6
-
-        while num_batches < needed_batch_items:
-            #
-            #  TL    TR
-            #   0----1 0,1,2,3 = index offsets for vertex indices
-            #   |   /| TL,TR,BL,BR are vertex references in SpriteBatchItem.
-            #   |  / | front-face is 'ccw'
-            #   | /  | y is positive down the screen
-            #   |/   |
-            #   2----3
-            #  BL    BR
-            #
-            self.__index_list.append(num_batches * 4 + 0)
-            self.__index_list.append(num_batches * 4 + 1)
-            self.__index_list.append(num_batches * 4 + 2)
-
-            self.__index_list.append(num_batches * 4 + 1)
-            self.__index_list.append(num_batches * 4 + 3)
-            self.__index_list.append(num_batches * 4 + 2)
-
-            for x in range(4):
-                self.__vertex_list.append(tuple((0.0, 0.0, 0.0, 0, 0.0, 0.0)))
-
-            num_batches += 1
+        self.__grow_vertex_store(needed_batch_items)
+
+        # the indices of each quad are the same 6 offsets shifted by 4 vertices per batch item
+        first_vertices = np.arange(0, needed_batch_items * 4, 4, dtype='u4')
+        self.__indices = (first_vertices[:, None] + _QUAD_INDICES).reshape(-1)
 
         if self.__uploaded:
-            self.dispose()
+            # reallocate the buffers in place, so the vertex arrays still refer to them
+            for vbo in self.__vbos:
+                vbo.orphan(len(self.__vertices) * SIZEOF_VERTEX)
+            self.__ebo.orphan(self.__indices.nbytes)
+            self.__ebo.write(self.__indices)
+
+    def __grow_vertex_store(self, needed_batch_items):
+        old_size = len(self.__batch_item_list)
+
+        vertices = np.zeros(needed_batch_items * 4, dtype=VERTEX_DTYPE)
+        vertices[:old_size * 4] = self.__vertices
+        self.__vertices = vertices
+
+        self.__texture_keys = np.resize(self.__texture_keys, needed_batch_items)
+        self.__sort_keys = np.resize(self.__sort_keys, needed_batch_items)
+        self.__scissor_ids = np.resize(self.__scissor_ids, needed_batch_items)
+        self.__textures.extend([None] * (needed_batch_items - old_size))
+
+        # existing items must write into the new store
+        for item in self.__batch_item_list:
+            item.vertices = vertices
+        self.__batch_item_list.extend(SpriteBatchItem(vertices, slot)
+                                      for slot in range(old_size, needed_batch_items))
 
     def dispose(self):
-        if self.__vao is not None:
-            self.__vao.release()
+        for vaos in self.__vaos:
+            for vao in vaos:
+                vao.release()
         if self.__ebo is not None:
             self.__ebo.release()
-        if self.__vbo is not None:
-            self.__vbo.release()
+        for vbo in self.__vbos:
+            vbo.release()
+        self.__vaos.clear()
+        self.__vbos.clear()
+        self.__vao = self.__ebo = self.__vbo = None
+        self.__uploaded = False
+
+
+class SpriteInstanceBatcher(IDisposable):
+    """
+    A batcher that uploads a single record per batch item and lets the GPU build the quads with instancing.
+    The quads are expanded, rotated and textured by the instanced_sprites vertex shader.
+    """
+
+    def __init__(self, game, capacity=0, streaming=BufferStreaming.ORPHAN, ring_size=3):
+        self.__initial_batch_size = 256
+
+        self.__batch_item_count = 0
+        self.__batch_item_list = []
+
+        # number of draw calls issued since SpriteBatch.begin
+        self.draw_calls = 0
+
+        # per-slot state: the record of slot i is at [i] in the instance store
+        self.__instances = np.zeros(0, dtype=INSTANCE_DTYPE)
+        self.__textures = []
+        self.__texture_keys = np.zeros(0, dtype='i8')
+        self.__sort_keys = np.zeros(0, dtype='f8')
+        self.__sorter = SpriteSorter()
+
+        # per-slot scissor, as an index in the screen space scissor rectangles of the batch (0 means no scissor)
+        self.__scissor_ids = np.zeros(0, dtype='i4')
+        self.__scissor_rects = [None]
+        self.__scissor_lookup = {}
+
+        # the programs indexed by Texture2D.distance_field
+        programs = game.services[SHADER_SERVICE].programs
+        self.__programs = (programs[SHADER_INSTANCED_SPRITES], programs[SHADER_INSTANCED_SDF_SPRITES])
+
+        self.__ctx = game.ctx
+        self.__corners_vbo = None
+        self.__instances_vbo = None
+        self.__vao = None
+
+        # the instance buffers (and their vertex arrays) used in turn, see BufferStreaming
+        self.__streaming = streaming
+        self.__ring_size = ring_size if streaming == BufferStreaming.RING else 1
+        self.__ring_index = 0
+        self.__instances_vbos = []
+        self.__vaos = []
+
+        # runs of the last built batch, with their own buffer, see build_batch
+        self.__retained_runs = []
+
+        self.__uploaded = False
+
+        if capacity <= 0:
+            capacity = self.__initial_batch_size
+
+        self.ensure_array_capacity(capacity)
+
+    @property
+    def program(self) -> mgl.Program:
+        return self.__programs[0]
+
+    @property
+    def programs(self) -> tuple:
+        """ The programs used to draw the textures, indexed by Texture2D.distance_field """
+        return self.__programs
+
+    def add_scissor(self, rect: tuple) -> int:
+        """
+        Returns the scissor id to give to the batch items clipped by the screen space rectangle rect.
+        Items are drawn with one call per run of consecutive items sharing the same texture and scissor.
+        """
+        scissor_id = self.__scissor_lookup.get(rect)
+        if scissor_id is None:
+            scissor_id = len(self.__scissor_rects)
+            self.__scissor_rects.append(rect)
+            self.__scissor_lookup[rect] = scissor_id
+        return scissor_id
+
+    @staticmethod
+    def create_quad() -> tuple:
+        """
+        Returns the record of a single batch item outside of the instance store, and an item writing into it.
+        """
+        quad = np.zeros(1, dtype=INSTANCE_DTYPE)
+        return quad, SpriteInstanceItem(quad, 0)
+
+    @staticmethod
+    def create_quads(count: int) -> np.ndarray:
+        """
+        Returns the records of count batch items outside of the instance store, to be filled with fill_quads.
+        """
+        return np.zeros(count, dtype=INSTANCE_DTYPE)
+
+    def create_batch_item(self, texture, sortkey, scissor_id=0) -> SpriteInstanceItem:
+        if self.__batch_item_count >= len(self.__batch_item_list):
+            self.__grow(self.__batch_item_count + 1)
+
+        slot = self.__batch_item_count
+        self.__textures[slot] = texture
+        self.__texture_keys[slot] = texture.sorting_key
+        self.__sort_keys[slot] = sortkey
+        self.__scissor_ids[slot] = scissor_id
+        self.__batch_item_count += 1
+        return self.__batch_item_list[slot]
+
+    def create_batch_items(self, texture, sortkeys, positions, origins, sizes, rotations, colors, uv_rects, depths):
+        """
+        Adds len(positions) batch items sharing the same texture, see SpriteBatcher.create_batch_items.
+        """
+        first, last = self.__add_slots(texture, sortkeys, len(positions))
+        SpriteInstanceBatcher.fill_quads(self.__instances[first:last], positions, origins, sizes, rotations, colors,
+                                         uv_rects, depths)
+
+    @staticmethod
+    def fill_quads(records: np.ndarray, positions, origins, sizes, rotations, colors, uv_rects, depths):
+        """
+        Fills the records of len(positions) batch items, the arguments are those of create_batch_items.
+        """
+        records['x'] = positions[:, 0]
+        records['y'] = positions[:, 1]
+        records['origin_x'] = origins[:, 0]
+        records['origin_y'] = origins[:, 1]
+        records['w'] = sizes[:, 0]
+        records['h'] = sizes[:, 1]
+        records['rotation'] = 0.0 if rotations is None else rotations
+        records['z'] = depths
+        records['color'] = colors
+        records['u_tl'] = uv_rects[:, 0]
+        records['v_tl'] = uv_rects[:, 1]
+        records['u_br'] = uv_rects[:, 2]
+        records['v_br'] = uv_rects[:, 3]
+
+    def add_quads(self, texture, sortkey, quads: np.ndarray):
+        """
+        Adds batch items sharing the same texture, copying the records built with create_quads.
+        """
+        first, last = self.__add_slots(texture, sortkey, len(quads))
+        self.__instances[first:last] = quads
+
+    def __add_slots(self, texture, sortkeys, count) -> tuple:
+        first = self.__batch_item_count
+        last = first + count
+        if last > len(self.__batch_item_list):
+            self.__grow(last)
+
+        self.__textures[first:last] = [texture] * count
+        self.__texture_keys[first:last] = texture.sorting_key
+        self.__sort_keys[first:last] = sortkeys
+        self.__scissor_ids[first:last] = 0
+        self.__batch_item_count = last
+        return first, last
+
+    def __grow(self, needed_batch_items):
+        new_size = len(self.__batch_item_list)
+        while new_size < needed_batch_items:
+            new_size = round(new_size + (new_size / 2))  # grow by x1.5
+            new_size = (new_size + 63) & (~63)  # grow in chunks of 64
+        self.ensure_array_capacity(new_size)
+
+    def draw_batch(self, sort_mode):
+        instances, runs = self.__sort_runs(sort_mode)
+        if len(runs) == 0:
+            return
+
+        if not self.__uploaded:
+            self.upload_vertex_buffer()
+
+        current_scissor = None
+        for texture, scissor, first, count in runs:
+            if scissor != current_scissor:
+                self.__ctx.scissor = scissor
+                current_scissor = scissor
+
+            self.__programs[texture.distance_field]['material_diffuse'] = 0
+            texture.use(location=0)
+
+            # instanced rendering always starts from the first record of the buffer
+            self.update_instance_buffer(instances[first:first + count])
+            self.__vao[texture.distance_field].render(mode=mgl.TRIANGLE_STRIP, vertices=4, instances=count)
+            self.draw_calls += 1
+
+        if current_scissor is not None:
+            self.__ctx.scissor = None
+
+    def build_batch(self, sort_mode):
+        """
+        Sorts the batch items and uploads their records, without drawing them.
+        The uploaded batch can be drawn any number of times with render_batch, until the next build.
+        As instanced rendering always starts from the first record of a buffer, each run gets a buffer of its own.
+        """
+        instances, runs = self.__sort_runs(sort_mode)
+        self.__release_retained_runs()
+        if len(runs) == 0:
+            return
+
+        if not self.__uploaded:
+            self.upload_vertex_buffer()
+
+        for texture, scissor, first, count in runs:
+            instances_vbo = self.__ctx.buffer(instances[first:first + count])
+            vao = self.__create_vertex_array(self.__programs[texture.distance_field], instances_vbo)
+            self.__retained_runs.append((texture, scissor, instances_vbo, vao, count))
+
+    def render_batch(self):
+        current_scissor = None
+        for texture, scissor, instances_vbo, vao, count in self.__retained_runs:
+            if scissor != current_scissor:
+                self.__ctx.scissor = scissor
+                current_scissor = scissor
+
+            self.__programs[texture.distance_field]['material_diffuse'] = 0
+            texture.use(location=0)
+
+            vao.render(mode=mgl.TRIANGLE_STRIP, vertices=4, instances=count)
+            self.draw_calls += 1
+
+        if current_scissor is not None:
+            self.__ctx.scissor = None
+
+    def __sort_runs(self, sort_mode) -> tuple:
+        """
+        Returns the records of the batch items in drawing order, and their runs sharing the same texture and scissor
+        as (texture, scissor, first item, number of items). The batch is emptied.
+        """
+        count = self.__batch_item_count
+        if count == 0:
+            return self.__instances[:0], []
+
+        if sort_mode == SpriteSortMode.TEXTURE or\
+                sort_mode == SpriteSortMode.FRONT_TO_BACK or \
+                sort_mode == SpriteSortMode.BACK_TO_FRONT:
+            # reorder the records
+            order = self.__sorter.argsort(self.__sort_keys[:count], sort_mode != SpriteSortMode.TEXTURE)
+            instances = self.__instances[order]
+            texture_keys = self.__texture_keys[order]
+            scissor_ids = self.__scissor_ids[order]
+        else:
+            order = None
+            instances = self.__instances[:count]
+            texture_keys = self.__texture_keys[:count]
+            scissor_ids = self.__scissor_ids[:count]
+
+        # slots where the texture or the scissor changes, i.e. where we need to flush and bind the new state
+        run_breaks = np.flatnonzero((texture_keys[1:] != texture_keys[:-1]) |
+                                    (scissor_ids[1:] != scissor_ids[:-1])) + 1
+
+        runs = []
+        run_start = 0
+        for run_end in run_breaks.tolist() + [count]:
+            slot = run_start if order is None else order[run_start]
+            scissor = self.__scissor_rects[scissor_ids[run_start]]
+            runs.append((self.__textures[slot], scissor, run_start, run_end - run_start))
+            run_start = run_end
+
+        self.__batch_item_count = 0
+        self.__scissor_rects = [None]
+        self.__scissor_lookup.clear()
+        return instances, runs
+
+    def __release_retained_runs(self):
+        for texture, scissor, instances_vbo, vao, count in self.__retained_runs:
+            vao.release()
+            instances_vbo.release()
+        self.__retained_runs.clear()
+
+    def upload_vertex_buffer(self):
+        if self.__uploaded:
+            return
+
+        # TL, TR, BL, BR corners of the unit quad, drawn as a triangle strip
+        corners = np.array([0.0, 1.0, 1.0, 1.0, 0.0, 0.0, 1.0, 0.0], dtype='f4')
+        self.__corners_vbo = self.__ctx.buffer(corners)
+
+        for _ in range(self.__ring_size):
+            instances_vbo = self.__ctx.buffer(reserve=len(self.__instances) * SIZEOF_INSTANCE, dynamic=True)
+            self.__instances_vbos.append(instances_vbo)
+            # one vertex array per program, sharing the buffers
+            self.__vaos.append(tuple(self.__create_vertex_array(program, instances_vbo)
+                                     for program in self.__programs))
+        self.__ring_index = 0
+        self.__instances_vbo = self.__instances_vbos[0]
+        self.__vao = self.__vaos[0]
+        self.__uploaded = True
+
+    def __create_vertex_array(self, program: mgl.Program, instances_vbo: mgl.Buffer) -> mgl.VertexArray:
+        fmt = '2f 2f 2f 1f 1f 4f1 4f/i'
+        attribs = ['in_position', 'in_origin', 'in_size', 'in_rotation', 'in_depth', 'in_color', 'in_tex_rect']
+        return self.__ctx.vertex_array(program,
+                                       [(self.__corners_vbo, '2f', 'in_corner'), (instances_vbo, fmt, *attribs)],
+                                       skip_errors=True)
+
+    def update_instance_buffer(self, instances: np.ndarray):
+        if self.__ring_size > 1:
+            self.__ring_index = (self.__ring_index + 1) % self.__ring_size
+            self.__instances_vbo = self.__instances_vbos[self.__ring_index]
+            self.__vao = self.__vaos[self.__ring_index]
+        elif self.__streaming == BufferStreaming.ORPHAN:
+            self.__instances_vbo.orphan()
+
+        self.__instances_vbo.write(instances)
+
+    def ensure_array_capacity(self, needed_batch_items):
+        if needed_batch_items <= len(self.__batch_item_list):
+            return
+
+        old_size = len(self.__batch_item_list)
+
+        instances = np.zeros(needed_batch_items, dtype=INSTANCE_DTYPE)
+        instances[:old_size] = self.__instances
+        self.__instances = instances
+
+        self.__texture_keys = np.resize(self.__texture_keys, needed_batch_items)
+        self.__sort_keys = np.resize(self.__sort_keys, needed_batch_items)
+        self.__scissor_ids = np.resize(self.__scissor_ids, needed_batch_items)
+        self.__textures.extend([None] * (needed_batch_items - old_size))
+
+        # existing items must write into the new store
+        for item in self.__batch_item_list:
+            item.instances = instances
+        self.__batch_item_list.extend(SpriteInstanceItem(instances, slot)
+                                      for slot in range(old_size, needed_batch_items))
+
+        if self.__uploaded:
+            # reallocate the buffers in place, so the vertex arrays still refer to them
+            for instances_vbo in self.__instances_vbos:
+                instances_vbo.orphan(instances.nbytes)
+
+    def dispose(self):
+        self.__release_retained_runs()
+        for vaos in self.__vaos:
+            for vao in vaos:
+                vao.release()
+        for instances_vbo in self.__instances_vbos:
+            instances_vbo.release()
+        if self.__corners_vbo is not None:
+            self.__corners_vbo.release()
+        self.__vaos.clear()
+        self.__instances_vbos.clear()
+        self.__vao = self.__instances_vbo = self.__corners_vbo = None
         self.__uploaded = False
 
 
 class SpriteBatch(IDisposable):
-    def __init__(self, game, capacity=0):
+    def __init__(self, game, capacity=0, instanced=False, streaming=BufferStreaming.ORPHAN, ring_size=3):
+        """
+        instanced selects the GPU instanced batcher, streaming and ring_size how vertices are streamed
+        to the GPU (see BufferStreaming).
+        """
         self.__sort_mode = SpriteSortMode.DEFERRED
-        self.__batcher = SpriteBatcher(game, capacity)
+        self.__instanced = instanced
+        if instanced:
+            self.__batcher = SpriteInstanceBatcher(game, capacity, streaming, ring_size)
+        else:
+            self.__batcher = SpriteBatcher(game, capacity, streaming, ring_size)
         self.__begin_called = False
         self.__tex_coord_tl = glm.vec2()
         self.__tex_coord_br = glm.vec2()
         self.__transform_matrix = glm.identity(glm.mat4)
         self.__scissor = None
+        # screen space scissor rectangles of the current frame, keyed by world space bounds
+        self.__screen_scissors = {}
+        # retained batches drawn behind the sprites of this batch, see draw_static
+        self.__static_batches = []
         self.blend_equation = mgl.FUNC_ADD
         self.blend_func = mgl.DEFAULT_BLENDING
         self.depth_test_enabled = False
         self.__game = game
 
+    @property
+    def instanced(self) -> bool:
+        return self.__instanced
+
+    @property
+    def draw_calls(self) -> int:
+        """ Number of draw calls issued since the last call to begin """
+        return self.__batcher.draw_calls
+
     def setup(self):
         # blend stuff here
         self.__game.ctx.enable(mgl.BLEND)
@@ -282,11 +922,11 @@ class SpriteBatch(IDisposable):
         else:
             self.__game.ctx.disable(mgl.DEPTH_TEST)
 
-        program = self.__game.services[SHADER_SERVICE].programs[SHADER_DEFAULT_SPRITES]
-        program['proj_matrix'].write(self.__game.camera.get_projection_matrix())
-        program['view_matrix'].write(self.__game.camera.get_view_matrix())
-        program['model_matrix'].write(self.__transform_matrix)
-        program['material_diffuse'] = 0
+        for program in self.__batcher.programs:
+            program['proj_matrix'].write(self.__game.camera.get_projection_matrix())
+            program['view_matrix'].write(self.__game.camera.get_view_matrix())
+            program['model_matrix'].write(self.__transform_matrix)
+            program['material_diffuse'] = 0
 
     def cleanup(self):
         self.__game.ctx.disable(mgl.BLEND)
@@ -300,8 +940,20 @@ class SpriteBatch(IDisposable):
 
     def set_scissor(self, scissor: Bounds):
         self.__scissor = scissor
-        v1 = glm.vec3(self.__scissor.left, self.__scissor.top, 0)
-        v2 = glm.vec3(self.__scissor.left + self.__scissor.width, self.__scissor.top + self.__scissor.height, 0)
+        self.__game.ctx.scissor = self.screen_scissor(scissor)
+
+    def screen_scissor(self, scissor: Bounds) -> tuple:
+        """
+        Converts a scissor rectangle from world to screen space.
+        The result is cached until the next call to begin.
+        """
+        key = (scissor.left, scissor.top, scissor.width, scissor.height)
+        rect = self.__screen_scissors.get(key)
+        if rect is not None:
+            return rect
+
+        v1 = glm.vec3(scissor.left, scissor.top, 0)
+        v2 = glm.vec3(scissor.left + scissor.width, scissor.top + scissor.height, 0)
 
         v1.y, v2.y = v2.y, v1.y
 
@@ -313,7 +965,9 @@ class SpriteBatch(IDisposable):
 
         # ModernGL scissor: the first 2 coordinates define the lower-left corner;
         # the other 2 coordinates define the width and height of box
-        self.__game.ctx.scissor = clip_v1.x, clip_v1.y, w, h
+        rect = (int(clip_v1.x), int(clip_v1.y), int(w), int(h))
+        self.__screen_scissors[key] = rect
+        return rect
 
     def check_valid(self, texture):
         if texture is None:
@@ -356,6 +1010,8 @@ class SpriteBatch(IDisposable):
 
         self.__transform_matrix = transform_matrix
 
+        self.__batcher.draw_calls = 0
+        self.__screen_scissors.clear()
         self.__begin_called = True
 
     def end(self):
@@ -363,12 +1019,52 @@ class SpriteBatch(IDisposable):
             raise Exception('Begin must be called before calling End.')
 
         self.__begin_called = False
+
+        for static_batch in self.__static_batches:
+            static_batch.render_retained(self.__transform_matrix)
+            self.__batcher.draw_calls += static_batch.draw_calls
+        self.__static_batches.clear()
+
         if self.__sort_mode != SpriteSortMode.IMMEDIATE:
             self.setup()
 
         self.flush()
         self.cleanup()
 
+    def end_retained(self):
+        """
+        Ends the batch like end(), but the sprites are only uploaded to the GPU and kept there,
+        so that they can be drawn any number of times with render_retained or draw_static.
+        """
+        if not self.__begin_called:
+            raise Exception('Begin must be called before calling End.')
+
+        self.__begin_called = False
+        self.__batcher.build_batch(self.__sort_mode)
+
+    def render_retained(self, transform_matrix):
+        self.__transform_matrix = transform_matrix
+        self.__batcher.draw_calls = 0
+        self.setup()
+        self.__batcher.render_batch()
+        self.cleanup()
+
+    def draw_static(self, static_batch: 'SpriteBatch'):
+        """
+        Draws a retained batch (see end_retained) behind the sprites of this batch.
+        """
+        if not self.__begin_called:
+            raise Exception(
+                'Draw was called, but Begin has not yet been called. Begin must be called successfully before you can '
+                'call Draw.')
+
+        if self.__sort_mode == SpriteSortMode.IMMEDIATE:
+            static_batch.render_retained(self.__transform_matrix)
+            self.__batcher.draw_calls += static_batch.draw_calls
+            self.setup()
+        else:
+            self.__static_batches.append(static_batch)
+
     def draw(self,
              texture: Texture2D,
              position: glm.vec2,
@@ -384,20 +1080,67 @@ class SpriteBatch(IDisposable):
 
         self.check_valid(texture)
 
+        # clipped items are grouped by scissor in the batcher, instead of being drawn one by one
+        scissor_id = 0
         if scissor:
-            self.setup()
-            self.flush()
-            self.set_scissor(scissor)
+            scissor_id = self.__batcher.add_scissor(self.screen_scissor(scissor))
+
+        item = self.__batcher.create_batch_item(texture, self.__sort_key(texture, layer_depth), scissor_id)
+        self.__set_item(item, texture, position, source_rect, rotation, color, origin, scale, size, effects,
+                        layer_depth)
+
+        # We need to flush if we're using Immediate sort mode.
+        self.flush_if_needed()
+
+    def build_quad(self,
+                   texture: Texture2D,
+                   position: glm.vec2,
+                   source_rect: pg.Rect = None,
+                   rotation: float = 0.0,
+                   color: pg.Color = pg.Color('white'),
+                   origin: glm.vec2 = glm.vec2(0.0, 0.0),
+                   scale: glm.vec2 = glm.vec2(1.0, 1.0),
+                   size: glm.vec2 = None,
+                   effects: SpriteEffects = SpriteEffects.NONE,
+                   layer_depth: float = 0) -> np.ndarray:
+        """
+        Builds the vertices draw() would add to the batch, without drawing them.
+        The quad can then be drawn any number of times with draw_quad, by sprite batches of the same kind
+        (see instanced).
+        """
+        quad, item = self.__batcher.create_quad()
+        self.__set_item(item, texture, position, source_rect, rotation, color, origin, scale, size, effects,
+                        layer_depth)
+        return quad
+
+    def draw_quad(self, texture: Texture2D, quad: np.ndarray, layer_depth: float = 0, scissor: Bounds = None):
+        """
+        Draws a quad built by build_quad, layer_depth must be the one given to build_quad.
+        """
+        self.check_valid(texture)
+
+        scissor_id = 0
+        if scissor:
+            scissor_id = self.__batcher.add_scissor(self.screen_scissor(scissor))
+
+        item = self.__batcher.create_batch_item(texture, self.__sort_key(texture, layer_depth), scissor_id)
+        item.set_quad(quad)
 
-        item = self.__batcher.create_batch_item()
-        item.texture = texture
+        # We need to flush if we're using Immediate sort mode.
+        self.flush_if_needed()
+
+    def __sort_key(self, texture: Texture2D, layer_depth: float) -> float:
         if self.__sort_mode == SpriteSortMode.TEXTURE:
-            item.sortkey = texture.sorting_key
+            return texture.sorting_key
         elif self.__sort_mode == SpriteSortMode.FRONT_TO_BACK:
-            item.sortkey = layer_depth
+            return layer_depth
         elif self.__sort_mode == SpriteSortMode.BACK_TO_FRONT:
-            item.sortkey = -layer_depth
+            return -layer_depth
+        return 0.0
 
+    def __set_item(self, item, texture, position, source_rect, rotation, color, origin, scale, size, effects,
+                   layer_depth):
+        rgba = _packed_color(color)
         s = scale
 
         # sprite size
@@ -437,154 +1180,261 @@ class SpriteBatch(IDisposable):
         if rotation == 0:
             item.set(position.x - origin.x, position.y - origin.y,
                      w, h,
-                     color,
+                     rgba,
                      self.__tex_coord_tl, self.__tex_coord_br,
                      layer_depth)
         else:
             item.set_extended(position.x, position.y,
                               -origin.x, -origin.y,
                               w, h,
-                              utils.sin_deg(rotation), utils.cos_deg(rotation),
-                              color,
+                              rotation,
+                              rgba,
                               self.__tex_coord_tl, self.__tex_coord_br,
                               layer_depth)
 
-        # We need to flush if we're using Immediate sort mode.
-        if scissor:
-            self.flush()
-            self.unset_scissor()
-        else:
-            self.flush_if_needed()
+    def draw_many(self,
+                  texture: Texture2D,
+                  positions: np.ndarray,
+                  source_rects: np.ndarray = None,
+                  rotations: np.ndarray = None,
+                  colors=None,
+                  origins: np.ndarray = None,
+                  scales: np.ndarray = None,
+                  sizes: np.ndarray = None,
+                  effects: SpriteEffects = SpriteEffects.NONE,
+                  layer_depths: np.ndarray = None):
+        """
+        Draws many sprites sharing the same texture with a single call.
+
+        The arguments have the same meaning they have in draw(), but each of them can be either
+        a NumPy array with one row per sprite or a single value shared by all the sprites:
+        - positions, origins, scales, sizes: (n, 2) arrays of x, y
+        - source_rects: (n, 4) array of left, top, width, height
+        - rotations (in degrees), layer_depths: (n,) arrays
+        - colors: (n,) array of packed colors (see utils.pack_color), (n, 4) array of RGBA bytes or a pg.Color
+        """
 
-    def draw_string(self, sp_sheet: SpriteSheet, text: str, position: glm.vec2,
-                    w: float, h: float, rotation: float,
-                    chars_colors=None, kerning_width=0, layer_depth: float = 0.1):
-        if chars_colors is None:
-            chars_colors = list()
-            for i in range(len(text)):
-                chars_colors.append(pg.Color('white'))
-                
-        offset = glm.ivec2(0, 0)
-        first_char_of_line = True
+        self.check_valid(texture)
 
-        texture = sp_sheet.texture2d
+        positions = np.asarray(positions, dtype='f8').reshape(-1, 2)
+        count = len(positions)
+        if count == 0:
+            return
+
+        if layer_depths is None:
+            layer_depths = 0.0
+        layer_depths = np.broadcast_to(np.asarray(layer_depths, dtype='f8'), (count,))
 
-        sort_key = 0.0
+        sort_keys = 0.0
         if self.__sort_mode == SpriteSortMode.TEXTURE:
-            sort_key = texture.sorting_key
+            sort_keys = texture.sorting_key
         elif self.__sort_mode == SpriteSortMode.FRONT_TO_BACK:
-            sort_key = layer_depth
+            sort_keys = layer_depths
         elif self.__sort_mode == SpriteSortMode.BACK_TO_FRONT:
-            sort_key = -layer_depth
+            sort_keys = -layer_depths
 
-        texel_width = 1.0 / texture.width
-        texel_height = 1.0 / texture.height
+        # sprite size
+        if source_rects is not None:
+            source_rects = np.broadcast_to(np.asarray(source_rects, dtype='f8'), (count, 4))
+        if sizes is not None:
+            sizes = np.broadcast_to(np.asarray(sizes, dtype='f8'), (count, 2))
+        elif source_rects is not None:
+            sizes = source_rects[:, 2:4]
+        else:
+            sizes = np.broadcast_to(np.array([texture.width, texture.height], dtype='f8'), (count, 2))
+        if scales is not None:
+            sizes = sizes * np.broadcast_to(np.asarray(scales, dtype='f8'), (count, 2))
+
+        # texture coordinates, as rows of u_tl, v_tl, u_br, v_br
+        if source_rects is not None:
+            texel_size = np.array([1.0 / texture.width, 1.0 / texture.height])
+            uv_rects = np.empty((count, 4))
+            uv_rects[:, 0:2] = source_rects[:, 0:2] * texel_size
+            uv_rects[:, 2:4] = (source_rects[:, 0:2] + source_rects[:, 2:4]) * texel_size
+            uv_rects[:, 1::2] = 1.0 - uv_rects[:, 1::2]
+        else:
+            uv_rects = np.broadcast_to(np.array([0.0, 1.0, 1.0, 0.0]), (count, 4))
 
-        for i, c in enumerate(list(text)):
-            c_ord = ord(c)
-            source_rect = sp_sheet.frames[str(c_ord)].rect
+        if self.__game.is_origin_topleft():
+            uv_rects = uv_rects[:, [0, 3, 2, 1]]
 
-            if c == '\r':
-                continue
-            if c == '\n':
-                offset.x = 0
-                offset.y += h
-                first_char_of_line = True
-                continue
+        if effects & SpriteEffects.FLIP_VERTICALLY:
+            uv_rects = uv_rects[:, [0, 3, 2, 1]]
 
-            if first_char_of_line:
-                offset.x = 0
-                first_char_of_line = False
-            else:
-                offset.x += w
+        if effects & SpriteEffects.FLIP_HORIZONTALLY:
+            uv_rects = uv_rects[:, [2, 1, 0, 3]]
 
-            item = self.__batcher.create_batch_item()
+        # packed colors
+        if colors is None:
+            colors = 0xFFFFFFFF
+        elif isinstance(colors, pg.Color):
+            colors = utils.pack_color(colors)
+        else:
+            colors = np.asarray(colors)
+            if colors.ndim == 2:
+                # RGBA bytes are already in the order expected by the vertex format
+                colors = np.ascontiguousarray(colors, dtype='u1').view('<u4').reshape(-1)
+        colors = np.broadcast_to(np.asarray(colors, dtype='u4'), (count,))
 
-            item.texture = texture
-            item.sortkey = sort_key
+        if origins is None:
+            origins = 0.0
+        origins = np.broadcast_to(np.asarray(origins, dtype='f8'), (count, 2))
 
-            self.__tex_coord_tl = glm.vec2(source_rect.left * texel_width, 1.0 - (source_rect.top * texel_height))
-            self.__tex_coord_br = glm.vec2((source_rect.left + source_rect.w) * texel_width,
-                                           1.0 - ((source_rect.top + source_rect.h) * texel_height))
+        if rotations is not None:
+            rotations = np.broadcast_to(np.asarray(rotations, dtype='f8'), (count,))
+            if not rotations.any():
+                rotations = None
 
-            if self.__game.is_origin_topleft():
-                self.__tex_coord_tl.y, self.__tex_coord_br.y = self.__tex_coord_br.y, self.__tex_coord_tl.y
-
-            if rotation == 0:
-                item.set(offset.x + position.x, offset.y + position.y,
-                         w, h,
-                         chars_colors[i],
-                         self.__tex_coord_tl, self.__tex_coord_br, layer_depth)
-            else:
-                item.set_extended(position.x, position.y,
-                                  offset.x, offset.y,
-                                  w, h,
-                                  utils.sin_deg(rotation), utils.cos_deg(rotation),
-                                  chars_colors[i],
-                                  self.__tex_coord_tl, self.__tex_coord_br,
-                                  layer_depth)
-
-            offset.x += kerning_width
+        self.__batcher.create_batch_items(texture, sort_keys, positions, origins, sizes, rotations, colors,
+                                          uv_rects, layer_depths)
 
         # We need to flush if we're using Immediate sort mode.
         self.flush_if_needed()
 
-    def draw_string_sprite_font(self, sprite_font, text, position, color):
-        offset = glm.vec2(0, 0)
-        first_char_of_line = True
-
-        for c in text:
-            c_ord = ord(c)
-
-            if c == '\r':
-                continue
-            if c == '\n':
-                offset.x = 0
-                offset.y += sprite_font.line_height
-                first_char_of_line = True
-                continue
-
-            current_glyph = sprite_font.glyphs[c_ord]
-
-            if first_char_of_line:
-                offset.x = max(current_glyph.xoffset, 0)
-                first_char_of_line = False
-            else:
-                offset.x += sprite_font.spacing + current_glyph.xoffset
-
-            texture = sprite_font.sprite_frame_list[current_glyph.page].texture
-            sortkey = texture.sorting_key if self.__sort_mode == SpriteSortMode.TEXTURE else 0
-            item = self.__batcher.create_batch_item()
-            item.texture = texture
-            item.sortkey = sortkey
-
-            texel_width = 1.0 / texture.width
-            texel_height = 1.0 / texture.height
-            self.__tex_coord_tl = glm.vec2(current_glyph.x * texel_width, 1.0 - (current_glyph.y * texel_height))
-            self.__tex_coord_br = glm.vec2((current_glyph.x + current_glyph.width) * texel_width,
-                                           1.0 - ((current_glyph.y + current_glyph.height) * texel_height))
+    def draw_string(self, sp_sheet: SpriteSheet, text: str, position: glm.vec2,
+                    w: float, h: float, rotation: float,
+                    chars_colors=None, kerning_width=0, layer_depth: float = 0.1):
+        glyphs = self.__layout_string(sp_sheet, text, position, w, h, rotation, chars_colors, kerning_width)
+        self.__draw_glyphs(glyphs, layer_depth)
+
+    def build_string(self, sp_sheet: SpriteSheet, text: str, position: glm.vec2,
+                     w: float, h: float, rotation: float,
+                     chars_colors=None, kerning_width=0, layer_depth: float = 0.1) -> GlyphRun:
+        """
+        Lays out the string draw_string would draw, without drawing it, see GlyphRun.
+        """
+        glyphs = self.__layout_string(sp_sheet, text, position, w, h, rotation, chars_colors, kerning_width)
+        return self.__build_glyph_run(glyphs, layer_depth)
+
+    def draw_glyph_run(self, glyph_run: GlyphRun):
+        """
+        Draws a string laid out by build_string or build_string_sprite_font_ex.
+        """
+        if glyph_run.instanced != self.__instanced:
+            raise Exception('The glyph run was built by a sprite batch of another kind.')
+
+        for texture, quads in glyph_run.segments:
+            self.check_valid(texture)
+            self.__batcher.add_quads(texture, self.__sort_key(texture, glyph_run.layer_depth), quads)
 
-            if self.__game.is_origin_topleft():
-                self.__tex_coord_tl.y, self.__tex_coord_br.y = self.__tex_coord_br.y, self.__tex_coord_tl.y
+        # We need to flush if we're using Immediate sort mode.
+        self.flush_if_needed()
 
-            p = glm.vec2(offset)
-            p.x += current_glyph.xoffset
-            p.y += current_glyph.yoffset
-            p += position
+    def draw_string_sprite_font(self, sprite_font, text, position, color):
+        glyphs = self.__layout_string_sprite_font(sprite_font, text, position, color, 0, glm.vec2(0), glm.vec2(1),
+                                                  SpriteEffects.NONE)
+        self.__draw_glyphs(glyphs, 0)
 
-            item.set(p.x, p.y,
-                     current_glyph.width, current_glyph.height,
-                     color,
-                     self.__tex_coord_tl, self.__tex_coord_br, 0)
+    def draw_string_sprite_font_ex(self, sprite_font, text: str, position: glm.vec2, color: pg.Color,
+                                   rotation: float, origin: glm.vec2, scale: glm.vec2, effects: SpriteEffects,
+                                   layer_depth: float):
+        glyphs = self.__layout_string_sprite_font(sprite_font, text, position, color, rotation, origin, scale,
+                                                  effects)
+        self.__draw_glyphs(glyphs, layer_depth)
+
+    def build_string_sprite_font_ex(self, sprite_font, text: str, position: glm.vec2, color: pg.Color,
+                                    rotation: float, origin: glm.vec2, scale: glm.vec2, effects: SpriteEffects,
+                                    layer_depth: float) -> GlyphRun:
+        """
+        Lays out the string draw_string_sprite_font_ex would draw, without drawing it, see GlyphRun.
+        """
+        glyphs = self.__layout_string_sprite_font(sprite_font, text, position, color, rotation, origin, scale,
+                                                  effects)
+        return self.__build_glyph_run(glyphs, layer_depth)
 
-            offset.x += current_glyph.xadvance
+    #
+    # The string layouts return the glyphs as arrays with one row per glyph, in the order of the text:
+    # (page_textures, pages, positions, origins, sizes, rotations, colors, uv_rects, char_indices)
+    # with the arguments of SpriteBatcher.create_batch_items, the texture of glyph i page_textures[pages[i]]
+    # and its character text[char_indices[i]].
+    #
+    def __draw_glyphs(self, glyphs: tuple, layer_depth: float):
+        page_textures, pages, positions, origins, sizes, rotations, colors, uv_rects, _ = glyphs
+        count = len(positions)
+        depths = np.full(count, layer_depth)
+
+        # one batch of items per run of consecutive glyphs on the same page, to keep the drawing order
+        if count > 0:
+            starts = [0, *(np.flatnonzero(pages[1:] != pages[:-1]) + 1), count]
+            for first, last in zip(starts[:-1], starts[1:]):
+                texture = page_textures[pages[first]]
+                self.check_valid(texture)
+                self.__batcher.create_batch_items(texture, self.__sort_key(texture, layer_depth),
+                                                  positions[first:last], origins[first:last], sizes[first:last],
+                                                  None if rotations is None else rotations[first:last],
+                                                  colors[first:last], uv_rects[first:last], depths[first:last])
 
         # We need to flush if we're using Immediate sort mode.
         self.flush_if_needed()
 
-    def draw_string_sprite_font_ex(self, sprite_font, text: str, position: glm.vec2, color: pg.Color,
-                                   rotation: float, origin: glm.vec2, scale: glm.vec2, effects: SpriteEffects,
-                                   layer_depth: float):
+    def __build_glyph_run(self, glyphs: tuple, layer_depth: float) -> GlyphRun:
+        page_textures, pages, positions, origins, sizes, rotations, colors, uv_rects, char_indices = glyphs
+        count = len(positions)
+        quads = self.__batcher.create_quads(count)
+        self.__batcher.fill_quads(quads, positions, origins, sizes, rotations, colors, uv_rects,
+                                  np.full(count, layer_depth))
+        return GlyphRun(quads, [page_textures[page] for page in pages], layer_depth, self.__instanced, char_indices)
+
+    @staticmethod
+    def __glyph_lines(table: GlyphTable, text: str) -> tuple:
+        """
+        Returns the codepoints of the drawn characters of text (line breaks excluded), their index in text,
+        their line and the index of the first drawn character of their line.
+        """
+        codes = np.fromiter(map(ord, text), dtype='i8', count=len(text))
+        newlines = codes == 10
+        indices = np.flatnonzero(~newlines & (codes != 13))
+        codes = table.check(codes[indices])
+        lines = np.cumsum(newlines)[indices]
+
+        line_starts = np.ones(len(codes), dtype='?')
+        line_starts[1:] = lines[1:] != lines[:-1]
+        first_of_line = np.maximum.accumulate(np.where(line_starts, np.arange(len(codes)), 0))
+        return codes, indices, lines, first_of_line
+
+    def __layout_string(self, sp_sheet: SpriteSheet, text: str, position: glm.vec2, w: float, h: float,
+                        rotation: float, chars_colors, kerning_width) -> tuple:
+        table = sp_sheet.glyph_table
+        codes, indices, lines, first_of_line = SpriteBatch.__glyph_lines(table, text)
+        count = len(codes)
+
+        # glyphs are laid out on whole pixels, every w + kerning_width on a line, and the lines every h
+        offsets = np.empty((count, 2))
+        offsets[:, 0] = (np.arange(count) - first_of_line) * (int(w) + int(kerning_width))
+        offsets[:, 1] = lines * int(h)
+
+        if rotation == 0:
+            positions = offsets + (position.x, position.y)
+            origins = np.zeros((count, 2))
+            rotations = None
+        else:
+            # each glyph is rotated around position
+            positions = np.broadcast_to(np.array([position.x, position.y]), (count, 2))
+            origins = -offsets
+            rotations = np.full(count, float(rotation))
+
+        if chars_colors is None:
+            colors = np.full(count, 0xFFFFFFFF, dtype='u4')
+        elif isinstance(chars_colors, np.ndarray):
+            # already packed, see Text
+            colors = chars_colors.astype('u4', copy=False)[indices]
+        else:
+            colors = np.fromiter((_packed_color(c) for c in chars_colors), dtype='u4', count=len(chars_colors))
+            colors = colors[indices]
+
+        uv_rects = table.uv_rects[codes]
+        if self.__game.is_origin_topleft():
+            uv_rects = uv_rects[:, [0, 3, 2, 1]]
+
+        sizes = np.broadcast_to(np.array([w, h], dtype='f8'), (count, 2))
+        return [sp_sheet.texture2d], table.pages[codes], positions, origins, sizes, rotations, colors, uv_rects, \
+            indices
+
+    def __layout_string_sprite_font(self, sprite_font, text: str, position: glm.vec2, color: pg.Color,
+                                    rotation: float, origin: glm.vec2, scale: glm.vec2,
+                                    effects: SpriteEffects) -> tuple:
+        rgba = _packed_color(color)
+        origin = glm.vec2(origin)
         flip_adjustment = glm.vec2(0)
         flipped_vert = (effects & SpriteEffects.FLIP_VERTICALLY) == SpriteEffects.FLIP_VERTICALLY
         flipped_horz = (effects & SpriteEffects.FLIP_HORIZONTALLY) == SpriteEffects.FLIP_HORIZONTALLY
@@ -598,97 +1448,60 @@ class SpriteBatch(IDisposable):
                 origin.y *= -1
                 flip_adjustment.y = sprite_font.line_height - size.y
 
-        transformation = glm.identity(glm.mat4)
-        scale_vec = glm.vec3((-scale.x if flipped_horz else scale.x), (-scale.y if flipped_vert else scale.y), 1.0)
-        scale_mat = glm.scale(transformation, scale_vec)
-        trans_vec = glm.vec3(((flip_adjustment.x - origin.x) * scale_vec.x) + position.x,
-                             ((flip_adjustment.y - origin.y) * scale_vec.y) + position.y,
-                             0.0)
-        trans_mat = glm.translate(transformation, trans_vec)
-        if rotation == 0:
-            transformation = trans_mat * scale_mat
-        else:
-            scale_rot = glm.rotate(transformation, glm.radians(rotation), glm.vec3(0, 0, 1))
-            transformation = trans_mat * scale_mat * scale_rot
-
-        offset = glm.vec2(0)
-        first_char_of_line = True
-        sort_key = 0.0
-
-        for c in list(text):
-            c_ord = ord(c)
-
-            if c == '\r':
-                continue
-            if c == '\n':
-                offset.x = 0
-                offset.y += sprite_font.line_height
-                first_char_of_line = True
-                continue
-
-            current_glyph = sprite_font.glyphs[c_ord]
-            texture = sprite_font.sprite_frame_list[current_glyph.page].texture
-
-            if self.__sort_mode == SpriteSortMode.TEXTURE:
-                sort_key = texture.sorting_key
-            elif self.__sort_mode == SpriteSortMode.FRONT_TO_BACK:
-                sort_key = layer_depth
-            elif self.__sort_mode == SpriteSortMode.BACK_TO_FRONT:
-                sort_key = -layer_depth
-
-            if first_char_of_line:
-                offset.x = max(current_glyph.xoffset, 0)
-                first_char_of_line = False
-            else:
-                offset.x += sprite_font.spacing + current_glyph.xoffset
-
-            p = glm.vec2(offset)
-            if flipped_horz:
-                p.x += current_glyph.width
-            p.x += current_glyph.xoffset
-
-            if flipped_vert:
-                p.y += current_glyph.height - sprite_font.line_height
-            p.y += current_glyph.yoffset
-
-            p = transformation * glm.vec4(p.x, p.y, 0, 1)
+        # the glyphs are rotated, then scaled, then translated
+        scale_x = -scale.x if flipped_horz else scale.x
+        scale_y = -scale.y if flipped_vert else scale.y
+        translation_x = ((flip_adjustment.x - origin.x) * scale_x) + position.x
+        translation_y = ((flip_adjustment.y - origin.y) * scale_y) + position.y
+
+        sprite_font.require_glyphs(text)
+        table = sprite_font.glyph_table
+        codes, indices, lines, first_of_line = SpriteBatch.__glyph_lines(table, text)
+        count = len(codes)
+        rects = table.rects[codes]
+        glyph_offsets = table.offsets[codes]
+
+        # the pen moves by the advance of the previous glyph, the spacing and the xoffset of the glyph,
+        # the first glyph of a line starts at its xoffset when positive
+        line_starts = first_of_line == np.arange(count)
+        steps = np.empty(count)
+        steps[1:] = table.advances[codes[:-1]] + sprite_font.spacing + glyph_offsets[1:, 0]
+        steps[line_starts] = np.maximum(glyph_offsets[line_starts, 0], 0)
+        pens = np.cumsum(steps)
+        pens += steps[first_of_line] - pens[first_of_line]
+
+        x = pens + glyph_offsets[:, 0]
+        if flipped_horz:
+            x += rects[:, 2]
+        y = lines * float(sprite_font.line_height) + glyph_offsets[:, 1]
+        if flipped_vert:
+            y += rects[:, 3] - sprite_font.line_height
+
+        if rotation != 0:
+            radians = np.radians(rotation)
+            cos = np.cos(radians)
+            sin = np.sin(radians)
+            x, y = x * cos - y * sin, x * sin + y * cos
+
+        positions = np.empty((count, 2))
+        positions[:, 0] = translation_x + x * scale_x
+        positions[:, 1] = translation_y + y * scale_y
+        sizes = rects[:, 2:4] * (scale.x, scale.y)
+
+        uv_rects = table.uv_rects[codes]
+        if self.__game.is_origin_topleft():
+            uv_rects = uv_rects[:, [0, 3, 2, 1]]
 
-            item = self.__batcher.create_batch_item()
-            item.texture = texture
-            item.sortkey = sort_key
+        if effects & SpriteEffects.FLIP_VERTICALLY:
+            uv_rects = uv_rects[:, [0, 3, 2, 1]]
 
-            texel_width = 1.0 / texture.width
-            texel_height = 1.0 / texture.height
-            self.__tex_coord_tl = glm.vec2(current_glyph.x * texel_width, 1.0 - (current_glyph.y * texel_height))
-            self.__tex_coord_br = glm.vec2((current_glyph.x + current_glyph.width) * texel_width,
-                                           1.0 - ((current_glyph.y + current_glyph.height) * texel_height))
-
-            if self.__game.is_origin_topleft():
-                self.__tex_coord_tl.y, self.__tex_coord_br.y = self.__tex_coord_br.y, self.__tex_coord_tl.y
-
-            if effects & SpriteEffects.FLIP_VERTICALLY:
-                self.__tex_coord_tl.y, self.__tex_coord_br.y = self.__tex_coord_br.y, self.__tex_coord_tl.y
-
-            if effects & SpriteEffects.FLIP_HORIZONTALLY:
-                self.__tex_coord_tl.x, self.__tex_coord_br.x = self.__tex_coord_br.x, self.__tex_coord_tl.x
-
-            if rotation == 0:
-                item.set(p.x, p.y,
-                         current_glyph.width * scale.x, current_glyph.height * scale.y,
-                         color,
-                         self.__tex_coord_tl, self.__tex_coord_br, layer_depth)
-            else:
-                item.set_extended(p.x, p.y,
-                                  0, 0,
-                                  current_glyph.width * scale.x, current_glyph.height * scale.y,
-                                  utils.sin_deg(rotation), utils.cos_deg(rotation),
-                                  color,
-                                  self.__tex_coord_tl, self.__tex_coord_br, layer_depth)
-
-            offset.x += current_glyph.xadvance
+        if effects & SpriteEffects.FLIP_HORIZONTALLY:
+            uv_rects = uv_rects[:, [2, 1, 0, 3]]
 
-        # We need to flush if we're using Immediate sort mode.
-        self.flush_if_needed()
+        page_textures = [frame.texture for frame in sprite_font.sprite_frame_list]
+        rotations = None if rotation == 0 else np.full(count, float(rotation))
+        return page_textures, table.pages[codes], positions, np.zeros((count, 2)), sizes, rotations, \
+            np.full(count, rgba, dtype='u4'), uv_rects, indices
 
     def dispose(self):
         self.__batcher.dispose()
@@ -0,0 +1,198 @@
+import os
+from collections import OrderedDict
+
+import pygame as pg
+
+from pyjam.constants import *
+from pyjam.interfaces import IDisposable
+from pyjam.sprites.font import SpriteFont
+from pyjam.sprites.frame import SpriteFrame
+from pyjam.sprites.glyphs import GlyphTable
+from pyjam.texture import TextureSampling
+
+# empty pixels around each glyph cell, so that linear filtering doesn't sample the neighbouring glyphs
+GLYPH_PADDING = 1
+# tall and wide glyphs sizing the cells up front, larger glyphs met later enlarge them
+CELL_PROBE = 'ÂÅÇÉÖÜgjpqy|_WMÆ'
+
+
+class DynamicFont(SpriteFont, IDisposable):
+    """
+    A SpriteFont rasterizing the glyphs of a TrueType font with pygame.font when they're first laid out.
+
+    The glyphs are cropped to their ink and stored in the square cells of a grid, on a single page which doubles
+    in size when it's full, up to max_page_size. Then the cells of the least recently laid out glyphs are reused,
+    and the generation of the font is incremented so that the strings laid out with them are built again (see Text).
+    A glyph larger than the cells empties the page into larger cells, also incrementing the generation.
+    Growing or reusing cells uploads the page to a new texture, as glyphs waiting in the sprite batches still draw
+    the previous one, which is released at the end of the frame.
+    Fonts are created by the FontService.
+    """
+
+    def __init__(self, game, filename: str, size: int, page_size: int = 256, max_page_size: int = 2048):
+        """ filename is relative to the assets root, None for the default pygame font """
+        super().__init__(game)
+        fname = None if filename is None else os.path.join(game.get_assets_root(), filename)
+        self.__pg_font = pg.font.Font(fname, size)
+
+        self.size = size
+        self.line_height = self.__pg_font.get_linesize()
+        self.base = self.__pg_font.get_ascent()
+        self.spacing = 0
+        self.pages = 1
+
+        # glyphs rising above the ascent or going below the descent are taller than the font height
+        self.__cell_size = max(self.__pg_font.get_height(), self.__glyph_extent(CELL_PROBE)) + 2 * GLYPH_PADDING
+        self.__page_size = max(page_size, self.__cell_size)
+        self.__max_page_size = max(max_page_size, self.__page_size)
+
+        # the page is kept in memory to be copied into the larger texture when growing
+        self.__page_surface = pg.Surface((self.__page_size, self.__page_size), pg.SRCALPHA)
+        self.sprite_frame_list.append(SpriteFrame(self.__create_page_texture()))
+
+        # cells of the glyphs in least recently laid out first order, keyed by codepoint
+        self.__lru = OrderedDict()
+        self.__free_cells = self.__grid_cells(0)
+        self._glyph_table = GlyphTable([])
+
+        # whether the page texture was created by the current require_glyphs call, so no batch draws it yet
+        self.__page_replaced = False
+
+    @property
+    def page_size(self) -> int:
+        return self.__page_size
+
+    @property
+    def glyph_count(self) -> int:
+        return len(self.__lru)
+
+    def require_glyphs(self, text: str):
+        """ Rasterizes the glyphs of text missing from the page """
+        codes = {ord(c) for c in text if c != '\n' and c != '\r'}
+        for code in codes:
+            if code in self.__lru:
+                self.__lru.move_to_end(code)
+        self.__page_replaced = False
+        missing = [code for code in codes if code not in self.__lru]
+        while len(missing) > 0:
+            if not self.__add_glyph(missing.pop(), codes):
+                # the cells were enlarged, the glyphs already added are gone with the previous ones
+                missing = [code for code in codes if code not in self.__lru]
+
+    def __render_glyph(self, code: int) -> tuple:
+        """ Returns the glyph surface cropped to its ink, and its offsets from the pen at the top of the line """
+        glyph_surface = self.__pg_font.render(chr(code), True, pg.Color('white'))
+        ink = glyph_surface.get_bounding_rect()
+
+        # the surface grows above the ascent to fit glyphs rising above it, and left of the pen for glyphs
+        # extending before it, the baseline is at the ascent otherwise
+        metrics = self.__pg_font.metrics(chr(code))[0]
+        min_x, max_y = (0, self.base) if metrics is None else (metrics[0], metrics[3])
+        xoffset = ink.x + min(0, min_x)
+        yoffset = ink.y - max(0, max_y - self.base)
+        return glyph_surface.subsurface(ink), xoffset, yoffset
+
+    def __glyph_extent(self, text: str) -> int:
+        """ The largest width or height of the glyphs of text, cropped to their ink """
+        extent = 0
+        for c in text:
+            ink = self.__pg_font.render(c, True, pg.Color('white')).get_bounding_rect()
+            extent = max(extent, ink.w, ink.h)
+        return extent
+
+    def __add_glyph(self, code: int, required: set) -> bool:
+        """ Returns False when the glyph didn't fit the cells, which were enlarged and emptied """
+        glyph_surface, xoffset, yoffset = self.__render_glyph(code)
+        width, height = glyph_surface.get_size()
+        if max(width, height) + 2 * GLYPH_PADDING > self.__cell_size:
+            self.__enlarge_cells(max(width, height) + 2 * GLYPH_PADDING)
+            return False
+
+        while len(self.__free_cells) == 0:
+            if self.__page_size < self.__max_page_size:
+                self.__grow()
+            else:
+                self.__evict(required)
+
+        cell = self.__free_cells.pop()
+        self.__lru[code] = cell
+        x = cell[0] + GLYPH_PADDING
+        y = cell[1] + GLYPH_PADDING
+
+        # clears what an evicted glyph left in the cell
+        self.__page_surface.fill((0, 0, 0, 0), pg.Rect(cell, (self.__cell_size, self.__cell_size)))
+        self.__page_surface.blit(glyph_surface, (x, y))
+        self.__upload_cell(cell)
+
+        advance = self.__pg_font.size(chr(code))[0]
+        self._glyph_table.set_glyph((code, x, y, width, height, xoffset, yoffset, advance, 0))
+        return True
+
+    def __evict(self, required: set):
+        # the cell of the evicted glyph is rewritten, glyphs already laid out with it must keep the previous page
+        if not self.__page_replaced:
+            self.__replace_page()
+        for code in self.__lru:
+            if code not in required:
+                self.__free_cells.append(self.__lru.pop(code))
+                self._glyph_table.remove_glyph(code)
+                self.generation += 1
+                return
+        raise Exception(f'Dynamic font page too small for {len(required)} glyphs: {self.__page_size} pixels')
+
+    def __grow(self):
+        old_size = self.__page_size
+        self.__page_size = min(old_size * 2, self.__max_page_size)
+        surface = pg.Surface((self.__page_size, self.__page_size), pg.SRCALPHA)
+        surface.blit(self.__page_surface, (0, 0))
+        self.__page_surface = surface
+
+        # the cells keep their position from the top left corner, their texture coordinates change
+        self.__replace_page()
+        self.__free_cells = self.__grid_cells(old_size) + self.__free_cells
+        self.generation += 1
+
+    def __enlarge_cells(self, cell_size: int):
+        self.__cell_size = cell_size
+        self.__page_size = max(self.__page_size, cell_size)
+        self.__max_page_size = max(self.__max_page_size, self.__page_size)
+        self.__page_surface = pg.Surface((self.__page_size, self.__page_size), pg.SRCALPHA)
+
+        self.__replace_page()
+        self.__lru.clear()
+        self.__free_cells = self.__grid_cells(0)
+        self._glyph_table = GlyphTable([])
+        self.generation += 1
+
+    def __replace_page(self):
+        texture_service = self.game.services[TEXTURE_SERVICE]
+        texture_service.release_texture(self.sprite_frame_list[0].texture)
+        self.sprite_frame_list[0] = SpriteFrame(self.__create_page_texture())
+        self.__page_replaced = True
+
+    def __grid_cells(self, old_size: int) -> list:
+        # the cells not in the old_size x old_size top left corner, the last ones are used first
+        count = self.__page_size // self.__cell_size
+        old_count = old_size // self.__cell_size
+        cells = [(col * self.__cell_size, row * self.__cell_size)
+                 for row in range(count) for col in range(count) if row >= old_count or col >= old_count]
+        cells.reverse()
+        return cells
+
+    def __create_page_texture(self):
+        # textures are stored upside down, see TextureService.load_texture
+        texture_service = self.game.services[TEXTURE_SERVICE]
+        return texture_service._from_pixels(self.__page_surface.get_size(), 4,
+                                            pg.image.tostring(self.__page_surface, 'RGBA', True),
+                                            TextureSampling.LINEAR)
+
+    def __upload_cell(self, cell: tuple):
+        cell_rect = pg.Rect(cell, (self.__cell_size, self.__cell_size))
+        pixels = pg.image.tostring(self.__page_surface.subsurface(cell_rect), 'RGBA', True)
+        viewport = (cell_rect.x, self.__page_size - cell_rect.bottom, cell_rect.w, cell_rect.h)
+        self.sprite_frame_list[0].texture.mgl_texture.write(pixels, viewport=viewport)
+
+    def dispose(self):
+        for frame in self.sprite_frame_list:
+            frame.texture.dispose()
+        self.sprite_frame_list.clear()
@@ -4,6 +4,10 @@ import xml.etree.ElementTree as ET
 import glm
 
 from pyjam.constants import *
+from pyjam.interfaces import ITextureAsset
+from pyjam.sprites.frame import SpriteFrame
+from pyjam.sprites.glyphs import GlyphTable
+from pyjam.texture import TextureSampling
 
 
 class Glyphs:
@@ -31,7 +35,7 @@ class Glyphs:
 #
 # https://www.angelcode.com/products/bmfont/doc/file_format.html
 #
-class SpriteFont:
+class SpriteFont(ITextureAsset):
     def __init__(self, game):
         # The size of the true type font
         self.size = 0
@@ -43,83 +47,123 @@ class SpriteFont:
         self.spacing = 0
         # The number of texture pages included in the font
         self.pages = 0
+        # The distance in pixels covered by the values of a distance field font, 0 for bitmap fonts
+        self.distance_range = 0
 
         self.glyphs = {}
         self.sprite_frame_list = []
         self.game = game
 
-    def load(self, filename: str):
-        asset_root = self.game.get_assets_root()
-        tree = ET.parse(os.path.join(asset_root, filename))
-        font_elem = tree.getroot()
-        info_elem = font_elem.find('info')
-        self.size = int(info_elem.attrib['size'])
-        spacing = info_elem.attrib['spacing']
-        self.spacing = int(spacing.split(',')[0])
-        common_elem = font_elem.find('common')
-        self.line_height = int(common_elem.attrib['lineHeight'])
-        self.base = int(common_elem.attrib['base'])
-        self.pages = int(common_elem.attrib['pages'])
-        pages_elem = font_elem.find('pages')
-        for page in pages_elem.findall('page'):
-            # page_id = int(page.attrib['id'])
-            page_file = page.attrib['file']
-            texture_service = self.game.services[TEXTURE_SERVICE]
-            texture_path = os.path.join(os.path.dirname(filename), page_file)
-            sprite_frame = texture_service.load_sprite_frame(texture_path)
+        self._glyph_table = None
+
+        # incremented when glyphs already laid out move in the pages, see DynamicFont
+        self.generation = 0
+
+    def load(self, filename: str, sdf: bool = False):
+        """
+        sdf loads the pages as signed distance fields (see tools/sdf_font.py), drawn sharp at any scale
+        by the sdf_sprites shader. Fonts declaring a distanceField element are loaded as such anyway.
+        """
+        # the parsed font is cached, see AssetCacheService
+        fname = os.path.join(self.game.get_assets_root(), filename)
+        cache = self.game.services[ASSET_CACHE_SERVICE]
+        font_data = cache.load(fname, 'font')
+        if font_data is None:
+            font_data = SpriteFont.parse_font_file(fname)
+            cache.store(fname, 'font', font_data)
+
+        self.size = font_data['size']
+        self.spacing = font_data['spacing']
+        self.line_height = font_data['line_height']
+        self.base = font_data['base']
+        self.pages = font_data['pages']
+        self.distance_range = font_data.get('distance_range', 0)
+        sdf = sdf or self.distance_range > 0
+
+        texture_service = self.game.services[TEXTURE_SERVICE]
+        texture_paths = [os.path.join(os.path.dirname(filename), page_file) for page_file in font_data['page_files']]
+        if sdf:
+            # distances are interpolated between texels, mipmaps would blur the outlines of small glyphs
+            for texture_path in texture_paths:
+                texture_service.set_sampling_rule(texture_path, TextureSampling.LINEAR)
+        # pages are decoded in parallel
+        if len(texture_paths) > 1:
+            texture_service.preload_textures(texture_paths)
+        for texture_path in texture_paths:
+            # the pages belong to the font, they're unloaded with it (see AssetService.pop)
+            sprite_frame = SpriteFrame(texture_service.load_texture(texture_path))
+            sprite_frame.texture.distance_field = sdf
             self.sprite_frame_list.append(sprite_frame)
 
-        chars_elem = font_elem.find('chars')
-        for char in chars_elem.findall('char'):
+        for char in font_data['chars']:
             g = Glyphs()
-            g.id = int(char.attrib['id'])
-            g.x = int(char.attrib['x'])
-            g.y = int(char.attrib['y'])
-            g.width = int(char.attrib['width'])
-            g.height = int(char.attrib['height'])
-            g.xoffset = int(char.attrib['xoffset'])
-            g.yoffset = int(char.attrib['yoffset'])
-            g.xadvance = int(char.attrib['xadvance'])
-            g.page = int(char.attrib['page'])
+            g.id, g.x, g.y, g.width, g.height, g.xoffset, g.yoffset, g.xadvance, g.page = char
             self.glyphs[g.id] = g
+        self._glyph_table = GlyphTable(font_data['chars'])
 
         self.game.services[ASSET_SERVICE].insert(filename, self)
 
+    @staticmethod
+    def parse_font_file(fname: str) -> dict:
+        """
+        Parses a BMFont XML file into a dict of plain values,
+        chars are (id, x, y, width, height, xoffset, yoffset, xadvance, page) tuples.
+        distance_range is read from the distanceField element of distance field fonts, 0 when missing.
+        """
+        tree = ET.parse(fname)
+        font_elem = tree.getroot()
+        info_elem = font_elem.find('info')
+        common_elem = font_elem.find('common')
+        pages_elem = font_elem.find('pages')
+        chars_elem = font_elem.find('chars')
+        distance_field_elem = font_elem.find('distanceField')
+        distance_range = int(distance_field_elem.attrib['distanceRange']) if distance_field_elem is not None else 0
+        return {
+            'size': int(info_elem.attrib['size']),
+            'spacing': int(info_elem.attrib['spacing'].split(',')[0]),
+            'line_height': int(common_elem.attrib['lineHeight']),
+            'base': int(common_elem.attrib['base']),
+            'pages': int(common_elem.attrib['pages']),
+            'page_files': [page.attrib['file'] for page in pages_elem.findall('page')],
+            'distance_range': distance_range,
+            'chars': [tuple(int(char.attrib[key]) for key in
+                            ('id', 'x', 'y', 'width', 'height', 'xoffset', 'yoffset', 'xadvance', 'page'))
+                      for char in chars_elem.findall('char')]}
+
+    @property
+    def textures(self) -> list:
+        return [frame.texture for frame in self.sprite_frame_list]
+
+    @property
+    def glyph_table(self) -> GlyphTable:
+        """ The glyphs as arrays indexed by codepoint, with the texture coordinates of the current page textures """
+        self._glyph_table.update_uv_rects(self.sprite_frame_list)
+        return self._glyph_table
+
+    def require_glyphs(self, text: str):
+        """ Called before laying out text, the glyphs of a bitmap font are all loaded already """
+        pass
+
     def measure_string(self, text: str):
         if text == '':
             return glm.vec2(0)
 
-        final_line_height = float(self.line_height)
-        offset = glm.vec2(0)
-        first_glyph_of_line = True
-
-        for i in range(len(text)):
-            c = text[i]
-
-            if c == '\r':
-                continue
-
-            if c == '\n':
-                final_line_height = float(self.line_height)
-                offset.x = 0
-                offset.y += final_line_height
-                continue
+        # only the last line counts in the width, as the lines are not measured separately
+        self.require_glyphs(text)
+        lines = text.split('\n')
+        table = self.glyph_table
+        codes = table.lookup(lines[-1].replace('\r', ''))
 
-            current_glyph = self.glyphs[c]
-
-            # The first character on a line might have a negative left side bearing.
-            # In this scenario, SpriteBatch/SpriteFont normally offset the text to the right,
-            # so that text does not hang off the left side of its rectangle.
-            if first_glyph_of_line:
-                offset.x = 0
-                first_glyph_of_line = False
-
-            if i != len(text)-1:
-                offset.x += current_glyph.xadvance
+        # The first character on a line might have a negative left side bearing.
+        # In this scenario, SpriteBatch/SpriteFont normally offset the text to the right,
+        # so that text does not hang off the left side of its rectangle.
+        width = 0.0
+        final_line_height = float(self.line_height)
+        if len(codes) > 0:
+            if text[-1] != '\r':
+                width = table.advances[codes[:-1]].sum() + table.rects[codes[-1], 2]
             else:
-                offset.x += current_glyph.width
-
-            if current_glyph.height > final_line_height:
-                final_line_height = current_glyph.height
+                width = table.advances[codes].sum()
+            final_line_height = max(final_line_height, table.rects[codes, 3].max())
 
-        return glm.vec2(offset.x, offset.y+final_line_height)
+        return glm.vec2(width, (len(lines) - 1) * self.line_height + final_line_height)
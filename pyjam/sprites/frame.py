@@ -1,8 +1,12 @@
 import pygame as pg
 
+from pyjam.interfaces import ITextureAsset
+
 
 # a simple pair of Texture2D and Rect, used to represent square region of a texture atlas
-class SpriteFrame:
+class SpriteFrame(ITextureAsset):
+    __slots__ = ('texture', 'rect')
+
     def __init__(self, texture, rect=None):
         self.texture = texture
         if rect is None:
@@ -10,6 +14,10 @@ class SpriteFrame:
         else:
             self.rect = rect
 
+    @property
+    def textures(self) -> list:
+        return [self.texture]
+
     @property
     def width(self):
         return self.rect.width
@@ -0,0 +1,106 @@
+import numpy as np
+
+
+class GlyphTable:
+    """
+    The glyphs of a font as dense arrays indexed by codepoint, so that strings are laid out with array gathers.
+    Rows of the codepoints without a glyph are zeros, with defined False.
+    """
+
+    __slots__ = ('rects', 'offsets', 'advances', 'pages', 'defined', 'uv_rects', '__page_textures', '__page_info')
+
+    def __init__(self, chars):
+        """
+        chars are (id, x, y, width, height, xoffset, yoffset, xadvance, page) tuples, see SpriteFont.parse_font_file.
+        """
+        chars = np.array(list(chars), dtype='i8').reshape(-1, 9)
+        ids = chars[:, 0]
+        size = int(ids.max()) + 1 if len(ids) > 0 else 0
+
+        # x, y, width, height in pixels of the glyph image in its page
+        self.rects = np.zeros((size, 4), dtype='f8')
+        self.rects[ids] = chars[:, 1:5]
+        # xoffset, yoffset
+        self.offsets = np.zeros((size, 2), dtype='f8')
+        self.offsets[ids] = chars[:, 5:7]
+        self.advances = np.zeros(size, dtype='f8')
+        self.advances[ids] = chars[:, 7]
+        self.pages = np.zeros(size, dtype='i4')
+        self.pages[ids] = chars[:, 8]
+        self.defined = np.zeros(size, dtype='?')
+        self.defined[ids] = True
+
+        # u_tl, v_tl, u_br, v_br texture coordinates, see update_uv_rects
+        self.uv_rects = np.zeros((size, 4), dtype='f8')
+        self.__page_textures = None
+        # per page: left, top, 1 / width, 1 / height
+        self.__page_info = None
+
+    def update_uv_rects(self, page_frames: list):
+        """
+        Computes the texture coordinates of the glyphs from the SpriteFrame of each page, the glyph rects
+        being relative to the frame rects. Only done again when the textures of the frames change,
+        e.g. when they are packed into an atlas.
+        """
+        page_textures = [frame.texture for frame in page_frames]
+        if page_textures == self.__page_textures:
+            return
+        self.__page_textures = page_textures
+
+        self.__page_info = np.array([(frame.rect.left, frame.rect.top,
+                                      1.0 / frame.texture.width, 1.0 / frame.texture.height)
+                                     for frame in page_frames], dtype='f8').reshape(-1, 4)
+        self.__update_uv_rows(slice(None))
+
+    def __update_uv_rows(self, rows):
+        if len(self.__page_info) == 0:
+            return
+        rects = self.rects[rows]
+        info = self.__page_info[np.minimum(self.pages[rows], len(self.__page_info) - 1)]
+        left = rects[..., 0] + info[..., 0]
+        top = rects[..., 1] + info[..., 1]
+        self.uv_rects[rows, 0] = left * info[..., 2]
+        self.uv_rects[rows, 1] = 1.0 - top * info[..., 3]
+        self.uv_rects[rows, 2] = (left + rects[..., 2]) * info[..., 2]
+        self.uv_rects[rows, 3] = 1.0 - (top + rects[..., 3]) * info[..., 3]
+
+    def set_glyph(self, char: tuple):
+        """ Adds or replaces a glyph, char is a tuple as given to the constructor """
+        code = char[0]
+        if code >= len(self.defined):
+            # grown to the next power of two, so that adding glyphs one by one doesn't copy the arrays every time
+            self.__resize(1 << int(code).bit_length())
+
+        self.rects[code] = char[1:5]
+        self.offsets[code] = char[5:7]
+        self.advances[code] = char[7]
+        self.pages[code] = char[8]
+        self.defined[code] = True
+        if self.__page_info is not None:
+            self.__update_uv_rows(code)
+
+    def remove_glyph(self, code: int):
+        if code < len(self.defined):
+            self.rects[code] = 0
+            self.offsets[code] = 0
+            self.advances[code] = 0
+            self.pages[code] = 0
+            self.defined[code] = False
+            self.uv_rects[code] = 0
+
+    def __resize(self, size: int):
+        for name in ('rects', 'offsets', 'advances', 'pages', 'defined', 'uv_rects'):
+            old = getattr(self, name)
+            new = np.zeros((size,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def lookup(self, text: str) -> np.ndarray:
+        """ Returns the codepoints of text, checking that the font has a glyph for each of them """
+        return self.check(np.fromiter(map(ord, text), dtype='i8', count=len(text)))
+
+    def check(self, codes: np.ndarray) -> np.ndarray:
+        if len(codes) > 0 and (codes.max() >= len(self.defined) or not self.defined[codes].all()):
+            missing = [chr(c) for c in codes if c >= len(self.defined) or not self.defined[c]]
+            raise Exception(f'No glyph for characters: {missing}')
+        return codes
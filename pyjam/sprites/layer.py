@@ -0,0 +1,63 @@
+from pyjam.interfaces import IDisposable
+from pyjam.sprites.batch import SpriteBatch, SpriteSortMode
+
+
+class StaticLayer(IDisposable):
+    """
+    A group of sprites that seldom change.
+
+    The sprites are built once into a retained vertex buffer, then every frame the whole layer is drawn
+    with one call per texture, behind the sprites submitted to the same sprite batch.
+    Member sprites are neither updated nor re-submitted: call mark_dirty after changing any of them,
+    and the layer is rebuilt the next time it is rendered.
+    """
+
+    def __init__(self, game, sprites=None):
+        self.__game = game
+        self.__sprites = [] if sprites is None else list(sprites)
+        self.__batch = game.create_sprite_batch()
+        self.__dirty = True
+
+        # whether the layer is visible during drawing
+        self.visible = True
+
+    @property
+    def sprites(self) -> tuple:
+        return tuple(self.__sprites)
+
+    def add(self, sprite):
+        self.__sprites.append(sprite)
+        self.__dirty = True
+
+    def remove(self, sprite):
+        self.__sprites.remove(sprite)
+        self.__dirty = True
+
+    def mark_dirty(self):
+        self.__dirty = True
+
+    def update(self, delta_time: float):
+        pass
+
+    def render(self, sprite_batch: SpriteBatch):
+        if not self.visible:
+            return
+        if self.__dirty:
+            self.rebuild()
+        sprite_batch.draw_static(self.__batch)
+
+    def rebuild(self):
+        # immediate mode would draw the sprites while building the layer
+        sort_mode = self.__game.get_sprite_batch_sort_mode()
+        if sort_mode == SpriteSortMode.IMMEDIATE:
+            sort_mode = SpriteSortMode.DEFERRED
+
+        self.__batch.begin(sort_mode=sort_mode)
+        for sprite in self.__sprites:
+            if sprite.visible:
+                sprite.render(self.__batch)
+        self.__batch.end_retained()
+        self.__dirty = False
+
+    def dispose(self):
+        self.__batch.dispose()
@@ -3,10 +3,12 @@ import os
 import pygame as pg
 
 from pyjam.constants import *
+from pyjam.interfaces import ITextureAsset
 from pyjam.sprites.frame import SpriteFrame
+from pyjam.sprites.glyphs import GlyphTable
 
 
-class SpriteSheet:
+class SpriteSheet(ITextureAsset):
     def __init__(self, game):
         self.__texture_mgr = game.services[TEXTURE_SERVICE]
         self.__cell_width = 0
@@ -18,12 +20,39 @@ class SpriteSheet:
         self.frames = {}
         # used only for bitmapped fonts
         self.kerning_width = 0.0
+        self.__glyph_table = None
+        # incremented when the frames move to another texture, so that laid out strings are built again
+        self.generation = 0
         self.__game = game
 
     @property
     def texture2d(self):
         return self.__texture2d
 
+    @texture2d.setter
+    def texture2d(self, texture):
+        # used when the sheet is packed into a texture atlas
+        self.__texture2d = texture
+        self.__glyph_table = None
+        self.generation += 1
+
+    @property
+    def textures(self) -> list:
+        # the frames may refer to atlas pages other than the one of the sheet
+        return [self.__texture2d] + [frame.texture for frame in self.frames.values()]
+
+    @property
+    def glyph_table(self) -> GlyphTable:
+        """
+        The frames named after a codepoint (str(ord(c))), as used by bitmapped fonts, as arrays indexed by codepoint.
+        """
+        if self.__glyph_table is None:
+            chars = [(int(name), frame.rect.x, frame.rect.y, frame.rect.w, frame.rect.h, 0, 0, frame.rect.w, 0)
+                     for name, frame in self.frames.items() if name.isdigit()]
+            self.__glyph_table = GlyphTable(chars)
+            self.__glyph_table.update_uv_rects([SpriteFrame(self.__texture2d)])
+        return self.__glyph_table
+
     def save_rect_file(self, filename):
         with open(filename, 'w') as f:
             for key, frame in self.frames.items():
@@ -31,6 +60,7 @@ class SpriteSheet:
 
     def load_grid(self, filename, frame_name, cw, ch, item_x, item_y, starting_id=0):
         self.__texture2d = self.__texture_mgr.load_texture(filename)
+        self.__glyph_table = None
         self.__cell_width = cw
         self.__cell_height = ch
         y = 0
@@ -58,21 +88,35 @@ class SpriteSheet:
 
     def load_rects(self, filename):
         self.__texture2d = self.__texture_mgr.load_texture(filename)
+        self.__glyph_table = None
 
-        i = 0
         asset_root = self.__game.get_assets_root()
         filename_without_ext = os.path.splitext(filename)
-        rect_filename = filename_without_ext[0] + '.rects'
-        file1 = open(os.path.join(asset_root, rect_filename), 'r')
-        for line in file1:
-            line = line.strip()
-            # skip enmpty lines
-            if len(line) == 0:
-                continue
-            items = line.split(":")
-            rectangle = pg.Rect(int(items[1]), int(items[2]), int(items[3]), int(items[4]))
-            self.frames[items[0]] = SpriteFrame(self.__texture2d, rectangle)
-            i += 1
-
-        self.__num_items = i
+        rect_filename = os.path.join(asset_root, filename_without_ext[0] + '.rects')
+
+        # the parsed rects are cached, see AssetCacheService
+        cache = self.__game.services[ASSET_CACHE_SERVICE]
+        rects = cache.load(rect_filename, 'rects')
+        if rects is None:
+            rects = SpriteSheet.parse_rect_file(rect_filename)
+            cache.store(rect_filename, 'rects', rects)
+
+        for name, x, y, w, h in rects:
+            self.frames[name] = SpriteFrame(self.__texture2d, pg.Rect(x, y, w, h))
+
+        self.__num_items = len(rects)
         self.__game.services[ASSET_SERVICE].insert(filename, self)
+
+    @staticmethod
+    def parse_rect_file(rect_filename) -> list:
+        """ Returns the (name, x, y, w, h) tuples of a .rects file """
+        rects = []
+        with open(rect_filename, 'r') as file1:
+            for line in file1:
+                line = line.strip()
+                # skip enmpty lines
+                if len(line) == 0:
+                    continue
+                items = line.split(":")
+                rects.append((items[0], int(items[1]), int(items[2]), int(items[3]), int(items[4])))
+        return rects
@@ -0,0 +1,36 @@
+import numpy as np
+
+
+class SpriteSorter:
+    """
+    Computes the drawing order of the batch items from their sort keys.
+
+    Keys are quantized to 16 bit buckets, so NumPy can use its linear time radix sort, and the order
+    of the previous frame is reused as long as the quantized keys don't change.
+    Items falling in the same bucket keep their submission order.
+    """
+
+    # sort keys are either layer depths in [0, 1] (negated for back-to-front) or texture sorting keys
+    DEPTH_BUCKETS = 65536
+
+    def __init__(self):
+        self.__last_buckets = None
+        self.__last_order = None
+
+    def argsort(self, sort_keys: np.ndarray, by_depth: bool) -> np.ndarray:
+        if by_depth:
+            # maps [-1, 1] to [0, 65535]
+            half = (SpriteSorter.DEPTH_BUCKETS - 1) / 2.0
+            buckets = np.clip(np.rint((sort_keys + 1.0) * half), 0, SpriteSorter.DEPTH_BUCKETS - 1).astype('u2')
+        elif len(sort_keys) == 0 or sort_keys.max() < SpriteSorter.DEPTH_BUCKETS:
+            buckets = sort_keys.astype('u2')
+        else:
+            buckets = sort_keys.astype('i8')
+
+        if self.__last_buckets is not None and np.array_equal(buckets, self.__last_buckets):
+            return self.__last_order
+
+        # a stable sort keeps the submission order of items with the same key
+        self.__last_order = np.argsort(buckets, kind='stable')
+        self.__last_buckets = buckets
+        return self.__last_order
@@ -0,0 +1,49 @@
+import timeit
+
+import pygame as pg
+
+from pyjam import utils
+
+
+def swap_endians_eval(value):
+    # the previous swap_endians, parsing its masks with eval on every call
+    leftmost_byte = (value & eval('0x000000FF')) >> 0
+    left_middle_byle = (value & eval('0x0000FF00')) >> 8
+    right_middle_byte = (value & eval('0x00FF0000')) >> 16
+    rightmost_byte = (value & eval('0xFF000000')) >> 24
+
+    leftmost_byte <<= 24
+    left_middle_byle <<= 16
+    right_middle_byte <<= 8
+    rightmost_byte <<= 0
+
+    return (leftmost_byte | left_middle_byle
+            | right_middle_byte | rightmost_byte)
+
+
+def test_pack_color_values():
+    print('--- test_pack_color_values')
+    for color in [pg.Color('white'), pg.Color('red'), pg.Color(16, 230, 206, 255), pg.Color(1, 2, 3, 4)]:
+        packed = utils.pack_color(color)
+        assert packed == swap_endians_eval(int(color)) == utils.swap_endians(int(color))
+        print(f'{color} -> 0x{packed:08X}')
+
+
+def bench_color_packing(n=100000):
+    print(f'--- bench_color_packing ({n} colors, i.e. 4 vertices each)')
+    color = pg.Color(16, 230, 206, 255)
+    packed = utils.pack_color(color)
+
+    t = timeit.timeit(lambda: swap_endians_eval(int(color)), number=n)
+    print(f'swap_endians with eval : {t * 1000:8.2f} ms')
+    t = timeit.timeit(lambda: utils.swap_endians(int(color)), number=n)
+    print(f'swap_endians           : {t * 1000:8.2f} ms')
+    t = timeit.timeit(lambda: utils.pack_color(color), number=n)
+    print(f'pack_color             : {t * 1000:8.2f} ms')
+    t = timeit.timeit(lambda: packed if type(packed) is int else utils.pack_color(packed), number=n)
+    print(f'cached packed color    : {t * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    test_pack_color_values()
+    bench_color_packing()
@@ -0,0 +1,59 @@
+import glm
+import pygame as pg
+from pyjam.application import Game
+from pyjam.constants import *
+from pyjam.text import Text
+
+
+class JamDrawDynamicFont(Game):
+    def __init__(self):
+        super().__init__()
+
+        self.set_framerate(60)
+        self.counter_text = None
+        self.counter = 0
+
+    def setup_display(self):
+        self.set_virtual_display_resolution(800, 600)
+        self.set_display_resolution(1024, 768, flags=pg.DOUBLEBUF | pg.RESIZABLE | pg.OPENGL)
+
+        pg.display.set_caption('pyjam DynamicFont')
+
+    def initialize(self):
+        self.set_assets_root('../assets')
+
+        self.set_bg_color(pg.Color('aquamarine4'))
+
+        # the default pygame font, with a small page to see it grow then reuse the cells of unused glyphs
+        font = self.services[FONT_SERVICE].load_font(None, 32, page_size=64, max_page_size=256)
+
+        text1 = Text('Glyphs rasterized on demand', font)
+        text1.position = glm.vec2(32, 32)
+        self.texts.append(text1)
+
+        text2 = Text('Ünïcödé àçcéñts, ¿qué? ½ © ±', font)
+        text2.position = glm.vec2(32, 96)
+        text2.color = pg.Color('yellow')
+        self.texts.append(text2)
+
+        self.counter_text = Text('', font)
+        self.counter_text.position = glm.vec2(32, 160)
+        self.counter_text.scale = glm.vec2(2, 2)
+        self.texts.append(self.counter_text)
+
+    def update(self):
+        # cycles through the Latin-1 letters, so that the least recently used glyphs get evicted
+        self.counter += 1
+        first = 0xC0 + (self.counter // 30) % 32
+        self.counter_text.text = ''.join(chr(first + i) for i in range(8))
+
+        super().update()
+
+        font = self.services[FONT_SERVICE].load_font(None, 32)
+        pg.display.set_caption(f'pyjam DynamicFont - {self.clock.get_fps():.0f} FPS'
+                               f' - page: {font.page_size}px - glyphs: {font.glyph_count}')
+
+
+if __name__ == '__main__':
+    app = JamDrawDynamicFont()
+    app.run()
@@ -0,0 +1,63 @@
+import glm
+import pygame as pg
+from pyjam.application import Game
+from pyjam.sprites.font import SpriteFont
+from pyjam.text import Text
+
+
+class JamDrawSdfFont(Game):
+    def __init__(self):
+        super().__init__()
+
+        self.set_framerate(60)
+        self.zoom_text = None
+        self.counter = 0
+
+    def setup_display(self):
+        self.set_virtual_display_resolution(800, 600)
+        self.set_display_resolution(1024, 768, flags=pg.DOUBLEBUF | pg.RESIZABLE | pg.OPENGL)
+
+        pg.display.set_caption('pyjam SDF font')
+
+    def initialize(self):
+        self.set_assets_root('../assets')
+
+        self.set_bg_color(pg.Color('aquamarine4'))
+
+        # fonts/kf-xml-sdf.fnt is generated from the bitmap font with:
+        #   python -m pyjam.tools.sdf_font pyjam/assets/fonts/kf-xml.fnt pyjam/assets/fonts/kf-xml-sdf.fnt
+        bitmap_font = SpriteFont(self)
+        bitmap_font.load('fonts/kf-xml.fnt')
+        sdf_font = SpriteFont(self)
+        sdf_font.load('fonts/kf-xml-sdf.fnt', sdf=True)
+
+        # the same strings scaled up, blurry with the bitmap font, sharp with the distance field
+        for i, scale in enumerate((1, 2, 3)):
+            bitmap_text = Text('Bitmap', bitmap_font)
+            bitmap_text.position = glm.vec2(16, 16 + i * 96)
+            bitmap_text.scale = glm.vec2(scale, scale)
+            self.texts.append(bitmap_text)
+
+            sdf_text = Text('SDF', sdf_font)
+            sdf_text.position = glm.vec2(400, 16 + i * 96)
+            sdf_text.scale = glm.vec2(scale, scale)
+            sdf_text.color = pg.Color('yellow')
+            self.texts.append(sdf_text)
+
+        self.zoom_text = Text('Zoom', sdf_font)
+        self.zoom_text.position = glm.vec2(16, 320)
+        self.texts.append(self.zoom_text)
+
+    def update(self):
+        self.counter += 1
+        scale = 1.5 + glm.sin(self.counter / 60) * 1.25
+        self.zoom_text.scale = glm.vec2(scale, scale)
+
+        super().update()
+
+        pg.display.set_caption(f'pyjam SDF font - {self.clock.get_fps():.0f} FPS')
+
+
+if __name__ == '__main__':
+    app = JamDrawSdfFont()
+    app.run()
@@ -0,0 +1,109 @@
+"""
+Runs test scripts offscreen for a number of frames, to check that they still run on a machine without display:
+
+    python headless-run.py draw-dynamic-font.py draw-sdf-font.py --frames 400
+
+The OpenGL context is an EGL standalone context (e.g. Mesa llvmpipe) drawing into an offscreen framebuffer
+standing for the screen. The last frame of each script is saved next to it as <script>-headless.png.
+Exits with an error on the first script raising an exception.
+"""
+
+import argparse
+import os
+import runpy
+import sys
+
+os.environ['SDL_VIDEODRIVER'] = 'dummy'
+os.environ['SDL_AUDIODRIVER'] = 'dummy'
+
+import moderngl as mgl
+import PIL.Image
+import PIL.ImageOps
+import pygame as pg
+
+from pyjam.application import Game
+
+
+class HeadlessDisplay:
+    def __init__(self, frames: int):
+        self.frames = frames
+        self.frame = 0
+        self.size = (1, 1)
+        self.ctx = None
+        self.screenshot = None
+
+        self.__set_mode = pg.display.set_mode
+        pg.display.set_mode = self.set_mode
+        pg.display.gl_set_attribute = lambda *args: None
+        pg.display.flip = lambda: None
+        mgl.create_context = self.create_context
+
+        # the frames are counted once the events of each frame are processed
+        process_events = Game.process_events
+
+        def count_frame(game: Game):
+            process_events(game)
+            self.end_frame(game)
+
+        Game.process_events = count_frame
+
+    def set_mode(self, size, flags=0, *args):
+        # the dummy video driver has no OpenGL support
+        self.size = tuple(size)
+        return self.__set_mode(size, flags & ~pg.OPENGL, *args)
+
+    def create_context(self, *args, **kwargs):
+        self.ctx = mgl.create_standalone_context(backend='egl')
+        # standalone contexts have no default framebuffer, the game draws into this one instead
+        self.ctx._screen = self.ctx.simple_framebuffer(self.size)
+        self.ctx.screen.use()
+        return self.ctx
+
+    def end_frame(self, game: Game):
+        self.frame += 1
+        if self.frame >= self.frames:
+            pixels = self.ctx.screen.read(components=3)
+            self.screenshot = PIL.ImageOps.flip(PIL.Image.frombytes('RGB', self.ctx.screen.size, pixels))
+            game.signal_quit()
+
+    def run_game(self, game: Game) -> PIL.Image.Image:
+        """ Runs a game for the frames and returns its last frame """
+        self.frame = 0
+        self.screenshot = None
+        game.run()
+
+        if self.frame < self.frames:
+            raise Exception(f'{type(game).__name__} quit after {self.frame} frames')
+        return self.screenshot
+
+    def run(self, script: str):
+        self.frame = 0
+        self.screenshot = None
+
+        # the test scripts load their assets relative to their folder
+        cwd = os.getcwd()
+        os.chdir(os.path.dirname(os.path.abspath(script)))
+        try:
+            runpy.run_path(os.path.basename(script), run_name='__main__')
+        finally:
+            os.chdir(cwd)
+
+        if self.frame < self.frames:
+            raise Exception(f'{script} quit after {self.frame} frames')
+        self.screenshot.save(os.path.splitext(script)[0] + '-headless.png')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs test scripts offscreen')
+    parser.add_argument('scripts', nargs='+')
+    parser.add_argument('--frames', type=int, default=120)
+    args = parser.parse_args()
+
+    display = HeadlessDisplay(args.frames)
+    for script in args.scripts:
+        display.run(script)
+        print(f'{script}: {display.frame} frames')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
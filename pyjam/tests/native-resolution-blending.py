@@ -0,0 +1,74 @@
+"""
+Checks that translucent sprites blend the same with native resolution rendering on and off:
+the offscreen target must not apply the alpha twice.
+
+    python native-resolution-blending.py
+"""
+
+import os
+import runpy
+import sys
+
+import glm
+import pygame as pg
+
+from pyjam.application import Game
+from pyjam.constants import *
+from pyjam.sprite import Sprite
+from pyjam.sprites.frame import SpriteFrame
+
+HeadlessDisplay = runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'headless-run.py'))[
+    'HeadlessDisplay']
+
+# color, center of the translucent boxes, the last one overlapping the two others
+BOXES = [
+    (pg.Color(0, 151, 151, 151), glm.vec2(100, 100)),
+    (pg.Color(237, 28, 36, 200), glm.vec2(300, 100)),
+    (pg.Color(255, 255, 255, 64), glm.vec2(200, 150)),
+]
+BOX_SIZE = 160
+
+
+class JamNativeResolutionBlending(Game):
+    def __init__(self, native_resolution: bool):
+        super().__init__()
+
+        self.set_native_resolution_rendering(native_resolution)
+
+    def setup_display(self):
+        self.set_virtual_display_resolution(800, 600)
+        self.set_display_resolution(800, 600, flags=pg.DOUBLEBUF | pg.OPENGL)
+
+    def initialize(self):
+        self.set_bg_color(pg.Color('aquamarine4'))
+
+        texture_service = self.services[TEXTURE_SERVICE]
+        white_frame = SpriteFrame(texture_service.create_color_texture(pg.Color('white')))
+
+        for color, position in BOXES:
+            box = Sprite(white_frame)
+            box.size = glm.vec2(BOX_SIZE, BOX_SIZE)
+            box.position = position
+            box.color = color
+            self.sprites.append(box)
+
+
+def main():
+    display = HeadlessDisplay(frames=3)
+    screen = display.run_game(JamNativeResolutionBlending(native_resolution=False))
+    native = display.run_game(JamNativeResolutionBlending(native_resolution=True))
+
+    # the background, each box alone and the overlaps
+    points = [(600, 400), (50, 50), (350, 50), (200, 210), (150, 120), (250, 120)]
+    failed = False
+    for point in points:
+        expected, actual = screen.getpixel(point), native.getpixel(point)
+        ok = all(abs(e - a) <= 1 for e, a in zip(expected, actual))
+        failed |= not ok
+        print(f'{point}: {expected} {actual} {"ok" if ok else "FAILED"}')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import timeit
+import tracemalloc
+
+import glm
+import pygame as pg
+
+from pyjam.sprite import Sprite
+from pyjam.sprites.frame import SpriteFrame
+
+NUM_SPRITES = 10000
+
+
+# the two layouts of the attributes Sprite.render and the game loops touch every frame
+class DictSprite:
+    def __init__(self):
+        self.__position = glm.vec2(0, 0)
+        self.__hotspot = glm.vec2(8, 8)
+        self.__size = glm.vec2(16, 16)
+        self.__scale = glm.vec2(1, 1)
+        self.__angle = 0.0
+        self.__layer_depth = 0.5
+        self.__active = True
+        self.__visible = True
+
+    @property
+    def position(self):
+        return self.__position
+
+    @property
+    def visible(self):
+        return self.__visible
+
+    @property
+    def angle(self):
+        return self.__angle
+
+
+class SlotSprite:
+    __slots__ = ('__position', '__hotspot', '__size', '__scale', '__angle', '__layer_depth', '__active', '__visible')
+
+    def __init__(self):
+        self.__position = glm.vec2(0, 0)
+        self.__hotspot = glm.vec2(8, 8)
+        self.__size = glm.vec2(16, 16)
+        self.__scale = glm.vec2(1, 1)
+        self.__angle = 0.0
+        self.__layer_depth = 0.5
+        self.__active = True
+        self.__visible = True
+
+    @property
+    def position(self):
+        return self.__position
+
+    @property
+    def visible(self):
+        return self.__visible
+
+    @property
+    def angle(self):
+        return self.__angle
+
+
+def allocated_bytes(factory) -> int:
+    tracemalloc.start()
+    objects = [factory() for i in range(NUM_SPRITES)]
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return size
+
+
+def access_time(objects) -> float:
+    def frame():
+        total = 0.0
+        for s in objects:
+            if s.visible:
+                total += s.position.x + s.angle
+        return total
+
+    return timeit.timeit(frame, number=100) / 100
+
+
+def check_slots():
+    # a base class without __slots__ gives the instances of slotted classes a __dict__ back
+    frame = SpriteFrame(None, pg.Rect(0, 0, 16, 16))
+    for obj in (frame, Sprite(frame)):
+        if hasattr(obj, '__dict__'):
+            raise Exception(f'{type(obj).__name__} has a __dict__')
+
+
+def bench_layouts():
+    print(f'--- bench_layouts ({NUM_SPRITES} sprites)')
+    for name, cls in [('dict', DictSprite), ('slots', SlotSprite)]:
+        size = allocated_bytes(cls)
+        t = access_time([cls() for i in range(NUM_SPRITES)])
+        print(f'{name:6}: {size / NUM_SPRITES:7.1f} bytes/sprite, {t * 1000:6.2f} ms/frame')
+
+
+def bench_sprite():
+    print(f'--- bench_sprite ({NUM_SPRITES} pyjam sprites)')
+    frame = SpriteFrame(None, pg.Rect(0, 0, 16, 16))
+    size = allocated_bytes(lambda: Sprite(frame))
+    t = access_time([Sprite(frame) for i in range(NUM_SPRITES)])
+    print(f'Sprite: {size / NUM_SPRITES:7.1f} bytes/sprite, {t * 1000:6.2f} ms/frame')
+
+
+if __name__ == '__main__':
+    check_slots()
+    bench_layouts()
+    bench_sprite()
@@ -0,0 +1,61 @@
+import numpy as np
+import pygame as pg
+from pyjam.application import Game
+from pyjam.constants import *
+from pyjam.sprites.array import SpriteArray
+from pyjam.sprites.frame import SpriteFrame
+
+NUM_SPRITES = 20000
+
+
+class JamSpriteArray(Game):
+    def __init__(self):
+        super().__init__()
+
+        self.set_framerate(60)
+        self.sprite_array = None
+        self.velocities = None
+
+    def setup_display(self):
+        self.set_virtual_display_resolution(800, 600)
+        self.set_display_resolution(1024, 768, flags=pg.DOUBLEBUF | pg.RESIZABLE | pg.OPENGL)
+
+        pg.display.set_caption('pyjam SpriteArray')
+
+    def initialize(self):
+        self.set_assets_root('../assets')
+
+        self.set_bg_color(pg.Color('aquamarine4'))
+
+        texture_service = self.services[TEXTURE_SERVICE]
+
+        test_frame = texture_service.load_sprite_frame('textures/test.png')
+        white_frame = SpriteFrame(texture_service.create_color_texture(pg.Color('white')))
+
+        self.sprite_array = SpriteArray([test_frame, white_frame], capacity=NUM_SPRITES)
+        for i in range(NUM_SPRITES):
+            self.sprite_array.add(frame_index=i % 2, size=(16, 16),
+                                  color=pg.Color(np.random.randint(64, 256), np.random.randint(64, 256), 255))
+
+        # the sprites move in a world 3 times larger than the view, so that most of them are culled
+        self.sprite_array.positions[:] = np.random.uniform((-800, -600), (1600, 1200), (NUM_SPRITES, 2))
+        self.sprite_array.layer_depths[:] = np.random.uniform(0, 1, NUM_SPRITES)
+        self.velocities = np.random.uniform(-100, 100, (NUM_SPRITES, 2))
+        self.sprite_arrays.append(self.sprite_array)
+
+    def update(self):
+        positions = self.sprite_array.positions[:self.sprite_array.count]
+        positions += self.velocities * self.delta_time
+        bounce = (positions < (-800, -600)) | (positions > (1600, 1200))
+        self.velocities[bounce] = -self.velocities[bounce]
+        self.sprite_array.angles[:self.sprite_array.count] += 90 * self.delta_time
+
+        super().update()
+
+        pg.display.set_caption(f'pyjam SpriteArray - {self.clock.get_fps():.0f} FPS'
+                               f' - submitted: {self.sprites_submitted} - culled: {self.sprites_culled}')
+
+
+if __name__ == '__main__':
+    app = JamSpriteArray()
+    app.run()
@@ -6,6 +6,7 @@
 from enum import Enum
 
 import glm
+import numpy as np
 import pygame as pg
 
 import pyjam.utils
@@ -20,6 +21,11 @@ class TextAlignment(Enum):
 
 
 class Text:
+    __slots__ = ('__text', '__position', '__size', '__visible', '__active', '__layer_depth', '__sheet_or_font',
+                 '__hotspot', '__scale', '__angle', '__alignment', '__color', '__char_colors', '__use_char_colors',
+                 '__packed_color', '__packed_char_colors', '__glyph_run', '__layout_dirty', '__layout_vectors',
+                 '__layout_generation')
+
     def __init__(self, text: str, sheet_or_font):
         self.__text = text
         self.__position = glm.vec2(0)
@@ -35,6 +41,15 @@ class Text:
         self.__color = pg.Color('White')
         self.__char_colors = []
         self.__use_char_colors = False
+        # colors packed once on assignment as the batcher stores them (see pyjam.utils.pack_color)
+        self.__packed_color = 0xFFFFFFFF
+        self.__packed_char_colors = np.zeros(0, dtype='u4')
+        # the glyphs laid out by the last render, built again when the text or its transform change, the colors
+        # are patched in place; the vectors are compared by value as they can be modified in place through the getters
+        self.__glyph_run = None
+        self.__layout_dirty = True
+        self.__layout_vectors = None
+        self.__layout_generation = 0
 
     def total_width(self):
         return len(self.__text) * self.__size.x
@@ -46,6 +61,7 @@ class Text:
     @text.setter
     def text(self, value: str):
         self.__text = value
+        self.__layout_dirty = True
         if self.__use_char_colors:
             if len(self.__text) > len(self.__char_colors):
                 while len(self.__text) > len(self.__char_colors):
@@ -54,6 +70,11 @@ class Text:
                 while len(self.__text) < len(self.__char_colors):
                     self.__char_colors.pop()
 
+            packed_char_colors = np.full(len(self.__text), self.__packed_color, dtype='u4')
+            kept = min(len(self.__text), len(self.__packed_char_colors))
+            packed_char_colors[:kept] = self.__packed_char_colors[:kept]
+            self.__packed_char_colors = packed_char_colors
+
     @property
     def position(self) -> glm.vec2:
         return self.__position
@@ -77,8 +98,12 @@ class Text:
     @color.setter
     def color(self, value: pg.Color):
         self.__color = value
+        self.__packed_color = pyjam.utils.pack_color(value)
         self.__char_colors.clear()
+        self.__packed_char_colors = np.zeros(0, dtype='u4')
         self.__use_char_colors = False
+        if self.__glyph_run is not None and not self.__layout_dirty:
+            self.__glyph_run.set_char_colors(np.full(len(self.__text), self.__packed_color, dtype='u4'))
 
     def get_char_color(self, idx):
         if not self.__use_char_colors:
@@ -91,9 +116,15 @@ class Text:
             self.__char_colors.clear()
             for i in range(len(self.__text)):
                 self.__char_colors.append(pg.Color(self.__color))
+            self.__packed_char_colors = np.full(len(self.__text), self.__packed_color, dtype='u4')
             self.__use_char_colors = True
 
         self.__char_colors[idx] = pg.Color(value)
+        self.__packed_char_colors[idx] = pyjam.utils.pack_color(self.__char_colors[idx])
+
+        # only the vertex colors of the glyph change, a run built later gets them from the packed colors
+        if self.__glyph_run is not None and not self.__layout_dirty:
+            self.__glyph_run.set_char_color(idx % len(self.__text), self.__packed_char_colors[idx])
 
     @property
     def visible(self) -> bool:
@@ -118,6 +149,7 @@ class Text:
     @angle.setter
     def angle(self, value):
         self.__angle = pyjam.utils.wrap_angle_deg_180(value)
+        self.__layout_dirty = True
 
     @property
     def layer_depth(self) -> float:
@@ -126,6 +158,7 @@ class Text:
     @layer_depth.setter
     def layer_depth(self, value):
         self.__layer_depth = value
+        self.__layout_dirty = True
 
     @property
     def hotspot(self) -> glm.vec2:
@@ -150,39 +183,59 @@ class Text:
     @alignment.setter
     def alignment(self, value):
         self.__alignment = value
+        self.__layout_dirty = True
+
+    def invalidate_layout(self):
+        """ Lays out the glyphs again on the next render, e.g. after the font frames were packed into an atlas """
+        self.__layout_dirty = True
 
     def update(self, delta_time: float):
         pass
 
     def render(self, batch: SpriteBatch):
         if self.visible:
-            if type(self.__sheet_or_font) is SpriteSheet:
-                pos = glm.vec2(self.position)
-                if self.__alignment == TextAlignment.CENTER:
-                    total_width = self.total_width()
-                    pos.x -= total_width / 2.0
-                elif self.__alignment == TextAlignment.RIGHT:
-                    total_width = self.total_width()
-                    pos.x -= total_width
-
-                if self.__use_char_colors:
-                    colors = self.__char_colors
-                else:
-                    colors = [self.__color] * len(self.text)
-
-                batch.draw_string(sp_sheet=self.__sheet_or_font,
-                                  text=self.text,
-                                  position=pos,
-                                  w=self.size.x, h=self.size.y,
-                                  rotation=self.angle,
-                                  chars_colors=colors,
-                                  kerning_width=self.__sheet_or_font.kerning_width,
-                                  layer_depth=self.layer_depth)
+            vectors = (self.__position, self.__size, self.__hotspot, self.__scale)
+            if self.__layout_dirty or self.__layout_vectors != vectors or \
+                    self.__layout_generation != self.__sheet_or_font.generation or \
+                    self.__glyph_run.instanced != batch.instanced:
+                self.__glyph_run = self.__build_glyph_run(batch)
+                self.__layout_vectors = tuple(glm.vec2(v) for v in vectors)
+                self.__layout_generation = self.__sheet_or_font.generation
+                self.__layout_dirty = False
+
+            batch.draw_glyph_run(self.__glyph_run)
+
+    def __build_glyph_run(self, batch: SpriteBatch):
+        if type(self.__sheet_or_font) is SpriteSheet:
+            pos = glm.vec2(self.position)
+            if self.__alignment == TextAlignment.CENTER:
+                total_width = self.total_width()
+                pos.x -= total_width / 2.0
+            elif self.__alignment == TextAlignment.RIGHT:
+                total_width = self.total_width()
+                pos.x -= total_width
+
+            if self.__use_char_colors:
+                colors = self.__packed_char_colors
+            else:
+                colors = np.full(len(self.text), self.__packed_color, dtype='u4')
+
+            return batch.build_string(sp_sheet=self.__sheet_or_font,
+                                      text=self.text,
+                                      position=pos,
+                                      w=self.size.x, h=self.size.y,
+                                      rotation=self.angle,
+                                      chars_colors=colors,
+                                      kerning_width=self.__sheet_or_font.kerning_width,
+                                      layer_depth=self.layer_depth)
+        else:
+            if self.size != glm.vec2(0, 0):
+                scale = glm.vec2(self.size.x / self.__sheet_or_font.size, self.size.y / self.__sheet_or_font.size)
             else:
-                if self.size != glm.vec2(0, 0):
-                    scale = glm.vec2(self.size.x / self.__sheet_or_font.size, self.size.y / self.__sheet_or_font.size)
-                else:
-                    scale = self.scale
-                batch.draw_string_sprite_font_ex(self.__sheet_or_font, self.text, self.position, self.color,
-                                                 self.angle, self.hotspot, scale,
-                                                 SpriteEffects.NONE, self.layer_depth)
+                scale = self.scale
+            glyph_run = batch.build_string_sprite_font_ex(self.__sheet_or_font, self.text, self.position,
+                                                          self.__packed_color, self.angle, self.hotspot, scale,
+                                                          SpriteEffects.NONE, self.layer_depth)
+            if self.__use_char_colors:
+                glyph_run.set_char_colors(self.__packed_char_colors)
+            return glyph_run
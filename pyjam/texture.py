@@ -1,35 +1,119 @@
 # a tiny wrapper on mlg texture
 
+from enum import Enum
+
 import moderngl as mgl
 
 from pyjam.interfaces import IDisposable
 
+_MIPMAP_FILTERS = (mgl.NEAREST_MIPMAP_NEAREST, mgl.LINEAR_MIPMAP_NEAREST,
+                   mgl.NEAREST_MIPMAP_LINEAR, mgl.LINEAR_MIPMAP_LINEAR)
+
+# internal format of the compressed textures (from GL_EXT_texture_compression_s3tc), 16 bytes per 4x4 texels block
+GL_COMPRESSED_RGBA_S3TC_DXT5_EXT = 0x83F3
+S3TC_EXTENSION = 'GL_EXT_texture_compression_s3tc'
+
+
+class TextureSampling(Enum):
+    # Trilinear filtering over the mipmaps, with anisotropic filtering, for textures drawn at any scale or angle.
+    MIPMAPPED = 0,
+
+    # Bilinear filtering without mipmaps, for textures drawn close to their size.
+    LINEAR = 1,
+
+    # Nearest filtering without mipmaps nor anisotropy, for pixel art drawn at integer scales and plain colors.
+    PIXEL_ART = 2
+
 
 class Texture2D(IDisposable):
     __last_sorting_key = 0
 
-    def __init__(self, mgltex: mgl.Texture):
+    def __init__(self, mgltex: mgl.Texture = None, loader=None, size: tuple = None, name: str = None,
+                 sampling: TextureSampling = None, compressed: bool = False):
+        """
+        A texture with a loader (a callable returning the mgl texture) can be created without its mgl texture,
+        which is then loaded on first use, and can be evicted from the GPU to be loaded again later
+        (see TextureService). size must be given when mgltex is not.
+        """
         self.__mgltex = mgltex
+        self.__loader = loader
+        self.__size = tuple(mgltex.size) if mgltex is not None else tuple(size)
         Texture2D.__last_sorting_key += 1
         self.__sorting_key = Texture2D.__last_sorting_key
 
+        # the asset path, used in reports
+        self.name = name
+
+        # the sampling the texture was set up with, None when set up outside of the TextureService
+        self.sampling = sampling
+
+        # whether the texture is stored as S3TC DXT5 blocks on the GPU
+        self.compressed = compressed
+
+        # whether the alpha channel holds a signed distance field, drawn with the sdf_sprites shader (see SpriteFont)
+        self.distance_field = False
+
+        # called with this texture every time it's bound for drawing
+        self.on_use = None
+
     def dispose(self):
-        self.__mgltex.release()
+        if self.__mgltex is not None:
+            self.__mgltex.release()
+            self.__mgltex = None
+        self.__loader = None
 
     @property
     def width(self):
-        return self.__mgltex.width
+        return self.__size[0]
 
     @property
     def height(self):
-        return self.__mgltex.height
+        return self.__size[1]
 
     @property
     def mgl_texture(self):
+        if self.__mgltex is None:
+            if self.__loader is None:
+                raise Exception(f'Texture disposed: {self.name}')
+            self.__mgltex = self.__loader()
         return self.__mgltex
 
     @property
     def sorting_key(self):
         return self.__sorting_key
 
+    @property
+    def resident(self) -> bool:
+        """ Whether the texture is loaded on the GPU """
+        return self.__mgltex is not None
+
+    @property
+    def evictable(self) -> bool:
+        return self.__loader is not None
+
+    @property
+    def byte_size(self) -> int:
+        """ GPU memory used by the texture, mipmaps included, 0 when it's not resident """
+        if self.__mgltex is None:
+            return 0
+        mgltex = self.__mgltex
+        if self.compressed:
+            size = ((mgltex.width + 3) // 4) * ((mgltex.height + 3) // 4) * 16
+        else:
+            size = mgltex.width * mgltex.height * mgltex.components * int(mgltex.dtype[1:])
+        if mgltex.filter[0] in _MIPMAP_FILTERS:
+            size = size * 4 // 3
+        return size
+
+    def use(self, location: int = 0):
+        self.mgl_texture.use(location=location)
+        if self.on_use is not None:
+            self.on_use(self)
 
+    def evict(self):
+        """ Releases the GPU texture, the next use loads it again """
+        if self.__loader is None:
+            raise Exception(f'Texture cannot be evicted: {self.name}')
+        if self.__mgltex is not None:
+            self.__mgltex.release()
+            self.__mgltex = None
@@ -0,0 +1,212 @@
+"""
+Generates a signed distance field font from a TrueType font or a BMFont XML font, to be loaded with
+SpriteFont.load(filename, sdf=True) and drawn sharp at any scale.
+
+    python -m pyjam.tools.sdf_font fonts/font.ttf fonts/font-sdf.fnt --size 32
+    python -m pyjam.tools.sdf_font fonts/kf-xml.fnt fonts/kf-xml-sdf.fnt
+
+The glyphs are rendered upscale times larger, their distance fields computed at that resolution then
+averaged down, and packed into RGBA pages with the distance in the alpha channel (0.5 on the outlines).
+The .fnt file is a BMFont XML file with a distanceField element, the glyph offsets include the spread.
+"""
+
+import argparse
+import math
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import PIL.Image
+import PIL.ImageDraw
+import PIL.ImageFont
+
+from pyjam.sprites.font import SpriteFont
+
+# the printable ASCII characters
+DEFAULT_CHARS = ''.join(chr(c) for c in range(32, 127))
+
+
+class SdfGlyph:
+    def __init__(self, code: int, field: np.ndarray, xoffset: int, yoffset: int, xadvance: int):
+        self.code = code
+        # distances in [0, 1] at the output resolution, spread included
+        self.field = field
+        self.xoffset = xoffset
+        self.yoffset = yoffset
+        self.xadvance = xadvance
+        # position in its page, see pack_glyphs
+        self.page = 0
+        self.x = 0
+        self.y = 0
+
+
+def signed_distance_field(inside: np.ndarray, spread: int, upscale: int) -> np.ndarray:
+    """
+    inside is the mask of a glyph rendered upscale times larger, with a margin of spread * upscale pixels
+    and dimensions multiple of upscale. Returns the distances to the outline, in output pixels mapped from
+    [-spread, spread] to [0, 1], at the output resolution.
+    """
+    radius = spread * upscale
+    h, w = inside.shape
+    padded = np.pad(inside, radius)
+
+    # brute force over the offsets within the spread, distances beyond are clamped anyway
+    nearest = np.full(inside.shape, float(radius))
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            d = math.hypot(dx, dy)
+            if d >= radius:
+                continue
+            shifted = padded[radius + dy:radius + dy + h, radius + dx:radius + dx + w]
+            np.minimum(nearest, np.where(shifted != inside, d, radius), out=nearest)
+
+    # the outline lies halfway between the pixel centers on each side
+    signed = np.where(inside, nearest - 0.5, 0.5 - nearest)
+    signed = signed.reshape(h // upscale, upscale, w // upscale, upscale).mean(axis=(1, 3)) / upscale
+    return np.clip(0.5 + signed / (2 * spread), 0.0, 1.0)
+
+
+def make_glyph(code: int, mask: np.ndarray, left: float, top: float, advance: float, spread: int,
+               upscale: int) -> SdfGlyph:
+    """ mask is the glyph rendered upscale times larger, its top left corner at left, top from the pen """
+    if mask.size == 0:
+        # e.g. spaces, which only advance the pen
+        return SdfGlyph(code, np.zeros((0, 0)), 0, 0, round(advance / upscale))
+
+    margin = spread * upscale
+    h, w = mask.shape
+    # the margin, then rounded up to whole output pixels
+    pad_w = -(w + 2 * margin) % upscale
+    pad_h = -(h + 2 * margin) % upscale
+    inside = np.pad(mask, ((margin, margin + pad_h), (margin, margin + pad_w)))
+    field = signed_distance_field(inside, spread, upscale)
+    return SdfGlyph(code, field, round(left / upscale) - spread, round(top / upscale) - spread,
+                    round(advance / upscale))
+
+
+def truetype_glyphs(fname: str, size: int, chars: str, spread: int, upscale: int) -> tuple:
+    """ Returns the glyphs and the line height and base of the font """
+    font = PIL.ImageFont.truetype(fname, size * upscale)
+    ascent, descent = font.getmetrics()
+    glyphs = []
+    for c in chars:
+        # the bounding box is relative to the top of the line, as the yoffset of BMFont glyphs
+        left, top, right, bottom = font.getbbox(c)
+        mask = np.zeros((0, 0), dtype='?')
+        if right > left and bottom > top:
+            img = PIL.Image.new('L', (right - left, bottom - top))
+            PIL.ImageDraw.Draw(img).text((-left, -top), c, font=font, fill=255)
+            # the box can include some of the side bearings
+            ink = img.getbbox()
+            if ink is not None:
+                mask = np.asarray(img.crop(ink)) >= 128
+                left += ink[0]
+                top += ink[1]
+        glyphs.append(make_glyph(ord(c), mask, left, top, font.getlength(c), spread, upscale))
+    return glyphs, round((ascent + descent) / upscale), round(ascent / upscale)
+
+
+def page_coverage(fname: str):
+    """ The coverage of a BMFont page as an L image: the luminance of luminance pages, else the alpha """
+    # same as TextureService._decode_image
+    img = PIL.Image.open(fname)
+    if img.mode == 'L':
+        return img
+    return img.convert('RGBA').getchannel('A')
+
+
+def bmfont_glyphs(fname: str, spread: int, upscale: int) -> tuple:
+    """ Returns the glyphs and the line height and base of the font, the glyphs keep their size """
+    font_data = SpriteFont.parse_font_file(fname)
+    pages = [page_coverage(os.path.join(os.path.dirname(fname), page_file)) for page_file in font_data['page_files']]
+    glyphs = []
+    for code, x, y, width, height, xoffset, yoffset, xadvance, page in font_data['chars']:
+        mask = np.zeros((0, 0), dtype='?')
+        if width > 0 and height > 0:
+            img = pages[page].crop((x, y, x + width, y + height))
+            img = img.resize((width * upscale, height * upscale), PIL.Image.BILINEAR)
+            mask = np.asarray(img) >= 128
+        glyphs.append(make_glyph(code, mask, xoffset * upscale, yoffset * upscale, xadvance * upscale,
+                                 spread, upscale))
+    return glyphs, font_data['line_height'], font_data['base']
+
+
+def pack_glyphs(glyphs: list, page_size: int) -> int:
+    """ Shelf packing of the glyphs, tallest first. Returns the number of pages """
+    page = 0
+    shelf_x = shelf_y = shelf_height = 0
+    for glyph in sorted(glyphs, key=lambda g: g.field.shape[0], reverse=True):
+        h, w = glyph.field.shape
+        if w > page_size or h > page_size:
+            raise Exception(f'Glyph {chr(glyph.code)!r} larger than the pages: {w}x{h}')
+        if shelf_x + w > page_size:
+            shelf_x = 0
+            shelf_y += shelf_height
+            shelf_height = 0
+        if shelf_y + h > page_size:
+            page += 1
+            shelf_x = shelf_y = shelf_height = 0
+        glyph.page, glyph.x, glyph.y = page, shelf_x, shelf_y
+        shelf_x += w
+        shelf_height = max(shelf_height, h)
+    return page + 1
+
+
+def write_font(fname: str, glyphs: list, size: int, line_height: int, base: int, spread: int, page_size: int,
+               spacing: int = 0):
+    page_count = pack_glyphs(glyphs, page_size)
+    name = os.path.splitext(os.path.basename(fname))[0]
+    page_files = [f'{name}_{page}.png' for page in range(page_count)]
+
+    # white pixels, the distances in the alpha channel
+    alphas = [np.zeros((page_size, page_size), dtype='u1') for _ in range(page_count)]
+    for glyph in glyphs:
+        h, w = glyph.field.shape
+        alphas[glyph.page][glyph.y:glyph.y + h, glyph.x:glyph.x + w] = np.round(glyph.field * 255)
+    for alpha, page_file in zip(alphas, page_files):
+        img = PIL.Image.new('RGBA', (page_size, page_size), (255, 255, 255, 0))
+        img.putalpha(PIL.Image.fromarray(alpha))
+        img.save(os.path.join(os.path.dirname(fname), page_file))
+
+    font_elem = ET.Element('font')
+    ET.SubElement(font_elem, 'info', face=name, size=str(size), spacing=f'{spacing},{spacing}',
+                  padding=','.join([str(spread)] * 4))
+    ET.SubElement(font_elem, 'common', lineHeight=str(line_height), base=str(base), scaleW=str(page_size),
+                  scaleH=str(page_size), pages=str(page_count))
+    pages_elem = ET.SubElement(font_elem, 'pages')
+    for page, page_file in enumerate(page_files):
+        ET.SubElement(pages_elem, 'page', id=str(page), file=page_file)
+    chars_elem = ET.SubElement(font_elem, 'chars', count=str(len(glyphs)))
+    for glyph in glyphs:
+        h, w = glyph.field.shape
+        ET.SubElement(chars_elem, 'char', id=str(glyph.code), x=str(glyph.x), y=str(glyph.y), width=str(w),
+                      height=str(h), xoffset=str(glyph.xoffset), yoffset=str(glyph.yoffset),
+                      xadvance=str(glyph.xadvance), page=str(glyph.page), chnl='15')
+    ET.SubElement(font_elem, 'distanceField', fieldType='sdf', distanceRange=str(2 * spread))
+    ET.indent(font_elem)
+    ET.ElementTree(font_elem).write(fname, encoding='utf-8', xml_declaration=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generates a signed distance field font')
+    parser.add_argument('source', help='a TrueType (.ttf, .otf) or BMFont XML (.fnt) font')
+    parser.add_argument('output', help='the .fnt file to write, the pages are written next to it')
+    parser.add_argument('--size', type=int, default=32, help='size of the TrueType glyphs in pixels')
+    parser.add_argument('--chars', default=DEFAULT_CHARS, help='characters of the TrueType font to include')
+    parser.add_argument('--spread', type=int, default=4, help='distance in pixels covered on each side of outlines')
+    parser.add_argument('--upscale', type=int, default=4, help='resolution of the rendered glyphs')
+    parser.add_argument('--page-size', type=int, default=512)
+    args = parser.parse_args()
+
+    if os.path.splitext(args.source)[1].lower() == '.fnt':
+        font_data = SpriteFont.parse_font_file(args.source)
+        glyphs, line_height, base = bmfont_glyphs(args.source, args.spread, args.upscale)
+        write_font(args.output, glyphs, font_data['size'], line_height, base, args.spread, args.page_size,
+                   font_data['spacing'])
+    else:
+        glyphs, line_height, base = truetype_glyphs(args.source, args.size, args.chars, args.spread, args.upscale)
+        write_font(args.output, glyphs, args.size, line_height, base, args.spread, args.page_size)
+
+
+if __name__ == '__main__':
+    main()
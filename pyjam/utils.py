@@ -199,10 +199,10 @@ def is_equal_using_dot(dot: float):
 
 
 def swap_endians(value):
-    leftmost_byte = (value & eval('0x000000FF')) >> 0
-    left_middle_byle = (value & eval('0x0000FF00')) >> 8
-    right_middle_byte = (value & eval('0x00FF0000')) >> 16
-    rightmost_byte = (value & eval('0xFF000000')) >> 24
+    leftmost_byte = (value & 0x000000FF) >> 0
+    left_middle_byle = (value & 0x0000FF00) >> 8
+    right_middle_byte = (value & 0x00FF0000) >> 16
+    rightmost_byte = (value & 0xFF000000) >> 24
 
     leftmost_byte <<= 24
     left_middle_byle <<= 16
@@ -212,3 +212,11 @@ def swap_endians(value):
     return (leftmost_byte | left_middle_byle
             | right_middle_byte | rightmost_byte)
 
+
+def pack_color(color) -> int:
+    """
+    Packs a pg.Color (or any r, g, b, a sequence) into the little endian u4 the sprite vertices store.
+    Same value as swap_endians(int(color)); compute it once when the color changes, not per sprite.
+    """
+    r, g, b, a = color
+    return r | g << 8 | b << 16 | a << 24